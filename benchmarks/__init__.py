@@ -0,0 +1,11 @@
+"""
+Benchmark scripts for the SMS project.
+
+Each module is runnable on its own from the project root, e.g.:
+
+    python -m benchmarks.attendance_marking
+
+Benchmarks run against a throwaway test database (created and destroyed by
+``benchmarks._setup.test_database``), so they never touch db.sqlite3 or the
+Docker PostgreSQL data. Set DATABASE_URL to benchmark against PostgreSQL.
+"""
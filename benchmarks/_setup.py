@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def bootstrap():
+    """Configures Django for a standalone benchmark run."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sms.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Creates a fresh, fully migrated test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer():
+    """Yields a dict whose 'seconds' key is filled in when the block exits."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
@@ -0,0 +1,257 @@
+"""
+Concurrent-client throughput of the async read views under ASGI versus WSGI.
+
+Seeds a dataset, logs in one student per simulated client, and has every client request
+the student dashboard, grades, attendance and assignments pages in turn. The same request
+mix is served twice, in-process, through Django's real handlers:
+
+- WSGI: a fixed pool of --wsgi-workers threads calling the WSGIHandler, the way gunicorn
+  sync workers serve one request each at a time.
+- ASGI: one event loop calling the ASGIHandler for all clients at once, the way
+  uvicorn/daphne do.
+
+Each query can be slowed down by --db-latency-ms (a sleep in an execute wrapper) to stand
+in for a loaded or remote database, which is where a WSGI worker sits idle but blocked.
+With little latency the run is CPU-bound and ASGI comes out behind (every sync middleware and
+ORM call hops threads); the async views pay off once query latency dominates.
+
+    python -m benchmarks.async_views [--clients 32] [--requests 8] [--wsgi-workers 4] [--db-latency-ms 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks._setup import bootstrap, test_database
+
+ROUTES = ['student:dashboard', 'student:grades', 'student:attendance', 'student:assignments']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class SimulatedLatency:
+    """execute_wrapper that sleeps before every statement (releasing the GIL, like real I/O)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+
+def install_latency(seconds):
+    """Adds the latency wrapper to every connection, including the ones worker threads open later."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    if not seconds:
+        return
+    wrapper = SimulatedLatency(seconds)
+
+    # Insert at the bottom of the stack: connections are opened lazily inside a request, after
+    # QueryInstrumentationMiddleware pushed its recorder, and its execute_wrapper() pops the top
+    def add(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, wrapper)
+
+    connection_created.connect(add, weak=False)
+    for connection in connections.all():
+        add(None, connection)
+
+
+def create_sessions(data, clients):
+    """Links one user to each of the first ``clients`` students and returns their session cookies."""
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from student.models import Student
+
+    cookies = []
+    for index, student_id in enumerate(data.student_ids[:clients]):
+        user = User.objects.create_user(f'bench-async-{index}')
+        Student.objects.filter(pk=student_id).update(user=user)
+        client = Client()
+        client.force_login(user)
+        cookies.append(f"sessionid={client.cookies['sessionid'].value}")
+    return cookies
+
+
+def request_plan(cookies, requests):
+    """(cookie, path) pairs per client: each client cycles through ROUTES."""
+    from django.urls import reverse
+
+    paths = [reverse(route) for route in ROUTES]
+    return [[(cookie, paths[i % len(paths)]) for i in range(requests)] for cookie in cookies]
+
+
+# --- WSGI ---
+
+def wsgi_get(application, cookie, path):
+    environ = {'PATH_INFO': path, 'HTTP_COOKIE': cookie, 'HTTP_HOST': 'localhost', 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def run_wsgi(plan, workers):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    latencies, statuses = [], []
+    # Every client sends its next request once the previous one is answered, but only
+    # ``workers`` requests are served at a time, as behind a sync server; the rest queue up
+    # and that wait counts towards their latency
+    worker_slots = threading.BoundedSemaphore(workers)
+
+    def client(requests):
+        for cookie, path in requests:
+            start = time.perf_counter()
+            with worker_slots:
+                statuses.append(wsgi_get(application, cookie, path))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+        list(pool.map(client, plan))
+    return time.perf_counter() - start, latencies, statuses
+
+
+# --- ASGI ---
+
+async def asgi_get(application, cookie, path):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    sent_body = False
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Like a server, only report a disconnect once the response is complete
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            disconnected.set()
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(plan):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    latencies, statuses = [], []
+
+    async def client(requests):
+        for cookie, path in requests:
+            start = time.perf_counter()
+            statuses.append(await asgi_get(application, cookie, path))
+            latencies.append(time.perf_counter() - start)
+
+    async def all_clients():
+        await asyncio.gather(*(client(requests) for requests in plan))
+
+    start = time.perf_counter()
+    asyncio.run(all_clients())
+    return time.perf_counter() - start, latencies, statuses
+
+
+def summarize(label, seconds, latencies, statuses):
+    row = {
+        'requests': len(latencies),
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'errors': sum(1 for status in statuses if status != 200),
+    }
+    print(f"{label:<6} {row['requests']:>5} requests in {row['seconds']:>7.2f}s  {row['requests_per_second']:>8.1f} req/s  "
+          f"p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  {row['errors']} errors")
+    return row
+
+
+def run(args):
+    from django.db import connections
+    from student.seeding import seed
+
+    data = seed(students=max(args.students, args.clients), courses=args.courses, days=args.days)
+    cookies = create_sessions(data, args.clients)
+    plan = request_plan(cookies, args.requests)
+
+    # Connections are opened per request thread below; close them with the request as under a real server
+    connections.settings['default']['CONN_MAX_AGE'] = 0
+    install_latency(args.db_latency_ms / 1000)
+
+    # Warm the process-wide caches (reference data, templates) so neither run pays for them
+    run_wsgi([requests[:len(ROUTES)] for requests in plan[:1]], 1)
+
+    print(f"{args.clients} clients x {args.requests} requests, {args.db_latency_ms} ms per query, "
+          f"{args.wsgi_workers} WSGI worker threads")
+    return {
+        'clients': args.clients,
+        'requests_per_client': args.requests,
+        'db_latency_ms': args.db_latency_ms,
+        'wsgi_workers': args.wsgi_workers,
+        'wsgi': summarize('WSGI', *run_wsgi(plan, args.wsgi_workers)),
+        'asgi': summarize('ASGI', *run_asgi(plan)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--courses', type=int, default=8)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=32, help="Concurrent simulated clients")
+    parser.add_argument('--requests', type=int, default=8, help="Requests per client")
+    parser.add_argument('--wsgi-workers', type=int, default=4, help="Worker threads for the WSGI run")
+    parser.add_argument('--db-latency-ms', type=float, default=5.0, help="Added to every query (0 for none)")
+    parser.add_argument('--output', type=Path, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    bootstrap()
+    # Per-request query logging and budget warnings would drown the output
+    logging.getLogger('sms').setLevel(logging.ERROR)
+    with test_database():
+        result = run(args)
+
+    ratio = result['asgi']['requests_per_second'] / result['wsgi']['requests_per_second']
+    print(f"ASGI/WSGI throughput: {ratio:.2f}x")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2, sort_keys=True) + '\n')
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Bulk attendance marking: queries and latency per 100 students.
+
+Compares student.attendance.mark_attendance (one upsert per division-day)
+against the naive per-student update_or_create loop.
+
+    python -m benchmarks.attendance_marking [--sizes 120 500 1000] [--repeat 5]
+"""
+import argparse
+import datetime
+import statistics
+
+from benchmarks._setup import bootstrap, test_database, timer
+
+
+def seed_division(size):
+    from student.models import Academic, Branch, Semester, Division, Student, Course
+
+    academic = Academic.objects.create(year=f"BENCH-{size}")
+    branch = Branch.objects.create(name=f"Bench Branch {size}", code=f"BB{size}")
+    semester = Semester.objects.create(semester_number=Semester.FIRST, academic=academic)
+    division = Division.objects.create(name="A", branch=branch, academic=academic)
+    course = Course.objects.create(name="Benchmarking", code=f"BN{size}", branch=branch, academic=academic, semester=semester)
+    students = Student.objects.bulk_create([
+        Student(
+            id=f"B{size}-{i:06d}", first=f"First{i}", last=f"Last{i}", email=f"s{i}@example.com",
+            prn=size * 1_000_000 + i, division=division, academic=academic, branch=branch, semester=semester,
+        )
+        for i in range(size)
+    ])
+    course.students_enrolled.add(*students)
+    return course, [s.id for s in students]
+
+
+def measure(func, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries = [], 0
+    for _ in range(repeat):
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as ctx, timer() as t:
+            func()
+        timings.append(t['seconds'])
+        queries = len(ctx.captured_queries)
+    return statistics.median(timings), queries
+
+
+def run(sizes, repeat):
+    from student.attendance import mark_attendance
+    from student.models import Attendance
+
+    print(f"{'students':>8} {'strategy':>16} {'queries':>8} {'ms total':>10} {'ms / 100 students':>18}")
+    for size in sizes:
+        course, student_ids = seed_division(size)
+        day = datetime.date(2025, 1, 1)
+
+        def bulk_insert_or_update():
+            # Alternate present/absent so every repeat after the first is a real update
+            mark_attendance(course, day, {sid: i % 2 == 0 for i, sid in enumerate(student_ids)})
+
+        def naive_loop():
+            for i, sid in enumerate(student_ids):
+                Attendance.objects.update_or_create(
+                    student_id=sid, course=course, date=day + datetime.timedelta(days=1),
+                    defaults={'is_present': i % 2 == 0},
+                )
+
+        for label, func in (('bulk upsert', bulk_insert_or_update), ('update_or_create', naive_loop)):
+            seconds, queries = measure(func, repeat)
+            per_100 = seconds * 1000 * 100 / size
+            print(f"{size:>8} {label:>16} {queries:>8} {seconds * 1000:>10.2f} {per_100:>18.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[120, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bootstrap()
+    with test_database():
+        run(args.sizes, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Attendance storage: size on disk and read latency of Attendance rows against bitmaps.
+
+Seeds a semester with student.seeding in the row storage, measures it, converts every
+course with student.attendance_bitmap.convert_course and measures again. Sizes are the
+tables plus their indexes (dbstat on SQLite, pg_total_relation_size on PostgreSQL);
+each read is the median of ``--repeat`` runs:
+
+    history   one student's newest 20 marks (student:attendance)
+    sheet     one division-day of marks (teacher:manage_attendance)
+    export    every mark of one course, as CSV rows (teacher:export_attendance)
+    dashboard marks per course on one day (teacher:dashboard's pending counts)
+
+    python -m benchmarks.attendance_storage [--students 2000] [--courses 20] [--days 60] [--repeat 5]
+"""
+import argparse
+import statistics
+
+from benchmarks._setup import bootstrap, test_database, timer
+
+
+def table_sizes(models):
+    """Bytes used by the tables of ``models`` and their indexes."""
+    from django.db import connection
+
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            return sum(_fetch_size(cursor, "SELECT pg_total_relation_size(%s)", [table]) for table in tables)
+        placeholders = ', '.join(['%s'] * len(tables))
+        return _fetch_size(
+            cursor,
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({placeholders}))",
+            tables,
+        )
+
+
+def _fetch_size(cursor, sql, params):
+    cursor.execute(sql, params)
+    return cursor.fetchone()[0] or 0
+
+
+def reads(result):
+    """(label, function) for each read timed, over the seeded data."""
+    from student.attendance import attendance_on, attendance_records
+    from student.exports import attendance_rows
+    from student.models import Student
+
+    course = result.courses[0]
+    day = attendance_records().filter(course=course).order_by('date').values_list('date', flat=True).first()
+    student_id = course.students_enrolled.order_by('id').values_list('id', flat=True).first()
+    division_ids = list(Student.objects.filter(division=result.divisions[0], enrolled_courses=course).values_list('id', flat=True))
+    course_ids = [c.pk for c in result.courses]
+
+    def history():
+        records = attendance_records().filter(student_id=student_id).select_related('course')
+        return list(records.order_by('-date', 'course__code')[:20])
+
+    def sheet():
+        return attendance_on(course, day, division_ids)
+
+    def export():
+        return sum(1 for _ in attendance_rows(attendance_records().filter(course=course)))
+
+    def dashboard():
+        return [attendance_records().filter(course_id=course_id, date=day).count() for course_id in course_ids]
+
+    return [('history', history), ('sheet', sheet), ('export', export), ('dashboard', dashboard)]
+
+
+def time_reads(result, repeat):
+    timings = {}
+    for label, func in reads(result):
+        func() # warm up
+        runs = []
+        for _ in range(repeat):
+            with timer() as t:
+                func()
+            runs.append(t['seconds'] * 1000)
+        timings[label] = statistics.median(runs)
+    return timings
+
+
+def run(students, courses, days, repeat):
+    from django.test.utils import override_settings
+    from student.attendance_bitmap import convert_course
+    from student.models import Attendance, AttendanceBitmap, SessionDate
+    from student.seeding import seed
+
+    with override_settings(ATTENDANCE_STORAGE='rows'):
+        result = seed(students=students, courses=courses, days=days, tag='bench')
+        marks = Attendance.objects.count()
+        measured = {'rows': (table_sizes([Attendance]), time_reads(result, repeat))}
+
+    with override_settings(ATTENDANCE_STORAGE='bitmap'):
+        with timer() as t:
+            for course in result.courses:
+                convert_course(course, to_bitmap=True)
+        print(f"{marks} marks, {len(result.courses)} courses converted to bitmaps in {t['seconds']:.2f} s")
+        measured['bitmap'] = (table_sizes([AttendanceBitmap, SessionDate]), time_reads(result, repeat))
+
+    labels = list(measured['rows'][1])
+    print(f"{'storage':>8} {'size KB':>10} {'bytes/mark':>11}" + ''.join(f" {label + ' ms':>13}" for label in labels))
+    for storage, (size, timings) in measured.items():
+        print(f"{storage:>8} {size / 1024:>10.0f} {size / marks:>11.2f}" + ''.join(f" {timings[label]:>13.2f}" for label in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bootstrap()
+    with test_database():
+        run(args.students, args.courses, args.days, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
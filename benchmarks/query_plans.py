@@ -0,0 +1,131 @@
+"""
+EXPLAIN plans and timings for the view query shapes, without and with the indexes
+added in student/migrations/0007_view_query_indexes.py.
+
+Seeds a dataset with student.seeding, drops those indexes/constraints, measures,
+recreates them, and measures again. Works on SQLite (default) and PostgreSQL
+(set DATABASE_URL=postgres://...).
+
+    python -m benchmarks.query_plans [--students 5000] [--courses 40] [--days 60] [--repeat 5]
+"""
+import argparse
+import statistics
+
+from benchmarks._setup import bootstrap, test_database, timer
+
+# Names of the schema objects under test (see the Meta classes in student/models.py)
+INDEX_NAMES = {
+    'Attendance': ['attendance_course_date_idx', 'attendance_student_date_idx'],
+    'Student': ['student_name_idx'],
+    'Assignment': ['assignment_course_due_idx'],
+}
+CONSTRAINT_NAMES = {
+    'Grade': ['unique_grade_per_course'],
+}
+
+
+def schema_objects():
+    from django.apps import apps
+
+    for model_name, names in INDEX_NAMES.items():
+        model = apps.get_model('student', model_name)
+        for index in model._meta.indexes:
+            if index.name in names:
+                yield model, 'index', index
+    for model_name, names in CONSTRAINT_NAMES.items():
+        model = apps.get_model('student', model_name)
+        for constraint in model._meta.constraints:
+            if constraint.name in names:
+                yield model, 'constraint', constraint
+
+
+def set_indexes(enabled):
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for model, kind, obj in schema_objects():
+            if kind == 'index':
+                (editor.add_index if enabled else editor.remove_index)(model, obj)
+            else:
+                (editor.add_constraint if enabled else editor.remove_constraint)(model, obj)
+    # Refresh planner statistics (both SQLite and PostgreSQL understand a bare ANALYZE)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def view_queries(data):
+    """The querysets issued by the student/teacher views, keyed by a short label."""
+    from student.models import Assignment, Attendance, Grade, Student
+
+    course = data.courses[0]
+    division = next(d for d in data.divisions if d.branch_id == course.branch_id)
+    student_id = Student.objects.filter(division=division).values_list('id', flat=True).first()
+    day = Attendance.objects.filter(course=course).values_list('date', flat=True).order_by('date').first()
+    course_ids = list(Student.objects.get(pk=student_id).enrolled_courses.values_list('id', flat=True))
+
+    return {
+        'attendance sheet (course, division, date)': Attendance.objects.filter(
+            course=course, student__division=division, date=day
+        ).select_related('student', 'student__division').order_by('student__last'),
+        'student attendance history (student, -date)': Attendance.objects.filter(
+            student_id=student_id
+        ).select_related('course').order_by('-date', 'course__code'),
+        'grade sheet (course) by student name': Grade.objects.filter(
+            course=course
+        ).select_related('student', 'student__division').order_by('student__last', 'student__first'),
+        'roster (division, enrolled_courses)': Student.objects.filter(
+            division=division, enrolled_courses=course
+        ).order_by('last', 'first'),
+        'assignments (course__in, due_date)': Assignment.objects.filter(
+            course__id__in=course_ids
+        ).order_by('due_date'),
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for label, queryset in queries.items():
+        list(queryset.all())  # warm the page cache so before/after compare like with like
+        timings = []
+        for _ in range(repeat):
+            with timer() as t:
+                list(queryset.all())
+            timings.append(t['seconds'])
+        results[label] = (statistics.median(timings) * 1000, queryset.explain())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-plans', action='store_true', help="Only print timings")
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.db import connection
+    from student.seeding import seed
+
+    with test_database():
+        with timer() as t:
+            data = seed(students=args.students, courses=args.courses, days=args.days)
+        print(f"Seeded on {connection.vendor} in {t['seconds']:.1f}s: {data.counts}")
+
+        queries = view_queries(data)
+        set_indexes(False)
+        before = measure(queries, args.repeat)
+        set_indexes(True)
+        after = measure(queries, args.repeat)
+
+        for label in queries:
+            (before_ms, before_plan), (after_ms, after_plan) = before[label], after[label]
+            print(f"\n=== {label}: {before_ms:.2f} ms -> {after_ms:.2f} ms")
+            if not args.no_plans:
+                print("--- before\n" + before_plan)
+                print("--- after\n" + after_plan)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Load-test harness for every route in student/urls.py and teacher/urls.py.
+
+Seeds a dataset with student.seeding, logs in as a student, a teacher and a staff
+user, then requests every named GET route through Django's test client. For each
+route it records p50/p95 latency, query count (CaptureQueriesContext) and peak
+Python memory (tracemalloc), and writes the results as JSON.
+
+    python -m benchmarks.routes [--students 500] [--requests 20] [--output benchmarks/baselines/routes.json]
+    python -m benchmarks.routes --compare benchmarks/baselines/routes.json
+
+With --compare the run is checked against a saved baseline and the exit status
+is non-zero if any route issues more queries or its p95 latency grows beyond
+--tolerance.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from benchmarks._setup import BASE_DIR, bootstrap, test_database, timer
+
+DEFAULT_BASELINE = BASE_DIR / 'benchmarks' / 'baselines' / 'routes.json'
+# Routes that end the session or only accept uploads/POSTs are not load-tested
+SKIPPED_ROUTES = {'student:logout', 'teacher:logout'}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def create_users(data):
+    """Creates a student, a teacher and a staff login over the seeded data."""
+    from django.contrib.auth.models import User
+    from student.models import Student
+    from teacher.models import Teacher, TeachingAssignment
+
+    password = 'bench-password'
+    student_user = User.objects.create_user('bench-student', password=password)
+    Student.objects.filter(pk=data.student_ids[0]).update(user=student_user)
+
+    teacher_user = User.objects.create_user('bench-teacher', password=password, first_name='Bench', last_name='Teacher')
+    teacher = Teacher.objects.create(user=teacher_user, employee_id='BENCH-T1', branch=data.branches[0])
+    # The teacher takes every course of their branch, all divisions
+    TeachingAssignment.objects.bulk_create([
+        TeachingAssignment(teacher=teacher, course=course, semester=course.semester)
+        for course in data.courses if course.branch_id == teacher.branch_id
+    ])
+
+    staff_user = User.objects.create_user('bench-staff', password=password, is_staff=True, is_superuser=True)
+    return {'student': student_user, 'teacher': teacher_user, 'staff': staff_user}, teacher, password
+
+
+def create_submission(data, course):
+    """
+    Submits a small file for the bench student to the first assignment of ``course``, so
+    the submission routes have something to serve. The blob is written under MEDIA_ROOT.
+    """
+    from django.utils import timezone
+    from student.models import Assignment, StoredBlob, Submission
+    from student.submissions import blob_path
+
+    content = b'benchmark submission\n' * 64
+    blob = StoredBlob.objects.create(sha256=hashlib.sha256(content).hexdigest(), size=len(content))
+    path = blob_path(blob.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    assignment = Assignment.objects.filter(course=course).order_by('pk').first()
+    return Submission.objects.create(
+        assignment=assignment, student_id=data.student_ids[0], blob=blob, filename='submission.txt', submitted_at=timezone.now(),
+    )
+
+
+def route_kwargs(data, submission):
+    """Values for the URL parameters used by the routes."""
+    course = data.courses[0]
+    return {
+        'course_id': course.id, 'branch_id': course.branch_id,
+        'assignment_id': submission.assignment_id, 'submission_id': submission.pk,
+    }
+
+
+def iter_routes():
+    """Yields (namespace, url name, parameter names) for every named route of both apps."""
+    from student import urls as student_urls
+    from teacher import urls as teacher_urls
+
+    for module in (student_urls, teacher_urls):
+        for pattern in module.urlpatterns:
+            if pattern.name:
+                yield module.app_name, pattern.name, list(pattern.pattern.converters)
+
+
+def login_role(namespace, name):
+    if name.startswith('branch_'):
+        return 'staff'
+    return namespace
+
+
+def measure_route(client, url, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client.get(url)  # warm-up: first-hit caches, template loading
+    latencies, queries, statuses = [], [], set()
+    tracemalloc.start()
+    for _ in range(requests):
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured, timer() as t:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        latencies.append(t['seconds'] * 1000)
+        queries.append(len(captured.captured_queries))
+        statuses.add(response.status_code)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'status': sorted(statuses),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(args):
+    from django.test import Client
+    from django.urls import reverse
+    from student.seeding import seed
+
+    data = seed(students=args.students, courses=args.courses, days=args.days)
+    users, teacher, password = create_users(data)
+    kwargs = route_kwargs(data, create_submission(data, data.courses[0]))
+    results = {}
+
+    for namespace, name, params in iter_routes():
+        route = f"{namespace}:{name}"
+        if route in SKIPPED_ROUTES:
+            continue
+        role = login_role(namespace, name)
+        client = Client(raise_request_exception=False)
+        if not name == 'login':
+            client.login(username=users[role].username, password=password)
+        url = reverse(route, kwargs={param: kwargs[param] for param in params})
+        results[route] = measure_route(client, url, args.requests)
+        results[route]['role'] = role
+        row = results[route]
+        print(f"{route:<36} {str(row['status']):<8} p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  "
+              f"{row['queries']:>4} queries  {row['peak_memory_kb']:>9.1f} KiB")
+
+    return {
+        'dataset': {'students': args.students, 'courses': args.courses, 'days': args.days, **data.counts},
+        'requests_per_route': args.requests,
+        'routes': results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Returns a list of human-readable regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for route, base in baseline['routes'].items():
+        now = current['routes'].get(route)
+        if now is None:
+            continue
+        if now['queries'] > base['queries']:
+            regressions.append(f"{route}: queries {base['queries']} -> {now['queries']}")
+        if now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']} ms -> {now['p95_ms']} ms")
+        if now['status'] != base['status']:
+            regressions.append(f"{route}: status {base['status']} -> {now['status']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--courses', type=int, default=12)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--requests', type=int, default=20, help="Timed requests per route")
+    parser.add_argument('--output', type=Path, help=f"Write results to this JSON file (e.g. {DEFAULT_BASELINE.relative_to(BASE_DIR)})")
+    parser.add_argument('--compare', type=Path, help="Baseline JSON to check this run against")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative p95 growth before flagging (default 0.5 = +50%%)")
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.test import override_settings
+
+    # Failing routes are recorded by status code; their tracebacks would drown the table
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    # Submitted files go to a throwaway MEDIA_ROOT, not the project's media/
+    with test_database(), tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+        current = run(args)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(current, indent=2, sort_keys=True) + '\n')
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        regressions = compare(current, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Student search latency against the number of students.
+
+Compares student.search (FTS5 on SQLite, trigram index on PostgreSQL) with the admin's
+previous search: icontains on id/first/last/email/prn, OR'd per word. Each query is timed
+the way the admin changelist runs it: a COUNT plus the first page of 20 by name.
+
+    python -m benchmarks.student_search [--sizes 1000 10000 50000] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+
+from benchmarks._setup import bootstrap, test_database, timer
+
+# (label, query): name prefix, two words, PRN prefix, email prefix, student id
+QUERIES = [
+    ('name prefix', 'pat'),
+    ('two words', 'aarav pat'),
+    ('prn prefix', '20000012'),
+    ('email', 'aarav.5'),
+    ('id', 'bench0000042'),
+]
+FIELDS = ['id', 'first', 'last', 'email', 'prn']
+
+
+def grow_students(start, stop, division):
+    from student.models import Student
+    from student.seeding import FIRST_NAMES, LAST_NAMES
+
+    rng = random.Random(start)
+    Student.objects.bulk_create([
+        Student(
+            id=f"BENCH{i:07d}", first=(first := rng.choice(FIRST_NAMES)), last=(last := rng.choice(LAST_NAMES)),
+            email=f"{first}.{i}@example.edu".lower(), prn=2_000_000_000 + i, division=division,
+            academic_id=division.academic_id, branch_id=division.branch_id,
+        )
+        for i in range(start, stop)
+    ], batch_size=5000)
+
+
+def icontains_search(queryset, query):
+    """The admin's default search_fields behaviour."""
+    from django.db.models import Q
+
+    for word in query.split():
+        condition = Q()
+        for field in FIELDS:
+            condition |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def time_query(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        with timer() as t:
+            queryset.count()
+            list(queryset.order_by('last', 'first')[:20])
+        timings.append(t['seconds'] * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes, repeat):
+    from student.models import Academic, Branch, Division, Student
+    from student.search import search_students
+
+    academic = Academic.objects.create(year="BENCH")
+    branch = Branch.objects.create(name="Bench Branch", code="BB")
+    division = Division.objects.create(name="A", branch=branch, academic=academic)
+
+    print(f"{'students':>8} {'query':>12} {'matches':>8} {'icontains ms':>13} {'search ms':>10} {'speedup':>8}")
+    grown = 0
+    for size in sorted(sizes):
+        grow_students(grown, size, division)
+        grown = size
+        for label, query in QUERIES:
+            indexed = search_students(Student.objects.all(), query)
+            scanned = icontains_search(Student.objects.all(), query)
+            indexed_ms, scanned_ms = time_query(indexed, repeat), time_query(scanned, repeat)
+            print(f"{size:>8} {label:>12} {indexed.count():>8} {scanned_ms:>13.2f} {indexed_ms:>10.2f} {scanned_ms / indexed_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bootstrap()
+    with test_database():
+        run(args.sizes, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
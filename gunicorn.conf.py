@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+# Production server settings, read by `gunicorn -c gunicorn.conf.py`. Every value can be
+# overridden from the environment (docker-compose.yml sets them for the web service).
+#
+#   SERVER_MODE=wsgi (default)  sms.wsgi on threaded sync workers (gthread)
+#   SERVER_MODE=asgi            sms.asgi on uvicorn workers, for the async views
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Processes x threads is the number of requests served at once. A few processes per core;
+# threads let a process keep serving while other requests wait on the database.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'sms.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Async requests run their ORM calls in fresh threads, so a persistent connection would
+    # never be reused; rely on the PostgreSQL pool (sms/settings.py) instead
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+else:
+    wsgi_app = 'sms.wsgi:application'
+    worker_class = 'gthread'
+
+# One pooled connection per thread, plus one spare
+os.environ.setdefault('DB_POOL_MAX_SIZE', str(threads + 1))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30')) # kill a worker stuck on one request this long
+graceful_timeout = 30 # let in-flight requests finish on restart/shutdown
+keepalive = 5 # behind a proxy, keep connections open a little longer than its idle timeout
+
+# Recycle workers now and then so a slow leak can't grow forever; jitter so they don't all restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files in memory: a slow disk (container overlay fs) must not make workers look hung
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Each worker loads the app itself after forking, so no database connection or pool is shared
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -1,3 +1,28 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import Job
+from .pagination import EstimatedCountPaginator
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'progress', 'progress_total', 'created_by', 'created_at', 'finished_at', 'worker')
+    list_filter = ('status', 'name')
+    list_select_related = ('created_by',)
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        # Jobs are queued through main.jobs.enqueue(), which checks the handler exists
+        return False
+
+    @admin.action(description="Retry selected failed jobs")
+    def retry(self, request, queryset):
+        retried = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None, error='',
+        )
+        self.message_user(request, f"Requeued {retried} job(s).")
@@ -0,0 +1,46 @@
+"""
+Helpers shared by the read-only JSON endpoints in student/api.py and teacher/api.py.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting to a login page."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def versioned_json(etag_func):
+    """
+    Decorates a GET/HEAD-only JSON view whose ETag is ``etag_func(request, *args, **kwargs)``.
+    The ETag is built from cached version tokens only, so an If-None-Match poll for unchanged
+    data is answered 304 before the view (and its queries) runs.
+    """
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # Per-user data: clients must revalidate, shared caches must not store it
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return api_login_required(require_safe(wrapper))
+    return decorator
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def page_links(page):
+    """Cursor fields for a main.pagination.KeysetPage; pass them back as ?cursor=."""
+    return {'next': page.next_cursor, 'previous': page.previous_cursor}
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401  (deployment checks; cache invalidation receivers)
+        # Job handlers (main.jobs.register) live in each app's jobs module
+        autodiscover_modules('jobs')
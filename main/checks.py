@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose entries live in one process: nothing written there reaches the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The data versions (main.versioning) are how one process tells the others that reference
+    data (student.refdata), profiles, fragments and API ETags changed, so a deployment with
+    several processes needs a cache they all share.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is private to each process.",
+        hint=(
+            "Version bumps then reach only the process that made them: other web and job worker "
+            "processes keep stale reference data, profiles and fragments and answer 304 for changed "
+            "data. Set CACHE_BACKEND/CACHE_LOCATION to a shared cache (see docker-compose.yml)."
+        ),
+        id='main.W001',
+    )]
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .versioning import get_versions
+
+
+def student_fragment_version(student):
+    # Everything the student dashboard/nav render: their own rows, plus shared reference data
+    return '-'.join(get_versions(('student', student.pk), ('catalog',), ('data',)))
+
+
+def teacher_fragment_version(user_id):
+    return '-'.join(get_versions(('user', user_id), ('catalog',)))
+
+
+def fragment_cache(request):
+    """
+    Vary-on values for the {% cache %} blocks in the dashboards and layouts. They are lazy,
+    so pages without a cached fragment never touch the version keys. main.signals moves
+    the versions when the underlying rows change, which orphans the old fragments.
+    """
+    profiles = getattr(request, 'profiles', None)
+
+    def student_version():
+        student = profiles.student if profiles else None
+        return student_fragment_version(student) if student else ''
+
+    def teacher_version():
+        teacher = profiles.teacher if profiles else None
+        return teacher_fragment_version(teacher.user_id) if teacher else ''
+
+    return {
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'student_fragment_version': SimpleLazyObject(student_version),
+        'teacher_fragment_version': SimpleLazyObject(teacher_version),
+    }
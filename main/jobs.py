@@ -0,0 +1,218 @@
+"""
+Database-backed background jobs.
+
+Handlers are plain functions registered by name in each app's ``jobs`` module (loaded by
+MainConfig.ready()) and receive the Job plus its kwargs:
+
+    @register('regrade_semester')
+    def regrade_semester(job, semester_id):
+        job_progress(job, 0, 1, "Regrading")
+        return {'updated': ...}           # stored as Job.result (must be JSON-serializable)
+
+Views call enqueue() and return at once; ``manage.py run_workers`` claims queued rows and
+runs them in a pool of processes. No broker is needed: the Job table is the queue.
+
+- Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database has it (PostgreSQL),
+  otherwise a compare-and-set UPDATE ... WHERE status='queued', so two workers never run the
+  same job.
+- A failed attempt is retried after JOB_RETRY_DELAY * 2**(attempts - 1) seconds until
+  max_attempts is reached, then the job is marked failed with the traceback.
+- Running jobs send a heartbeat; ones whose worker died (no heartbeat for JOB_STALE_AFTER
+  seconds) are put back in the queue.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('sms.jobs')
+
+_handlers = {}
+
+
+class UnknownJob(Exception):
+    pass
+
+
+def register(name):
+    """Decorator registering a job handler under ``name``."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def handler_names():
+    return sorted(_handlers)
+
+
+def enqueue(name, user=None, max_attempts=3, **kwargs):
+    """Queues handler ``name`` with ``kwargs`` and returns the Job; workers see it once the transaction commits."""
+    if name not in _handlers:
+        raise UnknownJob(name)
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts,
+        run_after=timezone.now(),
+    )
+
+
+def job_progress(job, done, total=None, message=None):
+    """Records progress (``done`` of ``total`` units) for a running job; also counts as a heartbeat."""
+    job.progress = done
+    fields = {'progress': done, 'heartbeat_at': timezone.now()}
+    if total is not None:
+        job.progress_total = fields['progress_total'] = total
+    if message is not None:
+        job.progress_message = fields['progress_message'] = message[:200]
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(**fields)
+    except DatabaseError:
+        # Progress is advisory. On SQLite a long read in another worker can hold the write lock;
+        # don't fail the job over it.
+        logger.warning("Could not record progress for job %s", job.pk)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --- claiming ---
+
+def claim(worker):
+    """Marks the next runnable job as running for ``worker`` and returns it, or None."""
+    runnable = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now()).order_by('run_after', 'id')
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = runnable.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            _start(job, worker, now)
+            job.save(update_fields=['status', 'attempts', 'started_at', 'finished_at', 'heartbeat_at', 'worker'])
+            return job
+
+    # No SKIP LOCKED (SQLite): compare-and-set on the status; retry if another worker won the row
+    for candidate_id in runnable.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=candidate_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            started_at=now, finished_at=None, heartbeat_at=now, worker=worker,
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate_id)
+    return None
+
+
+def _start(job, worker, now):
+    job.status = Job.RUNNING
+    job.attempts += 1
+    job.started_at = now
+    job.finished_at = None
+    job.heartbeat_at = now
+    job.worker = worker
+
+
+def requeue_stale():
+    """Puts running jobs whose worker stopped sending heartbeats back in the queue. Returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    return Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff).update(
+        status=Job.QUEUED, run_after=timezone.now(), worker='', progress_message='Requeued: worker stopped responding',
+    )
+
+
+# --- running ---
+
+class Heartbeat(threading.Thread):
+    """Refreshes heartbeat_at while a long handler runs without reporting progress."""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                Job.objects.filter(pk=self.job_id, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run(job):
+    """Runs a claimed job to completion, recording the result or scheduling a retry."""
+    heartbeat = Heartbeat(job.pk)
+    heartbeat.start()
+    try:
+        handler = _handlers.get(job.name)
+        if handler is None:
+            raise UnknownJob(job.name)
+        result = handler(job, **job.kwargs)
+    except Exception:
+        _failed(job, traceback.format_exc())
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.finished_at = timezone.now()
+        job.error = ''
+        if job.progress_total is not None:
+            job.progress = job.progress_total
+        job.save(update_fields=['status', 'result', 'finished_at', 'error', 'progress', 'output'])
+    finally:
+        heartbeat.stop()
+    return job
+
+
+def _failed(job, error):
+    job.error = error
+    if job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        job.progress_message = f"Attempt {job.attempts} failed; retrying"
+    else:
+        job.status = Job.FAILED
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'error', 'finished_at', 'progress_message'])
+
+
+def work(worker=None, stop=None, burst=False):
+    """
+    Worker loop: claims and runs jobs until ``stop`` (a threading/multiprocessing Event) is set,
+    or, with ``burst``, until no job is runnable. Returns the number of jobs run.
+    """
+    worker = worker or worker_name()
+    ran = 0
+    while stop is None or not stop.is_set():
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            if stop is not None:
+                stop.wait(settings.JOB_POLL_INTERVAL)
+            else:
+                time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        try:
+            run(job)
+        except DatabaseError:
+            # The result could not be recorded; the job stays 'running' until requeue_stale() picks it up
+            logger.exception("Lost the database while finishing job %s", job.pk)
+            connection.close()
+        ran += 1
+    return ran
@@ -0,0 +1,79 @@
+import multiprocessing
+import signal
+from multiprocessing.connection import wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main import jobs
+
+
+def _worker_process(index, stop, burst):
+    # Ctrl-C goes to the whole process group; let the parent decide and finish the current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    django.setup()  # no-op after fork, needed with the spawn start method
+    try:
+        jobs.work(worker=f"{jobs.worker_name()}/{index}", stop=stop, burst=burst)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (main.jobs) in a pool of worker processes until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help="Worker processes; 0 runs jobs in this process")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is runnable (for cron or tests)")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 0:
+            raise CommandError("--processes must be 0 or more.")
+        self.stdout.write(f"Job handlers: {', '.join(jobs.handler_names())}")
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} job(s) left running by a stopped worker."))
+
+        if options['processes'] == 0:
+            ran = jobs.work(burst=options['burst'])
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
+            return
+
+        stop = multiprocessing.Event()
+        # Children must not inherit the parent's open database connections, or its pool (PostgreSQL)
+        connections.close_all()
+        for connection in connections.all(initialized_only=True):
+            if hasattr(connection, 'close_pool'):
+                connection.close_pool()
+
+        def start(index):
+            worker = multiprocessing.Process(target=_worker_process, args=(index, stop, options['burst']), daemon=True)
+            worker.start()
+            return worker
+
+        workers = [start(index) for index in range(options['processes'])]
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the current jobs...")
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        self.stdout.write(self.style.SUCCESS(f"Started {len(workers)} worker process(es)."))
+
+        # Supervise: replace crashed workers and requeue the jobs they were running
+        while any(worker.is_alive() for worker in workers):
+            wait([worker.sentinel for worker in workers if worker.is_alive()], timeout=settings.JOB_STALE_AFTER / 4)
+            if stop.is_set():
+                continue
+            for index, worker in enumerate(workers):
+                if not worker.is_alive() and worker.exitcode != 0:
+                    self.stdout.write(self.style.WARNING(f"Worker {index} exited with code {worker.exitcode}; restarting."))
+                    workers[index] = start(index)
+            if jobs.requeue_stale():
+                self.stdout.write(self.style.WARNING("Requeued job(s) whose worker stopped responding."))
+            connections.close_all()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
@@ -0,0 +1,146 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .profiles import RequestProfiles
+
+query_logger = logging.getLogger('sms.queries')
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that works in both the WSGI and the ASGI stack: under ASGI with
+    async views, __acall__ is awaited directly instead of Django adapting a sync
+    middleware onto a thread for every request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class CurrentProfileMiddleware(AsyncCapableMiddleware):
+    """
+    Attaches ``request.profiles`` so views can use ``request.profiles.student`` and
+    ``request.profiles.teacher`` instead of looking the profile up themselves.
+    Must come after AuthenticationMiddleware. Nothing is queried until a view asks
+    (async views: ``await request.profiles.aresolve()`` first).
+    """
+
+    def handle(self, request):
+        request.profiles = RequestProfiles(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.profiles = RequestProfiles(request)
+        return await self.get_response(request)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode (settings.QUERY_BUDGET_STRICT) when a view issues more queries than its budget."""
+
+
+# Collapses "IN (%s, %s, ...)" so the same statement with different list lengths shares a fingerprint
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper callable that counts, times and fingerprints every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        """Statements executed at least ``threshold`` times: the usual signature of an N+1."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+class QueryInstrumentationMiddleware(AsyncCapableMiddleware):
+    """
+    Records query count, SQL time and repeated statements for every request.
+
+    - Adds a ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` header.
+    - Logs one JSON line per request to the ``sms.queries`` logger (INFO), or a WARNING
+      when a statement repeats QUERY_N_PLUS_ONE_THRESHOLD times or the budget is exceeded.
+    - Budgets come from settings.QUERY_BUDGETS ({'namespace:url_name': n}) falling back to
+      QUERY_BUDGET_DEFAULT. With QUERY_BUDGET_STRICT, going over raises QueryBudgetExceeded,
+      which makes the test client (and so the test) fail.
+
+    Place it first in MIDDLEWARE so session and auth queries are counted too. Queries run while
+    a StreamingHttpResponse is being consumed happen after this middleware returns and are not counted.
+    """
+
+    def handle(self, request):
+        recorder = QueryRecorder()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        # Connections are shared with the sync_to_async threads the async ORM runs queries on
+        with self.recording(recorder):
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    @staticmethod
+    def recording(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def report(self, request, response, recorder):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+        repeated = recorder.repeated(getattr(settings, 'QUERY_N_PLUS_ONE_THRESHOLD', 5))
+        over_budget = budget is not None and recorder.count > budget
+
+        response['Server-Timing'] = f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+        payload = {
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.duration * 1000, 2),
+            'budget': budget,
+            'repeated': [{'sql': sql, 'count': count} for sql, count in repeated],
+        }
+        level = logging.WARNING if (repeated or over_budget) else logging.INFO
+        query_logger.log(level, json.dumps(payload))
+
+        if over_budget and getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(
+                f"{view_name} ran {recorder.count} queries (budget {budget}); repeated: {payload['repeated']}"
+            )
+        return response
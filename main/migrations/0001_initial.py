@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('run_after', models.DateTimeField(help_text='Not picked up before this time (used to back off retries)')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('progress', models.PositiveIntegerField(default=0)),
+                ('progress_total', models.PositiveIntegerField(blank=True, null=True)),
+                ('progress_message', models.CharField(blank=True, max_length=200)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, help_text='Traceback of the last failed attempt')),
+                ('output', models.FileField(blank=True, help_text='File produced by the job, e.g. an export', upload_to='jobs/%Y/%m/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, help_text='host:pid of the worker running it', max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['run_after', 'id'], name='job_queued_idx'), models.Index(fields=['created_by', '-created_at'], name='job_owner_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,63 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    A unit of background work, run by ``manage.py run_workers`` (see main.jobs).
+    ``name`` picks the registered handler and ``kwargs`` are passed to it.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_after = models.DateTimeField(help_text="Not picked up before this time (used to back off retries)")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+
+    progress = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, help_text="Traceback of the last failed attempt")
+    output = models.FileField(upload_to='jobs/%Y/%m/', blank=True, help_text="File produced by the job, e.g. an export")
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, help_text="host:pid of the worker running it")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker poll: next runnable queued job
+            models.Index(fields=['run_after', 'id'], condition=models.Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['created_by', '-created_at'], name='job_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, self.progress * 100 // self.progress_total)
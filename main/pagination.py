@@ -0,0 +1,260 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET, each page continues from the ordering values of the last row of
+the previous page (WHERE (a, b) > (last_a, last_b) ORDER BY a, b LIMIT n), so page N
+costs the same as page 1 when an index covers the ordering.
+
+EstimatedCountPaginator at the end is the admin changelist counterpart: numbered pages,
+but without an exact COUNT(*) over large tables.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _resolve_field(queryset, path):
+    """Returns the model field at the end of a lookup path such as 'student__last', or an annotation's output field."""
+    if path in queryset.query.annotations:
+        return queryset.query.annotations[path].output_field
+    model = queryset.model
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, params):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _query(self, cursor):
+        params = self._params.copy()
+        params['cursor'] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor) if self.has_next else ''
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor) if self.has_previous else ''
+
+
+class KeysetPaginator:
+    """
+    Paginates ``queryset`` (model instances or a values() projection) by ``ordering``
+    (e.g. ['-date', 'course__code']), fields or annotations. The primary key is appended as
+    a tie-breaker so every row has a unique position. Ordering columns must not be NULL.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+        self.ordering = list(ordering)
+        if not any(key.lstrip('-') in ('pk', 'id') for key in self.ordering):
+            self.ordering.append('pk')
+        self.per_page = per_page
+        self.fields = [key.lstrip('-') for key in self.ordering]
+        self.descending = [key.startswith('-') for key in self.ordering]
+        self.model_fields = [
+            queryset.model._meta.pk if name == 'pk' else _resolve_field(queryset, name) for name in self.fields
+        ]
+        # Ordering values are annotated so the cursor can be read off each row without extra queries
+        self.aliases = [f'_keyset_{i}' for i in range(len(self.fields))]
+        self.queryset = queryset.annotate(**{alias: F(name) for alias, name in zip(self.aliases, self.fields)})
+
+    # --- cursor encoding ---
+
+    def _encode(self, row, direction):
+        if isinstance(row, dict):
+            values = [_jsonable(row[alias]) for alias in self.aliases]
+        else:
+            values = [_jsonable(getattr(row, alias)) for alias in self.aliases]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, raw_values = payload['d'], payload['v']
+            if direction not in ('n', 'p') or len(raw_values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [field.to_python(value) for field, value in zip(self.model_fields, raw_values)]
+        except (ValueError, KeyError, TypeError, ValidationError, FieldDoesNotExist):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    # --- query building ---
+
+    def _after(self, values, reverse):
+        """
+        Q for rows strictly after ``values`` in the (possibly reversed) ordering. The OR of
+        the per-column terms is ANDed with a plain bound on the first column (the same on
+        every term), so an index on the ordering is range-scanned from the cursor on.
+        """
+        condition = Q(pk__in=[])
+        for i, (name, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for prior_name, prior_value in zip(self.fields[:i], values[:i]):
+                term &= Q(**{prior_name: prior_value})
+            condition |= term
+        if len(self.fields) > 1:
+            lookup = 'lte' if self.descending[0] != reverse else 'gte'
+            condition &= Q(**{f'{self.fields[0]}__{lookup}': values[0]})
+        return condition
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return self.ordering
+        return [name if descending else f'-{name}' for name, descending in zip(self.fields, self.descending)]
+
+    def page(self, cursor=None, params=None):
+        """
+        Returns the KeysetPage after (or, for a 'previous' cursor, before) ``cursor``.
+        An invalid cursor starts again from the first page. ``params`` (a QueryDict) is kept
+        in the next/previous links.
+        """
+        queryset, values, reverse = self._page_query(cursor)
+        return self._page(list(queryset), values, reverse, params)
+
+    async def apage(self, cursor=None, params=None):
+        """page() for async views."""
+        queryset, values, reverse = self._page_query(cursor)
+        return self._page([row async for row in queryset], values, reverse, params)
+
+    def _page_query(self, cursor):
+        direction, values = 'n', None
+        if cursor:
+            try:
+                direction, values = self._decode(cursor)
+            except InvalidCursor:
+                direction, values = 'n', None
+        reverse = direction == 'p'
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset.order_by(*self._order_by(reverse))[:self.per_page + 1], values, reverse
+
+    def _page(self, rows, values, reverse, params):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            next_cursor = previous_cursor = None
+        elif reverse:
+            next_cursor = self._encode(rows[-1], 'n')
+            previous_cursor = self._encode(rows[0], 'p') if has_more else None
+        else:
+            next_cursor = self._encode(rows[-1], 'n') if has_more else None
+            previous_cursor = self._encode(rows[0], 'p') if values is not None else None
+
+        if rows and isinstance(rows[0], dict):
+            # values() querysets: keep the cursor columns out of the serialized rows
+            for row in rows:
+                for alias in self.aliases:
+                    del row[alias]
+
+        params = QueryDict(mutable=True) if params is None else params.copy()
+        params.pop('cursor', None)
+        return KeysetPage(rows, next_cursor, previous_cursor, params)
+
+
+def _jsonable(value):
+    """Dates become ISO strings and Decimals strings; Field.to_python turns them back on decode."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def paginate(request, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+    """Keyset-paginates ``queryset`` using the request's ?cursor= parameter."""
+    return KeysetPaginator(queryset, ordering, per_page).page(request.GET.get('cursor'), request.GET)
+
+
+async def apaginate(request, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+    """paginate() for async views."""
+    return await KeysetPaginator(queryset, ordering, per_page).apage(request.GET.get('cursor'), request.GET)
+
+
+# --- Admin changelists ---
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over large tables (ModelAdmin.paginator, together with
+    show_full_result_count = False), whose exact COUNT(*) would read the whole table on
+    every page view.
+
+    - PostgreSQL: the planner's row estimate (pg_class.reltuples without filters, EXPLAIN
+      with them) once it is above ESTIMATE_ABOVE; smaller results are counted exactly.
+    - Other databases: an exact count that stops at COUNT_LIMIT rows.
+    """
+    ESTIMATE_ABOVE = 10_000
+    COUNT_LIMIT = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            estimate = _estimated_rows(queryset.order_by(), connection)
+            if estimate is not None and estimate > self.ESTIMATE_ABOVE:
+                return estimate
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+def _estimated_rows(queryset, connection):
+    """The PostgreSQL planner's row estimate for ``queryset``, or None if it has none."""
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1 (never analyzed) or 0 (empty, or not analyzed yet): count exactly
+            return int(row[0]) if row and row[0] > 0 else None
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
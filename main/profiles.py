@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from student import refdata
+from student.models import Student
+from teacher.models import Teacher
+from .versioning import get_version
+
+PROFILE_CACHE_TIMEOUT = 60 * 15
+
+
+def profile_cache_key(user_id):
+    # The 'profiles' version changes whenever reference data rendered with a profile changes
+    return f"sms:profiles:{get_version('profiles')}:{user_id}"
+
+
+def load_profiles(user_id):
+    """
+    Returns (student, teacher) for a user id, either of which may be None.
+    Results are cached; signal handlers in main.signals drop stale entries.
+    """
+    key = profile_cache_key(user_id)
+    profiles = cache.get(key)
+    if profiles is None:
+        student = Student.objects.filter(user_id=user_id).first()
+        teacher = Teacher.objects.select_related('user').filter(user_id=user_id).first()
+        # Reference rows come from the in-process registry instead of joins
+        if student is not None:
+            refdata.attach([student], 'division', 'academic', 'branch', 'semester')
+        if teacher is not None:
+            refdata.attach([teacher], 'branch')
+        profiles = (student, teacher)
+        cache.set(key, profiles, PROFILE_CACHE_TIMEOUT)
+    return profiles
+
+
+def invalidate_profiles(user_id):
+    if user_id is not None:
+        cache.delete(profile_cache_key(user_id))
+
+
+class RequestProfiles:
+    """Resolves the Student and/or Teacher linked to request.user at most once per request."""
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def _profiles(self):
+        if not self.request.user.is_authenticated:
+            return (None, None)
+        return load_profiles(self.request.user.pk)
+
+    async def aresolve(self):
+        """
+        Resolves the profiles from an async view, where the lazy lookup behind .student and
+        .teacher may not touch the database. Afterwards both (and templates) read the result.
+        """
+        if '_profiles' not in self.__dict__:
+            user = await self.request.auser()
+            # Replace the lazy request.user too, so templates ({{ user }}) don't look it up synchronously
+            self.request.user = user
+            profiles = await sync_to_async(load_profiles)(user.pk) if user.is_authenticated else (None, None)
+            self.__dict__['_profiles'] = profiles
+        return self
+
+    @property
+    def student(self):
+        return self._profiles[0]
+
+    @property
+    def teacher(self):
+        return self._profiles[1]
@@ -0,0 +1,128 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from student import refdata
+from student.models import Academic, Assignment, Attendance, Branch, Course, Division, Grade, Semester, Student
+from teacher.models import Teacher, TeachingAssignment
+from .profiles import invalidate_profiles
+from .versioning import bump_version, bump_versions, data_changed
+
+
+# --- Cached request profiles (main.profiles) ---
+
+@receiver(pre_save, sender=Teacher)
+def drop_previous_profile_owner(sender, instance, **kwargs):
+    # If the profile is being relinked to another user, the old user's cached entry must go too
+    if instance.pk is None:
+        return
+    previous_user_id = sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+    if previous_user_id != instance.user_id:
+        invalidate_profiles(previous_user_id)
+
+
+@receiver(post_save, sender=Student)
+def drop_previous_student_owner(sender, instance, **kwargs):
+    # As above, from the row student.signals.remember_stored_row read before the save
+    stored = getattr(instance, '_stored_row', None)
+    if stored is not None and stored['user_id'] != instance.user_id:
+        invalidate_profiles(stored['user_id'])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def drop_cached_profile(sender, instance, **kwargs):
+    invalidate_profiles(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def drop_cached_profile_for_user(sender, instance, **kwargs):
+    # Teacher profiles are cached together with their User (names shown on every teacher page)
+    invalidate_profiles(instance.pk)
+    bump_version('user', instance.pk)
+
+
+@receiver(post_save, sender=Academic)
+@receiver(post_delete, sender=Academic)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=Division)
+@receiver(post_delete, sender=Division)
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def drop_all_cached_profiles(sender, instance, **kwargs):
+    # Cached profiles embed these rows; dashboard fragments render them too
+    bump_versions(('profiles',), ('catalog',))
+    refdata.invalidate()
+
+
+# --- Per-student / per-course data versions (JSON API ETags, main.versioning) ---
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def student_course_row_changed(sender, instance, **kwargs):
+    data_changed(student_ids=[instance.student_id], course_ids=[instance.course_id])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    # Names and divisions also appear on the rosters of the student's courses
+    course_ids = Course.students_enrolled.through.objects.filter(student_id=instance.pk).values_list('course_id', flat=True)
+    data_changed(student_ids=[instance.pk], course_ids=list(course_ids))
+
+
+def _course_changed(course_id):
+    # Course details and assignments are shown to every enrolled student
+    enrolled = Course.students_enrolled.through.objects.filter(course_id=course_id).values_list('student_id', flat=True)
+    data_changed(student_ids=list(enrolled), course_ids=[course_id])
+
+
+@receiver(post_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    _course_changed(instance.pk)
+    bump_version('catalog')
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    _course_changed(instance.course_id)
+
+
+@receiver(post_save, sender=TeachingAssignment)
+@receiver(post_delete, sender=TeachingAssignment)
+def teaching_assignment_changed(sender, instance, **kwargs):
+    # The course's API rosters and grades are limited to the divisions its teachers take
+    data_changed(course_ids=[instance.course_id])
+
+
+@receiver(m2m_changed, sender=Course.students_enrolled.through)
+def enrolment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() reports no pk_set, so remember who is about to be removed
+        related = instance.enrolled_courses if reverse else instance.students_enrolled
+        instance._cleared_enrolment_ids = list(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_enrolment_ids', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if reverse:
+        data_changed(student_ids=[instance.pk], course_ids=pk_set)
+    else:
+        data_changed(student_ids=pk_set, course_ids=[instance.pk])
+
+
+# --- Cached dashboard/layout fragments (main.context_processors.fragment_cache) ---
+# Student fragments follow the ('student', id) data version above.
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def teacher_changed(sender, instance, **kwargs):
+    bump_version('user', instance.user_id)
@@ -1,3 +1,299 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import io
+import re
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from main import jobs
+from main.checks import check_shared_cache
+from main.middleware import QueryBudgetExceeded, QueryRecorder, fingerprint
+from main.models import Job
+from main.profiles import RequestProfiles, load_profiles
+from main.pagination import KeysetPaginator
+from student import refdata
+from student.models import Academic, Attendance, Branch, Course, Division, Semester, Student
+from teacher.models import Teacher
+
+
+class QueryInstrumentationTests(TestCase):
+    # main:health runs one query, SELECT 1
+
+    def test_queries_are_reported(self):
+        with self.assertLogs('sms.queries', 'INFO') as logs:
+            response = self.client.get('/main/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries"$')
+        report = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((report['view'], report['queries'], report['budget']), ('main:health', 1, 25))
+
+    @override_settings(QUERY_BUDGETS={'main:health': 0}, QUERY_BUDGET_STRICT=False)
+    def test_over_budget_is_logged(self):
+        with self.assertLogs('sms.queries', 'WARNING'):
+            self.assertEqual(self.client.get('/main/health/').status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={'main:health': 0}, QUERY_BUDGET_STRICT=True)
+    def test_over_budget_raises_in_strict_mode(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "main:health ran 1 queries (budget 0)"), self.assertLogs('sms.queries', 'WARNING'):
+            self.client.get('/main/health/')
+
+    @override_settings(QUERY_BUDGETS={'main:health': 1}, QUERY_BUDGET_STRICT=True)
+    def test_within_budget_passes_in_strict_mode(self):
+        self.assertEqual(self.client.get('/main/health/').status_code, 200)
+
+
+class QueryRecorderTests(SimpleTestCase):
+    def test_in_lists_share_a_fingerprint(self):
+        self.assertEqual(fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'), fingerprint('SELECT 1 WHERE id IN (%s)'))
+
+    def test_repeated_statements(self):
+        recorder = QueryRecorder()
+        execute = lambda sql, params, many, context: None
+        for count in range(1, 6):
+            recorder(execute, f"SELECT * FROM t WHERE id IN ({', '.join(['%s'] * count)})", [], False, {})
+        recorder(execute, 'SELECT 1', [], False, {})
+        self.assertEqual(recorder.count, 6)
+        self.assertEqual(recorder.repeated(5), [('SELECT * FROM t WHERE id IN (...)', 5)])
+        self.assertEqual(recorder.repeated(6), [])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_reported(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['main.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/sms'}}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        academic = Academic.objects.create(year="2025-26")
+        branch = Branch.objects.create(name="Computer", code="CS")
+        semester = Semester.objects.create(semester_number=Semester.FIRST, academic=academic)
+        division = Division.objects.create(name="A", branch=branch, academic=academic)
+        # Repeated last names, so pages split inside runs of equal ordering values
+        Student.objects.bulk_create([
+            Student(
+                id=f"S{i:02}", first=f"First{i % 3}", last=f"Last{i % 4}", email=f"s{i}@example.com", prn=1000 + i,
+                division=division, academic=academic, branch=branch, semester=semester,
+            )
+            for i in range(23)
+        ])
+        cls.course = Course.objects.create(name="Algorithms", code="CS101", branch=branch, academic=academic, semester=semester)
+        Attendance.objects.bulk_create([
+            Attendance(student_id=f"S{i:02}", course=cls.course, date=datetime.date(2025, 7, 1 + i % 5), is_present=True)
+            for i in range(23)
+        ])
+
+    def walk(self, paginator):
+        """The pages reached by following next cursors, then previous cursors back, as lists of ids."""
+        forward, page = [], paginator.page()
+        self.assertIsNone(page.previous_cursor)
+        while True:
+            forward.append([row.pk if hasattr(row, 'pk') else row['id'] for row in page])
+            if not page.has_next:
+                break
+            page = paginator.page(page.next_cursor)
+        backward = [forward[-1]]
+        while page.has_previous:
+            page = paginator.page(page.previous_cursor)
+            backward.append([row.pk if hasattr(row, 'pk') else row['id'] for row in page])
+        return forward, backward[::-1]
+
+    def test_pages_follow_the_ordering(self):
+        expected = list(Student.objects.order_by('last', 'first', 'pk').values_list('pk', flat=True))
+        forward, backward = self.walk(KeysetPaginator(Student.objects.all(), ['last', 'first'], per_page=5))
+        self.assertEqual([len(page) for page in forward], [5, 5, 5, 5, 3])
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+
+    def test_descending_ordering_of_a_values_queryset(self):
+        rows = Attendance.objects.values('id', 'date')
+        expected = list(Attendance.objects.order_by('-date', 'id').values_list('id', flat=True))
+        forward, backward = self.walk(KeysetPaginator(rows, ['-date', 'id'], per_page=4))
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+        # The cursor columns stay out of the rows
+        self.assertEqual(set(KeysetPaginator(rows, ['-date', 'id'], per_page=4).page().object_list[0]), {'id', 'date'})
+
+    def test_first_column_bounds_the_page_query(self):
+        paginator = KeysetPaginator(Attendance.objects.all(), ['-date', 'student__last'], per_page=4)
+        values = [datetime.date(2025, 7, 3), 'Last1', 7]
+        for reverse, bound in ((False, '"date" <= '), (True, '"date" >= ')):
+            with self.subTest(reverse=reverse):
+                sql = str(Attendance.objects.filter(paginator._after(values, reverse)).query)
+                # AND-ed with the OR of the per-column terms, not one of them
+                self.assertRegex(sql, r'\) AND "student_attendance"\.' + re.escape(bound) + r'2025-07-03')
+
+    def test_invalid_cursor_starts_again(self):
+        paginator = KeysetPaginator(Student.objects.all(), ['last', 'first'], per_page=5)
+        first = [student.pk for student in paginator.page()]
+        payloads = [{'d': 'n'}, {'d': 'x', 'v': ['Last1', 'First1', 'S01']}, {'d': 'n', 'v': ['Last1']}]
+        cursors = ['garbage'] + [base64.urlsafe_b64encode(json.dumps(payload).encode()).decode() for payload in payloads]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual([student.pk for student in paginator.page(cursor)], first)
+
+    def test_links_keep_the_other_parameters(self):
+        page = KeysetPaginator(Student.objects.all(), ['last'], per_page=5).page(params=QueryDict('q=ab&cursor=old'))
+        self.assertTrue(page.next_query.startswith('q=ab&cursor='))
+        self.assertEqual(page.previous_query, '')
+
+
+@override_settings(JOB_RETRY_DELAY=30, JOB_STALE_AFTER=120)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        handlers = {'add': lambda job, a, b: {'sum': a + b}, 'broken': mock.Mock(side_effect=RuntimeError("boom"))}
+        patcher = mock.patch.dict(jobs._handlers, handlers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reload(self, job):
+        job.refresh_from_db()
+        return job
+
+    def test_claim_takes_the_next_runnable_job_once(self):
+        later = jobs.enqueue('add', a=1, b=2)
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(minutes=5))
+        first, second = jobs.enqueue('add', a=1, b=2), jobs.enqueue('add', a=3, b=4)
+        for skip_locked in (False, True):
+            with self.subTest(skip_locked=skip_locked):
+                Job.objects.filter(pk__in=[first.pk, second.pk]).update(status=Job.QUEUED, attempts=0)
+                with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', skip_locked):
+                    claimed = [jobs.claim('w1'), jobs.claim('w2'), jobs.claim('w3')]
+                self.assertEqual([job and job.pk for job in claimed], [first.pk, second.pk, None])
+                self.assertEqual(
+                    (claimed[0].status, claimed[0].attempts, claimed[0].worker, self.reload(claimed[1]).worker),
+                    (Job.RUNNING, 1, 'w1', 'w2'),
+                )
+
+    def test_run_records_the_result(self):
+        jobs.enqueue('add', a=1, b=2)
+        job = jobs.claim('w1')
+        jobs.job_progress(job, 0, 4, "Adding")
+        jobs.run(job)
+        self.reload(job)
+        self.assertEqual((job.status, job.result, job.progress, job.error), (Job.SUCCEEDED, {'sum': 3}, 4, ''))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_attempts_back_off_then_fail(self):
+        job = jobs.enqueue('broken', max_attempts=3)
+        for attempt, delay in ((1, 30), (2, 60)):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            before = timezone.now()
+            jobs.run(jobs.claim('w1'))
+            self.reload(job)
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, attempt))
+            self.assertIn("RuntimeError: boom", job.error)
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=delay))
+            self.assertLess(job.run_after, before + timedelta(seconds=delay + 5))
+            self.assertIsNone(jobs.claim('w1'))   # not before its retry time
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run(jobs.claim('w1'))
+        self.reload(job)
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_handler_fails(self):
+        job = jobs.enqueue('add', max_attempts=1, a=1, b=2)
+        Job.objects.filter(pk=job.pk).update(name='gone')
+        jobs.run(jobs.claim('w1'))
+        self.reload(job)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("UnknownJob: gone", job.error)
+        with self.assertRaises(jobs.UnknownJob):
+            jobs.enqueue('gone')
+
+    def test_heartbeat(self):
+        job = jobs.enqueue('add', a=1, b=2)
+        jobs.claim('w1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=1))
+        heartbeat = jobs.Heartbeat(job.pk)
+        heartbeat.stopped.wait = mock.Mock(side_effect=[False, True])   # one beat, then stop
+        with mock.patch.object(jobs.connection, 'close'):
+            heartbeat.run()
+        self.assertGreater(self.reload(job).heartbeat_at, timezone.now() - timedelta(seconds=5))
+
+    def test_requeue_stale(self):
+        stale, alive = jobs.enqueue('add', a=1, b=2), jobs.enqueue('add', a=3, b=4)
+        for worker in ('w1', 'w2'):
+            jobs.claim(worker)
+        Job.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=121))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual((self.reload(stale).status, self.reload(stale).worker), (Job.QUEUED, ''))
+        self.assertEqual(self.reload(alive).status, Job.RUNNING)
+
+    def test_run_workers_in_burst_mode(self):
+        for a in range(3):
+            jobs.enqueue('add', a=a, b=1)
+        out = io.StringIO()
+        call_command('run_workers', processes=0, burst=True, stdout=out)
+        self.assertIn("Ran 3 job(s).", out.getvalue())
+        self.assertEqual(sorted(job.result['sum'] for job in Job.objects.all()), [1, 2, 3])
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.branch = Branch.objects.create(name="Computer", code="CS")
+        self.first, self.second = User.objects.create_user('first'), User.objects.create_user('second')
+        self.student = Student.objects.create(id="S0", first="First", last="Last", email="s0@example.com", prn=1000, user=self.first, branch=self.branch)
+        self.teacher = Teacher.objects.create(user=self.second, employee_id='E1', branch=self.branch)
+
+    def loaded(self, user):
+        student, teacher = load_profiles(user.pk)
+        return student and student.pk, teacher and teacher.pk
+
+    def test_cache_hits(self):
+        self.assertEqual(self.loaded(self.first), ('S0', None))
+        with self.assertNumQueries(0):
+            student, _ = load_profiles(self.first.pk)
+            self.assertEqual(student.branch.code, 'CS')   # reference rows attached, not queried
+        self.assertEqual(self.loaded(self.second), (None, self.teacher.pk))
+
+    def test_relinked_profiles_leave_both_users(self):
+        self.assertEqual((self.loaded(self.first), self.loaded(self.second)), (('S0', None), (None, self.teacher.pk)))
+        self.student.user = self.second
+        self.student.save()
+        self.assertEqual((self.loaded(self.first), self.loaded(self.second)), ((None, None), ('S0', self.teacher.pk)))
+        self.teacher.user = self.first
+        self.teacher.save()
+        self.assertEqual((self.loaded(self.first), self.loaded(self.second)), ((None, self.teacher.pk), ('S0', None)))
+        self.student.delete()
+        self.assertEqual(self.loaded(self.second), (None, None))
+
+    def test_reference_data_change_drops_every_profile(self):
+        self.loaded(self.first)
+        Branch.objects.filter(pk=self.branch.pk).update(name="Computing")   # no signal
+        self.assertEqual(load_profiles(self.first.pk)[0].branch.name, "Computer")
+        self.branch.name = "Computing"
+        self.branch.save()
+        refdata.registry.snapshot()
+        self.assertEqual(load_profiles(self.first.pk)[0].branch.name, "Computing")
+
+    def test_async_resolve(self):
+        request = RequestFactory().get('/')
+        request.user = self.first   # stands in for the lazy user of AuthenticationMiddleware
+        request.auser = mock.AsyncMock(return_value=self.first)
+        profiles = RequestProfiles(request)
+        self.assertIs(async_to_sync(profiles.aresolve)(), profiles)
+        with self.assertNumQueries(0):
+            self.assertEqual((profiles.student.pk, profiles.teacher), ('S0', None))
+            async_to_sync(profiles.aresolve)()
+        request.auser.assert_awaited_once()
+
+        anonymous = RequestFactory().get('/')
+        anonymous.auser = mock.AsyncMock(return_value=mock.Mock(is_authenticated=False))
+        profiles = async_to_sync(RequestProfiles(anonymous).aresolve)()
+        self.assertEqual((profiles.student, profiles.teacher), (None, None))
@@ -6,4 +6,8 @@ app_name = 'main'
 urlpatterns = [
     
     path('', views.home_view, name='home'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+    path('health/', views.health, name='health'),
 ]
\ No newline at end of file
@@ -0,0 +1,65 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = 'sms:version'
+
+
+def version_key(*parts):
+    return ':'.join([VERSION_KEY_PREFIX, *map(str, parts)])
+
+
+def get_version(*parts):
+    """
+    Returns the current version token for a named piece of data, e.g. get_version('profiles').
+    Tokens are opaque strings created on first use, so an evicted key simply starts
+    a new version rather than colliding with entries cached under an older one.
+    """
+    key = version_key(*parts)
+    token = cache.get(key)
+    if token is None:
+        token = str(time.time_ns())
+        if not cache.add(key, token, None):
+            token = cache.get(key, token)
+    return token
+
+
+def bump_version(*parts):
+    """Moves a named piece of data to a new version, orphaning everything cached under the old one."""
+    cache.set(version_key(*parts), str(time.time_ns()), None)
+
+
+def get_versions(*keys):
+    """Like get_version() for several part tuples at once, in one cache round trip. Returns a list of tokens."""
+    found = cache.get_many([version_key(*parts) for parts in keys])
+    return [found.get(version_key(*parts)) or get_version(*parts) for parts in keys]
+
+
+def bump_versions(*keys):
+    """Like bump_version() for several part tuples at once."""
+    if keys:
+        token = str(time.time_ns())
+        cache.set_many({version_key(*parts): token for parts in keys}, None)
+
+
+# --- Student/course data versions (JSON API ETags) ---
+#
+# ('student', id) changes whenever anything shown to that student changes: profile, enrolments,
+# grades, attendance, or assignments/details of an enrolled course. ('course', id) changes with
+# the course's roster, grades, attendance and assignments. ('data',) covers everything, for
+# bulk maintenance jobs that do not know which rows they touched.
+
+def data_changed(student_ids=(), course_ids=()):
+    """
+    Moves the given students and courses to new data versions once the current
+    transaction commits (immediately outside one), so a poll can never pair the old
+    rows with the new version.
+    """
+    keys = [('student', pk) for pk in set(student_ids)] + [('course', pk) for pk in set(course_ids)]
+    if keys:
+        transaction.on_commit(lambda: bump_versions(*keys))
+
+
+def all_data_changed():
+    transaction.on_commit(lambda: bump_version('data'))
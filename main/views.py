@@ -1,20 +1,30 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.http import FileResponse, Http404, JsonResponse
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.urls import reverse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
 
 from student.models import Student 
 from teacher.models import Teacher 
+from .api import api_login_required
+from .models import Job
 
 
 def home_view(request):
     
     if request.user.is_authenticated:
         
-        if hasattr(request.user, 'teacher_profile'):
+        # Profiles are resolved once per request (and cached) by main.middleware.CurrentProfileMiddleware
+        if request.profiles.teacher is not None:
             return redirect('teacher:dashboard')
         
         
-        elif hasattr(request.user, 'student_profile'):
+        elif request.profiles.student is not None:
             return redirect('student:dashboard')
         
         else:
@@ -25,4 +35,78 @@ def home_view(request):
             })
     
     
-    return render(request, 'main/home.html')
\ No newline at end of file
+    return render(request, 'main/home.html')
+
+# --- Background job status (main.jobs) ---
+
+def get_job(request, job_id):
+    """The Job if the user started it or is staff, else 404."""
+    job = get_object_or_404(Job, pk=job_id)
+    if not request.user.is_staff and job.created_by_id != request.user.id:
+        raise Http404("No such job.")
+    return job
+
+
+def job_payload(job):
+    return {
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': job.progress,
+        'progress_total': job.progress_total,
+        'percent': job.percent,
+        'message': job.progress_message,
+        'result': job.result,
+        'download': reverse('main:job_download', args=[job.pk]) if job.output else None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+@login_required
+def job_detail(request, job_id):
+    """Status page for a background job; refreshes itself until the job finishes."""
+    job = get_job(request, job_id)
+    return render(request, 'main/job_detail.html', {'job': job})
+
+
+@api_login_required
+@require_safe
+def job_status(request, job_id):
+    """JSON status of a background job, for polling."""
+    job = get_job(request, job_id)
+    return JsonResponse({'job': job_payload(job)})
+
+
+@login_required
+def job_download(request, job_id):
+    """The file a finished job produced (e.g. an export); served only to its owner or staff."""
+    job = get_job(request, job_id)
+    if not job.output:
+        raise Http404("This job has no output file.")
+    return FileResponse(job.output.open('rb'), as_attachment=True, filename=job.output.name.rsplit('/', 1)[-1])
+
+
+# --- Health check (load balancer / container probes) ---
+
+@never_cache
+@require_safe
+def health(request):
+    """200 when the database and cache answer, 503 otherwise. Needs no login and touches no session."""
+    checks = {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks['database'] = 'ok'
+    except DatabaseError as exc:
+        checks['database'] = f"error: {exc}"
+    try:
+        cache.set('health-check', 1, 10)
+        checks['cache'] = 'ok' if cache.get('health-check') == 1 else 'error: value not stored'
+    except Exception as exc:  # any cache backend error
+        checks['cache'] = f"error: {exc}"
+    healthy = all(value == 'ok' for value in checks.values())
+    return JsonResponse({'status': 'ok' if healthy else 'error', **checks}, status=200 if healthy else 503)
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sms.settings')
 
 application = get_asgi_application()
+
+# Load the reference-data registry (student.refdata) before the first request
+from student import refdata  # noqa: E402
+refdata.warm()
@@ -21,7 +21,7 @@ if not SECRET_KEY:
 DEBUG = os.environ.get('DEBUG', 'True') == 'True' # Get DEBUG from env var
 
 # ALLOWED_HOSTS for Docker compatibility
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0'] # Allow connections from within Docker
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1,0.0.0.0').split(',') # Allow connections from within Docker
 
 
 # Application definition
@@ -39,11 +39,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.QueryInstrumentationMiddleware', # first, so every query of the request is counted
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware', # serves STATIC_ROOT (compressed, far-future cache headers) without a separate web server
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.CurrentProfileMiddleware', # request.profiles.student / request.profiles.teacher
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -61,6 +64,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.context_processors.fragment_cache',
             ],
         },
     },
@@ -78,10 +82,104 @@ DATABASES = {
         # Use a default value if DATABASE_URL env var is not set
         # This is useful for local development outside Docker or for initial setup
         default='sqlite:///db.sqlite3', # Fallback to SQLite if DATABASE_URL is not found
-        conn_max_age=600 # Optional: connection pool timeout
+        # Persistent connections, reused by the requests of one worker thread. Use 0 under ASGI
+        # (gunicorn.conf.py sets it for the uvicorn worker), where each request runs in a new thread.
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        conn_health_checks=True, # re-check a reused connection at the start of each request
     )
 }
 
+# PostgreSQL: a psycopg connection pool per process instead of persistent connections
+# (sized to the gunicorn threads; DB_POOL=False to turn it off)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and os.environ.get('DB_POOL', 'True') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0 # required with 'pool'
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '8')),
+        'timeout': 10, # seconds to wait for a free connection before erroring
+    }
+
+
+# Cache used for resolved student/teacher profiles and other derived data.
+# Local memory is per-process; point CACHE_BACKEND/CACHE_LOCATION at a shared backend
+# (e.g. django.core.cache.backends.filebased.FileBasedCache on a shared directory, as
+# docker-compose.yml does, or Redis/Memcached) when running several workers so invalidations
+# reach every worker. Not the database cache: the async views read the cache from the event loop.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'sms-default'),
+    }
+}
+
+# Lifetime of the per-user {% cache %} fragments in the dashboards and layouts; signals
+# invalidate them earlier (main.context_processors.fragment_cache)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# How often (seconds) each process compares its in-memory reference data (student.refdata)
+# against the shared 'refdata' version in the cache
+REFDATA_VERSION_CHECK_INTERVAL = 1.0
+
+
+# Background jobs (main.jobs, run with `manage.py run_workers`); all times in seconds
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', '2'))
+JOB_POLL_INTERVAL = 1.0 # idle workers check the queue this often
+JOB_HEARTBEAT_INTERVAL = 10 # running jobs refresh heartbeat_at this often
+JOB_STALE_AFTER = 120 # running jobs without a heartbeat for this long are requeued
+JOB_RETRY_DELAY = 30 # failed attempts are retried after JOB_RETRY_DELAY * 2**(attempt - 1)
+
+
+# Attendance storage (student.attendance): 'rows', an Attendance row per student, course and day,
+# or 'bitmap', one AttendanceBitmap per student and course with a bit per session. Switching
+# does not move existing marks: run `manage.py convert_attendance bitmap` (or `rows`) as well.
+ATTENDANCE_STORAGE = os.environ.get('ATTENDANCE_STORAGE', 'rows')
+
+# Default threshold (percent present) of the attendance-shortfall report; ?threshold= overrides it
+ATTENDANCE_SHORTFALL_PERCENT = 75
+
+# Teaching week used by `manage.py timetable generate` (teacher.timetable): weekdays (Monday = 0)
+# and the periods of each day, as (start, end) times
+TIMETABLE_WEEKDAYS = [0, 1, 2, 3, 4]
+TIMETABLE_PERIODS = [
+    ('09:00', '10:00'), ('10:00', '11:00'), ('11:15', '12:15'), ('12:15', '13:15'),
+    ('14:00', '15:00'), ('15:00', '16:00'), ('16:00', '17:00'),
+]
+
+
+# Per-request query instrumentation (main.middleware.QueryInstrumentationMiddleware)
+# Budgets are keyed by URL name; they include the session and auth queries and assume a warm
+# student.refdata registry (loaded at process start by sms/wsgi.py and sms/asgi.py). The first
+# request after a reference-data change also reloads it (4 queries) and may go over, so tests
+# load the registry before measuring a view.
+QUERY_BUDGET_DEFAULT = 25
+QUERY_BUDGETS = {
+    'student:dashboard': 6,
+    'student:profile': 5,
+    'student:courses': 6,
+    'student:grades': 8,
+    'student:attendance': 8,
+    'student:assignments': 7,
+    'student:api_profile': 5,
+    'student:api_courses': 5,
+    'student:api_grades': 6,
+    'student:api_attendance': 6,
+    'student:api_assignments': 5,
+}
+QUERY_N_PLUS_ONE_THRESHOLD = 5 # the same statement this many times in one request is logged as a likely N+1
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True' # raise instead of log (use in tests/CI)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # INFO logs one JSON line per request; WARNING only likely N+1s and budget overruns
+        'sms': {'handlers': ['console'], 'level': os.environ.get('SMS_LOG_LEVEL', 'WARNING')},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -120,9 +218,23 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') # Collect static files here
 
+# collectstatic writes content-hashed, pre-compressed (gzip/brotli) copies plus a manifest;
+# {% static %} links to the hashed names, which WhiteNoise serves with a one-year max-age.
+# DEBUG keeps plain storage so runserver and tests work without running collectstatic.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') # Where user-uploaded files will be stored
 
+# Assignment submissions (student.submissions) are streamed to MEDIA_ROOT/blobs, stored once per content
+SUBMISSION_MAX_BYTES = int(os.environ.get('SUBMISSION_MAX_MB', '25')) * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sms.settings')
 
 application = get_wsgi_application()
+
+# Load the reference-data registry (student.refdata) before the first request
+from student import refdata  # noqa: E402
+refdata.warm()
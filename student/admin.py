@@ -1,21 +1,326 @@
+import datetime
+
 from django.contrib import admin
-from .models import Student, Academic, Branch, Semester, Division, Course, Grade, Attendance, Assignment
-
-# Register your models for the admin interface
-admin.site.register(Academic)
-admin.site.register(Branch)
-admin.site.register(Semester)
-admin.site.register(Division)
-admin.site.register(Course)
-admin.site.register(Grade)
-admin.site.register(Attendance)
-admin.site.register(Assignment)
+from django.contrib.admin.views.main import ChangeList
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, QuerySet
+from .models import Student, Academic, Branch, Semester, Division, Course, Grade, GradingScheme, GradeBand, Attendance, AttendanceSummary, AttendanceBitmap, SessionDate, Assignment, StoredBlob, Submission
+from . import refdata
+from .attendance import BITMAP, apply_summary_deltas, attendance_storage, summary_delta
+from .attendance_bitmap import bit_count
+from .search import search_students
+from main.jobs import enqueue
+from main.pagination import EstimatedCountPaginator
+
+
+class RefDataChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Evaluates the page once and fills the reference FKs on those same instances
+        refdata.attach(self.result_list, *self.model_admin.refdata_fields)
+
+
+class RefDataAdminMixin:
+    """Resolves the foreign keys named in ``refdata_fields`` from student.refdata on changelist pages."""
+    refdata_fields = ()
+
+    def get_changelist(self, request, **kwargs):
+        return RefDataChangeList
+
+
+class StudentRowSearchMixin:
+    """Searches rows (grades, attendance...) by their student, through the indexed student.search."""
+    search_fields = ('student__id',) # shows the search box; matching is student.search
+    search_help_text = "Student id, name, email or PRN."
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(student__in=search_students(Student.objects.all(), search_term)), False
+
+
+# Changelists of the tables that grow with students x courses x days set
+#     paginator = EstimatedCountPaginator
+#     show_full_result_count = False
+# so a page view never runs an exact COUNT(*) over the whole table (main.pagination).
+
+@admin.register(Academic)
+class AcademicAdmin(admin.ModelAdmin):
+    list_display = ('year',)
+    search_fields = ('year',)
+
+
+@admin.register(Branch)
+class BranchAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name')
+    search_fields = ('code', 'name')
+
+
+@admin.register(Division)
+class DivisionAdmin(RefDataAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'branch', 'academic')
+    list_filter = ('academic', 'branch')
+    refdata_fields = ('branch', 'academic')
+
+
+def queue_jobs(modeladmin, request, name, **kwargs):
+    job = enqueue(name, user=request.user, **kwargs)
+    modeladmin.message_user(request, f"Queued job #{job.pk} ({name}); see Jobs for its progress.")
+
+
+@admin.register(Semester)
+class SemesterAdmin(RefDataAdminMixin, admin.ModelAdmin):
+    list_display = ('semester_number', 'academic', 'starts_on', 'ends_on')
+    list_filter = ('academic',)
+    refdata_fields = ('academic',)
+    actions = ['regrade']
+
+    @admin.action(description="Regrade selected semesters (background job)")
+    def regrade(self, request, queryset):
+        for semester_id in queryset.values_list('id', flat=True):
+            queue_jobs(self, request, 'regrade_semester', semester_id=semester_id)
+
+
+@admin.register(Course)
+class CourseAdmin(RefDataAdminMixin, admin.ModelAdmin):
+    list_display = ('code', 'name', 'branch', 'academic', 'semester', 'credits', 'enrolled_count')
+    list_filter = ('academic', 'branch', 'semester')
+    search_fields = ('code', 'name')
+    ordering = ('code',)
+    refdata_fields = ('branch', 'academic', 'semester')
+    # A select listing every student would be rendered into the form; edit enrolments by id
+    raw_id_fields = ('students_enrolled',)
+    actions = ['regrade', 'rebuild_summaries']
+
+    @admin.action(description="Regrade selected courses (background job)")
+    def regrade(self, request, queryset):
+        for course_id in queryset.values_list('id', flat=True):
+            queue_jobs(self, request, 'regrade_course', course_id=course_id)
+
+    @admin.action(description="Rebuild attendance summaries of selected courses (background job)")
+    def rebuild_summaries(self, request, queryset):
+        queue_jobs(self, request, 'rebuild_attendance_summaries', course_ids=list(queryset.values_list('id', flat=True)))
+
+
+@admin.register(Grade)
+class GradeAdmin(StudentRowSearchMixin, admin.ModelAdmin):
+    list_display = ('student', 'course', 'score', 'grade_letter', 'grade_point')
+    # Choices come from the (small) Semester table, not a DISTINCT over the grades
+    list_filter = ('course__semester',)
+    list_select_related = ('student', 'course')
+    autocomplete_fields = ('student', 'course')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Assignment)
+class AssignmentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'course', 'due_date', 'max_score')
+    list_select_related = ('course',)
+    search_fields = ('title', 'course__code')
+    autocomplete_fields = ('course',)
+    date_hierarchy = 'due_date'
+
+
+@admin.register(Submission)
+class SubmissionAdmin(StudentRowSearchMixin, admin.ModelAdmin):
+    list_display = ('student', 'assignment', 'filename', 'submitted_at')
+    list_select_related = ('student', 'assignment__course')
+    autocomplete_fields = ('student',)
+    raw_id_fields = ('assignment', 'blob')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    """Read-only: blobs are written by student.submissions and removed by ``manage.py prune_blobs``."""
+    list_display = ('sha256', 'size', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'size', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 # You can customize the admin display for Student
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(RefDataAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'first', 'last', 'email', 'prn', 'division', 'academic', 'branch', 'semester')
     list_filter = ('academic', 'branch', 'semester', 'division')
-    search_fields = ('id', 'first', 'last', 'email', 'prn')
-    # You might want to prefetch related objects for performance in admin lists
-    # raw_id_fields = ('academic_year', 'branch', 'current_semester', 'division') # Useful for many related objects
+    search_fields = ('id', 'first', 'last', 'email', 'prn') # shows the search box; matching is student.search
+    search_help_text = "Id, name, email or PRN; each word matches the start of a word."
+    # Division/academic/branch/semester come from the in-process reference data, not joins
+    refdata_fields = ('division', 'academic', 'branch', 'semester')
+    raw_id_fields = ('user',)
+    ordering = ('last', 'first') # student_name_idx; also orders the autocomplete results
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed prefix search instead of OR'd icontains scans over every search field
+        return search_students(queryset, search_term), False
+
+
+class ProbedDatesQuerySet(QuerySet):
+    """
+    Admin queryset whose dates() (the date hierarchy's year/month/day links) probes an
+    index instead of truncating the date of every row: one MIN(field) per distinct period,
+    each starting after the previous period (a loose index scan). Returns a list.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # The hierarchy's MIN(date), MAX(date): SQLite answers either alone from the index
+        # but scans the table for both in one query
+        if len(kwargs) > 1 and not args and all(type(value) in (Min, Max) for value in kwargs.values()):
+            return {name: super(ProbedDatesQuerySet, self).aggregate(**{name: value})[name] for name, value in kwargs.items()}
+        return super().aggregate(*args, **kwargs)
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        queryset = self.order_by()
+        found = []
+        first = queryset.aggregate(first=Min(field_name))['first']
+        while first is not None:
+            period = _period_start(first, kind)
+            found.append(period)
+            # The probe's bound goes ahead of the page's own filters: SQLite seeks the index
+            # on the first of several lower bounds and only tests the rest
+            after = self.model._base_manager.using(self.db).filter(**{f'{field_name}__gte': _next_period(period, kind)})
+            first = (after & queryset).aggregate(first=Min(field_name))['first']
+        return found if order == 'ASC' else found[::-1]
+
+
+def _period_start(day, kind):
+    if kind == 'year':
+        return datetime.date(day.year, 1, 1)
+    if kind == 'month':
+        return datetime.date(day.year, day.month, 1)
+    return day
+
+
+def _next_period(period, kind):
+    if kind == 'year':
+        return datetime.date(period.year + 1, 1, 1)
+    if kind == 'month':
+        return datetime.date(period.year + period.month // 12, period.month % 12 + 1, 1)
+    return period + datetime.timedelta(days=1)
+
+
+@admin.register(Attendance)
+class AttendanceAdmin(StudentRowSearchMixin, admin.ModelAdmin):
+    """
+    Keeps AttendanceSummary in step with every add, edit and delete made through the admin.
+    Read-only when ATTENDANCE_STORAGE is 'bitmap': the rows are then not the attendance, and
+    writing them would move the summaries away from the bitmaps.
+    """
+    list_display = ('student', 'course', 'date', 'is_present')
+    list_filter = ('is_present', 'date')
+    list_select_related = ('student', 'course')
+    autocomplete_fields = ('student', 'course')
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id') # attendance_date_idx, read backwards: no sort
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return attendance_storage() != BITMAP and super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return attendance_storage() != BITMAP and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return attendance_storage() != BITMAP and super().has_delete_permission(request, obj)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return ProbedDatesQuerySet(model=queryset.model, query=queryset.query, using=queryset._db)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old = Attendance.objects.filter(pk=obj.pk).first() if change else None
+            super().save_model(request, obj, form, change)
+            apply_summary_deltas(summary_delta(old, obj))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            apply_summary_deltas(summary_delta(old=obj))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            removed = (
+                queryset.values('student_id', 'course_id')
+                .annotate(sessions=Count('id'), present=Count('id', filter=Q(is_present=True)))
+                .order_by()
+            )
+            deltas = {(row['student_id'], row['course_id']): (-row['sessions'], -row['present']) for row in removed}
+            super().delete_queryset(request, queryset)
+            apply_summary_deltas(deltas)
+
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(StudentRowSearchMixin, admin.ModelAdmin):
+    list_display = ('student', 'course', 'sessions', 'present')
+    list_select_related = ('student', 'course')
+    readonly_fields = ('student', 'course', 'sessions', 'present')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SessionDate)
+class SessionDateAdmin(admin.ModelAdmin):
+    """Read-only: sessions are numbered by the bitmap attendance storage (student.attendance_bitmap)."""
+    list_display = ('course', 'date', 'index')
+    list_select_related = ('course',)
+    autocomplete_fields = ('course',)
+    readonly_fields = ('course', 'date', 'index')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendanceBitmap)
+class AttendanceBitmapAdmin(StudentRowSearchMixin, admin.ModelAdmin):
+    """Read-only: bitmaps change through student.attendance.mark_attendance, which keeps the summaries in step."""
+    list_display = ('student', 'course', 'sessions', 'present_count')
+    list_select_related = ('student', 'course')
+    readonly_fields = ('student', 'course', 'sessions', 'present_count')
+    exclude = ('marked', 'present')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Sessions")
+    def sessions(self, obj):
+        return bit_count(obj.marked)
+
+    @admin.display(description="Present")
+    def present_count(self, obj):
+        return bit_count(obj.present)
+
+
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    extra = 0
+
+
+@admin.register(GradingScheme)
+class GradingSchemeAdmin(RefDataAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'branch', 'semester')
+    refdata_fields = ('branch', 'semester')
+    inlines = [GradeBandInline]
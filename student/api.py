@@ -0,0 +1,106 @@
+"""
+Read-only JSON versions of the student pages, for the mobile app.
+
+Every response carries an ETag built from the student's data version (main.versioning),
+so a poll with a matching If-None-Match gets a 304 without querying grades, attendance
+or assignments. Rows are serialized from values() projections, not model instances.
+"""
+from functools import wraps
+
+from django.db.models import F
+from django.http import JsonResponse
+
+from main.api import error, page_links, versioned_json
+from main.pagination import paginate
+from main.versioning import get_versions
+from .attendance import attendance_records
+from .grading import cgpa, semester_gpas
+from .models import Assignment, AttendanceSummary, Grade, Student
+
+
+def student_etag(request, *args, **kwargs):
+    student = request.profiles.student
+    if student is None:
+        return None
+    # 'profiles' covers renamed divisions/branches/years, 'data' bulk maintenance jobs
+    return f"s{student.pk}-" + '-'.join(get_versions(('student', student.pk), ('profiles',), ('data',)))
+
+
+def student_api(view):
+    """versioned_json with the student ETag; the view receives the Student as a second argument."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        student = request.profiles.student
+        if student is None:
+            return error('No student profile is linked to this account.', 404)
+        return view(request, student, *args, **kwargs)
+    return versioned_json(student_etag)(wrapper)
+
+
+@student_api
+def profile(request, student):
+    """The student's profile (mirrors student:profile)."""
+    data = Student.objects.filter(pk=student.pk).values(
+        'id', 'first', 'last', 'email', 'prn',
+        division_name=F('division__name'),
+        branch_name=F('branch__name'),
+        branch_code=F('branch__code'),
+        academic_year=F('academic__year'),
+        semester_number=F('semester__semester_number'),
+    ).get()
+    return JsonResponse({'student': data})
+
+
+@student_api
+def courses(request, student):
+    """Courses the student is enrolled in (mirrors student:courses)."""
+    rows = student.enrolled_courses.order_by('code').values(
+        'id', 'name', 'code', 'credits',
+        branch_name=F('branch__name'),
+        semester_number=F('semester__semester_number'),
+        academic_year=F('semester__academic__year'),
+    )
+    return JsonResponse({'courses': list(rows)})
+
+
+@student_api
+def grades(request, student):
+    """Grades per course plus SGPA per semester and CGPA (mirrors student:grades)."""
+    rows = Grade.objects.filter(student=student).order_by('course__code').values(
+        'course_id', 'score', 'grade_letter', 'grade_point',
+        course_code=F('course__code'),
+        course_name=F('course__name'),
+        credits=F('course__credits'),
+        semester_id=F('course__semester_id'),
+    )
+    sgpa = [{'semester_id': semester_id, 'sgpa': value} for semester_id, value in semester_gpas(student).items()]
+    return JsonResponse({'grades': list(rows), 'semesters': sgpa, 'cgpa': cgpa(student)})
+
+
+@student_api
+def attendance(request, student):
+    """
+    Per-course attendance summary plus one keyset page of records, newest first
+    (mirrors student:attendance). Follow ``next`` with ?cursor=.
+    """
+    summaries = AttendanceSummary.objects.filter(student=student).order_by('course__code').values(
+        'course_id', 'sessions', 'present',
+        course_code=F('course__code'),
+        course_name=F('course__name'),
+    )
+    records = attendance_records().filter(student=student).values(
+        'date', 'is_present', course_code=F('course__code'),
+    )
+    page = paginate(request, records, ['-date', 'course__code'])
+    return JsonResponse({'summaries': list(summaries), 'records': page.object_list, **page_links(page)})
+
+
+@student_api
+def assignments(request, student):
+    """One keyset page of assignments for the enrolled courses, by due date (mirrors student:assignments)."""
+    rows = Assignment.objects.filter(course__students_enrolled=student).values(
+        'id', 'title', 'description', 'due_date', 'max_score', 'course_id',
+        course_code=F('course__code'),
+    )
+    page = paginate(request, rows, ['due_date'])
+    return JsonResponse({'assignments': page.object_list, **page_links(page)})
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from .search import install_search_index
+    install_search_index(using)
 
 
 class StudentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (keeps the enrolment counters in step)
+        # The search index (student.search) is database-specific DDL outside the models
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,225 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+
+from main.versioning import all_data_changed, data_changed
+
+from . import attendance_bitmap
+from .models import Attendance, AttendanceSummary, Course
+
+# ATTENDANCE_STORAGE values: an Attendance row per student, course and day, or a bitmap per
+# student and course (student.attendance_bitmap)
+ROWS = 'rows'
+BITMAP = 'bitmap'
+
+# Form values used by the teacher attendance sheet for each student row.
+PRESENT = 'present'
+ABSENT = 'absent'
+NO_CHANGE = 'no_change'
+
+
+def attendance_storage():
+    storage = settings.ATTENDANCE_STORAGE
+    if storage not in (ROWS, BITMAP):
+        raise ImproperlyConfigured(f"ATTENDANCE_STORAGE must be '{ROWS}' or '{BITMAP}', not {storage!r}.")
+    return storage
+
+
+def attendance_records():
+    """
+    Every attendance mark in the configured storage, as a queryset with Attendance's field
+    names (student, course, date, is_present): filter, order, paginate and export it the
+    same way whichever storage is in use.
+    """
+    if attendance_storage() == BITMAP:
+        return attendance_bitmap.records()
+    return Attendance.objects.all()
+
+
+def attendance_on(course, date, student_ids):
+    """{student_id: is_present} for the students in ``student_ids`` marked in ``course`` on ``date``."""
+    marks = attendance_records().filter(course=course, date=date, student_id__in=list(student_ids))
+    return dict(marks.values_list('student_id', 'is_present'))
+
+
+def parse_attendance_post(data, student_ids):
+    """
+    Reads the ``attendance_<student_id>`` radio buttons from a submitted attendance sheet.
+    Only students in ``student_ids`` are considered, so a tampered form cannot mark
+    students outside the selected course/division. Returns {student_id: is_present}.
+    """
+    statuses = {}
+    for student_id in student_ids:
+        value = data.get(f'attendance_{student_id}', NO_CHANGE)
+        if value == PRESENT:
+            statuses[student_id] = True
+        elif value == ABSENT:
+            statuses[student_id] = False
+    return statuses
+
+
+def mark_attendance(course, date, statuses):
+    """
+    Saves a whole division-day of attendance for ``course`` in one transaction.
+    ``statuses`` maps student id -> is_present. Existing marks for the same
+    (student, course, date) are replaced through the storage's unique key, so the write
+    is a single INSERT ... ON CONFLICT DO UPDATE statement.
+    AttendanceSummary totals are adjusted by the difference against the previous marks.
+    Returns the number of students marked.
+    """
+    if not statuses:
+        return 0
+
+    with transaction.atomic():
+        # Serialise concurrent submissions for the same course so the summary deltas stay exact
+        list(Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True))
+        if attendance_storage() == BITMAP:
+            previous = attendance_bitmap.write_marks(course, date, statuses)
+        else:
+            previous = _write_rows(course, date, statuses)
+
+        deltas = {}
+        for student_id, is_present in statuses.items():
+            if student_id in previous:
+                deltas[(student_id, course.pk)] = (0, int(is_present) - int(previous[student_id]))
+            else:
+                deltas[(student_id, course.pk)] = (1, int(is_present))
+        apply_summary_deltas(deltas)
+    return len(statuses)
+
+
+def _write_rows(course, date, statuses):
+    """Upserts one Attendance row per student; returns the previous marks {student_id: is_present}."""
+    previous = dict(
+        Attendance.objects.filter(course=course, date=date, student_id__in=list(statuses))
+        .values_list('student_id', 'is_present')
+    )
+    Attendance.objects.bulk_create(
+        [
+            Attendance(student_id=student_id, course=course, date=date, is_present=is_present)
+            for student_id, is_present in statuses.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['student', 'course', 'date'],
+        update_fields=['is_present'],
+    )
+    return previous
+
+
+def summary_delta(old=None, new=None):
+    """
+    Returns the summary deltas for replacing Attendance ``old`` with ``new``
+    (either may be None for a create or a delete), keyed by (student_id, course_id).
+    """
+    deltas = defaultdict(lambda: (0, 0))
+    if old is not None:
+        sessions, present = deltas[(old.student_id, old.course_id)]
+        deltas[(old.student_id, old.course_id)] = (sessions - 1, present - int(old.is_present))
+    if new is not None:
+        sessions, present = deltas[(new.student_id, new.course_id)]
+        deltas[(new.student_id, new.course_id)] = (sessions + 1, present + int(new.is_present))
+    return dict(deltas)
+
+
+def apply_summary_deltas(deltas):
+    """
+    Applies {(student_id, course_id): (sessions_delta, present_delta)} to AttendanceSummary.
+    Students sharing the same course and delta are updated together, so a division-day
+    costs one insert for missing summary rows plus one UPDATE per distinct delta.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        AttendanceSummary.objects.bulk_create(
+            [AttendanceSummary(student_id=student_id, course_id=course_id) for student_id, course_id in deltas],
+            ignore_conflicts=True,
+        )
+        groups = defaultdict(list)
+        for (student_id, course_id), delta in deltas.items():
+            groups[(course_id, delta)].append(student_id)
+        for (course_id, (sessions, present)), student_ids in groups.items():
+            AttendanceSummary.objects.filter(course_id=course_id, student_id__in=student_ids).update(
+                sessions=F('sessions') + sessions,
+                present=F('present') + present,
+            )
+        data_changed(
+            student_ids=[student_id for student_id, _ in deltas],
+            course_ids=[course_id for _, course_id in deltas],
+        )
+
+
+def shortfall_threshold(value=None):
+    """A shortfall threshold percentage from ``value`` (a string or number), or ATTENDANCE_SHORTFALL_PERCENT if it is missing or invalid."""
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        return settings.ATTENDANCE_SHORTFALL_PERCENT
+    return threshold if 0 < threshold <= 100 else settings.ATTENDANCE_SHORTFALL_PERCENT
+
+
+def attendance_shortfall(summaries, threshold):
+    """
+    The AttendanceSummary rows of ``summaries`` below ``threshold`` percent present, for
+    students still enrolled in the course, annotated with ``percent``. One query over the
+    running totals: the marks themselves are not read.
+    """
+    return (
+        summaries.filter(sessions__gt=0, course__students_enrolled=F('student_id'))
+        .alias(present_hundredths=F('present') * 100)
+        .filter(present_hundredths__lt=F('sessions') * threshold)
+        .annotate(percent=ExpressionWrapper(F('present') * 100.0 / F('sessions'), output_field=FloatField()))
+    )
+
+
+def sessions_to_recover(sessions, present, threshold):
+    """How many sessions in a row a student must attend to reach ``threshold`` percent (None at 100%)."""
+    if threshold >= 100:
+        return None
+    missing = threshold * sessions - 100 * present
+    return max(0, math.ceil(missing / (100 - threshold)))
+
+
+def rebuild_attendance_summaries(course_ids=None, batch_size=1000):
+    """
+    Recomputes AttendanceSummary from the attendance storage, optionally limited to some courses.
+    Returns the number of summary rows written.
+    """
+    summaries = AttendanceSummary.objects.all()
+    if course_ids is not None:
+        summaries = summaries.filter(course_id__in=course_ids)
+
+    if attendance_storage() == BITMAP:
+        # Counted from the bits, without expanding them into rows
+        rebuilt = attendance_bitmap.summaries(course_ids)
+    else:
+        attendance = Attendance.objects.all()
+        if course_ids is not None:
+            attendance = attendance.filter(course_id__in=course_ids)
+        totals = (
+            attendance.values('student_id', 'course_id')
+            .annotate(sessions=Count('id'), present=Count('id', filter=Q(is_present=True)))
+            .order_by()
+        )
+        rebuilt = (AttendanceSummary(**row) for row in totals.iterator(chunk_size=batch_size))
+
+    written = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch = []
+        for summary in rebuilt:
+            batch.append(summary)
+            if len(batch) >= batch_size:
+                AttendanceSummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            AttendanceSummary.objects.bulk_create(batch)
+            written += len(batch)
+        all_data_changed()
+    return written
@@ -0,0 +1,202 @@
+"""
+Bitmap attendance storage: one AttendanceBitmap row per student and course, holding a bit
+per session of the course (SessionDate), instead of one Attendance row per student, course
+and day. Selected with ATTENDANCE_STORAGE = 'bitmap'; student.attendance dispatches to it.
+
+records() presents the bitmaps with Attendance's field names (student, course, date,
+is_present; one row per mark) by joining each bitmap to its course's session dates and
+testing the session's bit in SQL (BitTest), so the same filters, ordering, pagination and
+exports work on either storage.
+
+``manage.py convert_attendance`` moves courses between the two storages.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import NotSupportedError, transaction
+from django.db.models import BooleanField, F, Func, Max
+
+from .models import Attendance, AttendanceBitmap, AttendanceSummary, Course, SessionDate
+
+# Byte n is at (1-based) position n + 1: instr() over it reads a blob byte as a number on SQLite
+BYTE_VALUES = "X'" + ''.join(f'{value:02X}' for value in range(256)) + "'"
+
+CONVERT_BATCH_SIZE = 5000
+
+
+def get_bit(bitmap, index):
+    byte = index >> 3
+    return byte < len(bitmap) and bool(bitmap[byte] >> (index & 7) & 1)
+
+
+def with_bit(bitmap, index, value):
+    """``bitmap`` (bytes) with bit ``index`` set to ``value``, grown as needed."""
+    bits = bytearray(bitmap)
+    byte = index >> 3
+    if byte >= len(bits):
+        bits.extend(bytes(byte + 1 - len(bits)))
+    if value:
+        bits[byte] |= 1 << (index & 7)
+    else:
+        bits[byte] &= ~(1 << (index & 7)) & 0xFF
+    return bytes(bits)
+
+
+def bit_count(bitmap):
+    return int.from_bytes(bitmap, 'little').bit_count()
+
+
+class BitTest(Func):
+    """Whether bit ``index`` of the binary column ``bitmap`` is set; false past its end."""
+    arity = 2
+    output_field = BooleanField()
+
+    def _compile(self, compiler):
+        bitmap, index = (compiler.compile(expression) for expression in self.get_source_expressions())
+        return bitmap, index
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError("Bitmap attendance storage needs SQLite or PostgreSQL.")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (bitmap, bitmap_params), (index, index_params) = self._compile(compiler)
+        sql = f"((instr({BYTE_VALUES}, substr({bitmap}, {index} / 8 + 1, 1)) - 1) >> ({index} %% 8) & 1)"
+        return sql, (*bitmap_params, *index_params, *index_params)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        (bitmap, bitmap_params), (index, index_params) = self._compile(compiler)
+        # get_bit() numbers bits from the least significant bit of the first byte, as we do,
+        # and fails past the end (CASE, unlike AND, is evaluated in order)
+        sql = f"CASE WHEN octet_length({bitmap}) > {index} / 8 THEN get_bit({bitmap}, {index}) = 1 ELSE false END"
+        return sql, (*bitmap_params, *index_params, *bitmap_params, *index_params)
+
+
+def records():
+    """Every mark in the bitmap storage, as AttendanceBitmap rows annotated with ``date`` and ``is_present``."""
+    index = F('course__session_dates__index')
+    # Annotations share the one join to session_dates; a filter() naming it would add another
+    return AttendanceBitmap.objects.annotate(
+        date=F('course__session_dates__date'),
+        is_present=BitTest('present', index),
+    ).alias(has_mark=BitTest('marked', index)).filter(has_mark=True)
+
+
+def session_index(course, date):
+    """The bit of ``course``'s session on ``date``, numbering a new session if needed (hold the course lock)."""
+    index = SessionDate.objects.filter(course=course, date=date).values_list('index', flat=True).first()
+    if index is None:
+        last = SessionDate.objects.filter(course=course).aggregate(last=Max('index'))['last']
+        index = 0 if last is None else last + 1
+        SessionDate.objects.create(course=course, date=date, index=index)
+    return index
+
+
+def write_marks(course, date, statuses):
+    """
+    Sets ``statuses`` ({student_id: is_present}) for ``course`` on ``date`` with one upsert
+    of the students' bitmaps. Returns their previous marks that day, for the summary
+    deltas of student.attendance.mark_attendance, which holds the course lock.
+    """
+    index = session_index(course, date)
+    current = {
+        student_id: (bytes(marked), bytes(present))
+        for student_id, marked, present in AttendanceBitmap.objects.filter(course=course, student_id__in=list(statuses))
+        .values_list('student_id', 'marked', 'present')
+    }
+    previous = {}
+    bitmaps = []
+    for student_id, is_present in statuses.items():
+        marked, present = current.get(student_id, (b'', b''))
+        if get_bit(marked, index):
+            previous[student_id] = get_bit(present, index)
+        bitmaps.append(AttendanceBitmap(
+            student_id=student_id, course=course,
+            marked=with_bit(marked, index, True), present=with_bit(present, index, is_present),
+        ))
+    AttendanceBitmap.objects.bulk_create(
+        bitmaps, update_conflicts=True, unique_fields=['student', 'course'], update_fields=['marked', 'present'],
+    )
+    return previous
+
+
+def summaries(course_ids=None):
+    """Yields an AttendanceSummary per bitmap, counted from its bits."""
+    bitmaps = AttendanceBitmap.objects.all()
+    if course_ids is not None:
+        bitmaps = bitmaps.filter(course_id__in=course_ids)
+    rows = bitmaps.values_list('student_id', 'course_id', 'marked', 'present')
+    for student_id, course_id, marked, present in rows.iterator(chunk_size=CONVERT_BATCH_SIZE):
+        yield AttendanceSummary(student_id=student_id, course_id=course_id, sessions=bit_count(marked), present=bit_count(present))
+
+
+# --- Conversion between the two storages ---
+
+def _marks(course):
+    """Every mark of ``course`` in either storage: {(student_id, date): is_present}; rows win."""
+    dates = dict(SessionDate.objects.filter(course=course).values_list('index', 'date'))
+    marks = {}
+    for student_id, marked, present in AttendanceBitmap.objects.filter(course=course).values_list('student_id', 'marked', 'present'):
+        marked, present = bytes(marked), bytes(present)
+        for index, date in dates.items():
+            if get_bit(marked, index):
+                marks[(student_id, date)] = get_bit(present, index)
+    rows = Attendance.objects.filter(course=course).values_list('student_id', 'date', 'is_present')
+    for student_id, date, is_present in rows.iterator(chunk_size=CONVERT_BATCH_SIZE):
+        marks[(student_id, date)] = is_present
+    return marks
+
+
+def _write_bitmaps(course, marks):
+    dates = sorted({date for _, date in marks})
+    column = {date: index for index, date in enumerate(dates)}
+    by_student = defaultdict(list)
+    for (student_id, date), is_present in marks.items():
+        by_student[student_id].append((column[date], is_present))
+
+    SessionDate.objects.bulk_create(
+        [SessionDate(course=course, date=date, index=index) for index, date in enumerate(dates)],
+        batch_size=CONVERT_BATCH_SIZE,
+    )
+    student_ids = list(by_student)
+    marked = np.zeros((len(student_ids), len(dates)), dtype=bool)
+    present = np.zeros_like(marked)
+    for row, student_id in enumerate(student_ids):
+        columns, values = zip(*by_student[student_id])
+        marked[row, list(columns)] = True
+        present[row, list(columns)] = values
+    marked_bits = np.packbits(marked, axis=1, bitorder='little')
+    present_bits = np.packbits(present, axis=1, bitorder='little')
+    AttendanceBitmap.objects.bulk_create(
+        [
+            AttendanceBitmap(student_id=student_id, course=course, marked=marked_bits[row].tobytes(), present=present_bits[row].tobytes())
+            for row, student_id in enumerate(student_ids)
+        ],
+        batch_size=CONVERT_BATCH_SIZE,
+    )
+
+
+def _write_rows(course, marks):
+    Attendance.objects.bulk_create(
+        (Attendance(student_id=student_id, course=course, date=date, is_present=is_present) for (student_id, date), is_present in marks.items()),
+        batch_size=CONVERT_BATCH_SIZE,
+    )
+
+
+def convert_course(course, to_bitmap):
+    """
+    Moves every attendance mark of ``course`` into the bitmap storage (``to_bitmap``) or
+    back into Attendance rows, in one transaction. Marks already in the target storage are
+    kept; where both storages have a mark for the same day, the row wins. Returns the
+    number of marks. The totals in AttendanceSummary are unchanged.
+    """
+    with transaction.atomic():
+        # The same lock as mark_attendance: no marking while the course moves
+        list(Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True))
+        marks = _marks(course)
+        # Raw: the marks move without changing, so no per-row post_delete signals
+        Attendance.objects.filter(course=course)._raw_delete(Attendance.objects.db)
+        AttendanceBitmap.objects.filter(course=course).delete()
+        SessionDate.objects.filter(course=course).delete()
+        if marks:
+            (_write_bitmaps if to_bitmap else _write_rows)(course, marks)
+    return len(marks)
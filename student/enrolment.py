@@ -0,0 +1,104 @@
+"""
+Enrolment counters: Course.enrolled_count and the per-division CourseDivisionCount rows.
+
+They are kept in step with Course.students_enrolled by the receivers in student.signals
+(add/remove/clear from either side, a student changing division, a student being deleted).
+Writes that skip those signals (bulk_create/update() on the enrolment table or on
+Student.division, deleting a Division) must call rebuild_enrolment_counts() for the
+courses they touch, or run ``manage.py rebuild_enrolment_counts``.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Course, CourseDivisionCount, Student
+
+Enrolment = Course.students_enrolled.through
+
+
+def enrolment_deltas(pairs, sign=1):
+    """
+    Counter deltas for adding (``sign`` 1) or removing (-1) the (student_id, course_id)
+    enrolments in ``pairs``: ({course_id: delta}, {(course_id, division_id): delta}).
+    """
+    pairs = list(pairs)
+    division_of = dict(
+        Student.objects.filter(pk__in={student_id for student_id, _ in pairs}).values_list('pk', 'division_id')
+    )
+    course_deltas = defaultdict(int)
+    division_deltas = defaultdict(int)
+    for student_id, course_id in pairs:
+        course_deltas[course_id] += sign
+        division_deltas[(course_id, division_of.get(student_id))] += sign
+    return dict(course_deltas), dict(division_deltas)
+
+
+def division_move_deltas(course_ids, old_division_id, new_division_id):
+    """Per-division deltas for one student moving between divisions in each of ``course_ids``."""
+    deltas = {}
+    for course_id in course_ids:
+        deltas[(course_id, old_division_id)] = -1
+        deltas[(course_id, new_division_id)] = 1
+    return deltas
+
+
+def apply_enrolment_deltas(course_deltas=None, division_deltas=None):
+    """
+    Applies {course_id: delta} to Course.enrolled_count and {(course_id, division_id): delta}
+    to CourseDivisionCount. Rows sharing a delta are updated together, so enrolling a whole
+    division costs one insert for missing counter rows plus an UPDATE per distinct delta.
+    """
+    course_deltas = {key: delta for key, delta in (course_deltas or {}).items() if delta}
+    division_deltas = {key: delta for key, delta in (division_deltas or {}).items() if delta}
+    if not course_deltas and not division_deltas:
+        return
+
+    with transaction.atomic():
+        courses_by_delta = defaultdict(list)
+        for course_id, delta in course_deltas.items():
+            courses_by_delta[delta].append(course_id)
+        for delta, course_ids in courses_by_delta.items():
+            Course.objects.filter(pk__in=course_ids).update(enrolled_count=F('enrolled_count') + delta)
+
+        CourseDivisionCount.objects.bulk_create(
+            [CourseDivisionCount(course_id=course_id, division_id=division_id) for course_id, division_id in division_deltas],
+            ignore_conflicts=True,
+        )
+        groups = defaultdict(list)
+        for (course_id, division_id), delta in division_deltas.items():
+            groups[(division_id, delta)].append(course_id)
+        for (division_id, delta), course_ids in groups.items():
+            CourseDivisionCount.objects.filter(course_id__in=course_ids, division_id=division_id).update(
+                enrolled=F('enrolled') + delta,
+            )
+
+
+def rebuild_enrolment_counts(course_ids=None):
+    """
+    Recomputes the enrolment counters from the enrolment table, optionally limited to some
+    courses. Returns the number of CourseDivisionCount rows written.
+    """
+    courses = Course.objects.all()
+    enrolments = Enrolment.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+        enrolments = enrolments.filter(course_id__in=course_ids)
+
+    per_division = (
+        enrolments.values('course_id', division_id=F('student__division_id'))
+        .annotate(enrolled=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rows = [CourseDivisionCount(**row) for row in per_division]
+        totals = defaultdict(int)
+        for row in rows:
+            totals[row.course_id] += row.enrolled
+
+        CourseDivisionCount.objects.filter(course__in=courses).delete()
+        CourseDivisionCount.objects.bulk_create(rows, batch_size=1000)
+        courses.update(enrolled_count=0)
+        counted = [Course(pk=course_id, enrolled_count=total) for course_id, total in totals.items()]
+        Course.objects.bulk_update(counted, ['enrolled_count'], batch_size=1000)
+    return len(rows)
@@ -0,0 +1,190 @@
+"""
+Streaming CSV exports.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a server-side cursor
+on PostgreSQL) and written through csv.writer one line at a time into a
+StreamingHttpResponse, so memory stays flat and the first byte is sent immediately
+however many rows the export contains. stream_table() does the same for an HTML page.
+"""
+import csv
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.dateparse import parse_date
+
+from .attendance import attendance_records, attendance_shortfall, sessions_to_recover
+from .models import AttendanceSummary, Grade
+
+EXPORT_CHUNK_SIZE = 2000
+
+ATTENDANCE_HEADER = ['Date', 'Course Code', 'Student ID', 'First Name', 'Last Name', 'Division', 'Status']
+GRADE_HEADER = ['Course Code', 'Course', 'Student ID', 'First Name', 'Last Name', 'Division', 'Score', 'Grade Letter', 'Grade Point']
+SHORTFALL_HEADER = ['Course Code', 'Course', 'Student ID', 'First Name', 'Last Name', 'Division', 'Sessions', 'Present', 'Attendance %', 'Sessions to Recover']
+TRANSCRIPT_HEADER = ['Semester', 'Academic Year', 'Course Code', 'Course', 'Credits', 'Score', 'Grade Letter', 'Grade Point']
+
+
+class Echo:
+    """File-like object whose write() just returns the value, so csv.writer hands us each line."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def csv_response(filename, header, rows):
+    response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Where stream_table() splits a rendered page to stream the table rows in
+TABLE_ROWS_MARKER = '<!-- table rows -->'
+
+
+def stream_table(request, template_name, context, rows):
+    """
+    Streams ``template_name`` (which contains TABLE_ROWS_MARKER inside a <tbody>) with
+    ``rows`` rendered into it EXPORT_CHUNK_SIZE rows at a time through main/table_rows.html,
+    so a long HTML report is sent in bounded memory like the CSV exports.
+    """
+    head, tail = render_to_string(template_name, context, request).split(TABLE_ROWS_MARKER, 1)
+    row_template = get_template('main/table_rows.html')
+
+    def chunks():
+        yield head
+        rows_iter = iter(rows)
+        while batch := list(islice(rows_iter, EXPORT_CHUNK_SIZE)):
+            yield row_template.render({'rows': batch})
+        yield tail
+
+    return StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
+
+
+def attendance_rows(queryset):
+    """Yields CSV rows for an Attendance queryset, ordered by date then student."""
+    rows = queryset.order_by('date', 'course__code', 'student__last', 'student__first').values_list(
+        'date', 'course__code', 'student_id', 'student__first', 'student__last', 'student__division__name', 'is_present'
+    )
+    for *values, is_present in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [*values, 'Present' if is_present else 'Absent']
+
+
+def grade_rows(queryset):
+    """Yields CSV rows for a Grade queryset, ordered by course then student name."""
+    rows = queryset.order_by('course__code', 'student__last', 'student__first').values_list(
+        'course__code', 'course__name', 'student_id', 'student__first', 'student__last',
+        'student__division__name', 'score', 'grade_letter', 'grade_point',
+    )
+    return rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def shortfall_rows(summaries, threshold):
+    """Yields CSV rows for the AttendanceSummary rows of ``summaries`` below ``threshold`` percent, by course then student name."""
+    rows = attendance_shortfall(summaries, threshold).order_by('course__code', 'student__last', 'student__first').values_list(
+        'course__code', 'course__name', 'student_id', 'student__first', 'student__last',
+        'student__division__name', 'sessions', 'present', 'percent',
+    )
+    for *values, sessions, present, percent in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [*values, sessions, present, f"{percent:.1f}", sessions_to_recover(sessions, present, threshold)]
+
+
+def transcript_rows(student):
+    """Yields one CSV row per graded course for ``student``, in semester order."""
+    rows = Grade.objects.filter(student=student).order_by('course__semester__academic__year', 'course__semester__semester_number', 'course__code').values_list(
+        'course__semester__semester_number', 'course__semester__academic__year', 'course__code', 'course__name',
+        'course__credits', 'score', 'grade_letter', 'grade_point',
+    )
+    return rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def write_csv(handle, header, rows, on_progress=None, every=EXPORT_CHUNK_SIZE):
+    """
+    Writes an export to an open text file instead of a response (background jobs).
+    ``on_progress(rows_written)`` is called every ``every`` rows. Returns the row count.
+    """
+    writer = csv.writer(handle)
+    writer.writerow(header)
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+        if on_progress and written % every == 0:
+            on_progress(written)
+    return written
+
+
+def attendance_export(filename, queryset):
+    return csv_response(filename, ATTENDANCE_HEADER, attendance_rows(queryset))
+
+
+def grade_export(filename, queryset):
+    return csv_response(filename, GRADE_HEADER, grade_rows(queryset))
+
+
+def shortfall_export(filename, summaries, threshold):
+    return csv_response(filename, SHORTFALL_HEADER, shortfall_rows(summaries, threshold))
+
+
+def transcript_export(filename, student):
+    return csv_response(filename, TRANSCRIPT_HEADER, transcript_rows(student))
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def branch_attendance(branch, params):
+    """Attendance for every course in ``branch``; optional semester, division, from and to filters in ``params``."""
+    records = filter_by_date_range(attendance_records().filter(course__branch=branch), params)
+    return filter_by_semester_division(records, params)
+
+
+def branch_attendance_summaries(branch, params):
+    """AttendanceSummary rows for every course in ``branch``; optional semester and division filters in ``params``."""
+    return filter_by_semester_division(AttendanceSummary.objects.filter(course__branch=branch), params)
+
+
+def branch_grades(branch, params):
+    """Grades for every course in ``branch``; optional semester and division filters in ``params``."""
+    return filter_by_semester_division(Grade.objects.filter(course__branch=branch), params)
+
+
+def filter_by_semester_division(queryset, params):
+    """
+    Applies optional ?semester=<id>&division=<id> filters (the course's semester, the student's
+    division) to a queryset of per-student course rows; ids that are not numbers are ignored.
+    """
+    semester, division = _parse_int(params.get('semester')), _parse_int(params.get('division'))
+    if semester is not None:
+        queryset = queryset.filter(course__semester_id=semester)
+    if division is not None:
+        queryset = queryset.filter(student__division_id=division)
+    return queryset
+
+
+def filter_by_date_range(queryset, params):
+    """Applies optional ?from=YYYY-MM-DD&to=YYYY-MM-DD filters to an Attendance queryset; bad dates are ignored."""
+    date_from, date_to = _parse_date(params.get('from')), _parse_date(params.get('to'))
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
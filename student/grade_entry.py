@@ -0,0 +1,141 @@
+"""
+Batch grade entry: a whole course's scores from the teacher grade sheet or a CSV upload.
+
+Rows are parsed first, then checked together with NumPy (unknown or duplicated students,
+scores outside 0..max, more than two decimal places). Only a batch with no errors is
+written, as one INSERT ... ON CONFLICT DO UPDATE inside a single transaction, after which
+the course is regraded. Any error leaves the stored grades untouched.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.db import transaction
+
+from .grading import regrade_course
+from .importers import read_csv_rows
+from .models import Grade
+
+PERCENT = Decimal('100')
+
+
+@dataclass
+class GradeEntry:
+    line: int            # CSV line number, or the position on the grade sheet
+    student_id: str
+    raw_score: str
+    score: Decimal = None
+
+
+@dataclass
+class GradeEntryResult:
+    saved: int = 0
+    errors: list = field(default_factory=list)   # (line, student_id, message), in line order
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def parse_grade_post(data, student_ids):
+    """
+    Reads the ``score_<student_id>`` inputs from a submitted grade sheet. Blank inputs are
+    skipped; only students in ``student_ids`` are read, as in parse_attendance_post.
+    Inputs still holding the stored score the sheet was pre-filled with (``stored_<student_id>``,
+    written out of the same maximum the sheet is entered out of) are skipped too, so an
+    unchanged score is not rewritten rounded.
+    """
+    entries = []
+    for position, student_id in enumerate(student_ids, start=1):
+        raw = data.get(f'score_{student_id}', '').strip()
+        if raw and not _same_score(raw, data.get(f'stored_{student_id}', '')):
+            entries.append(GradeEntry(position, str(student_id), raw))
+    return entries
+
+
+def _same_score(raw, stored):
+    try:
+        return Decimal(raw) == Decimal(stored.strip())
+    except InvalidOperation:
+        return False
+
+
+def parse_grade_csv(handle):
+    """Reads (student_id, score) rows from an open CSV file with a header row."""
+    entries = []
+    for line_number, row in read_csv_rows(handle):
+        if not any(row.values()):
+            continue
+        entries.append(GradeEntry(line_number, row.get('student_id', ''), row.get('score', '')))
+    return entries
+
+
+def validate_grades(entries, allowed_student_ids, max_score=PERCENT):
+    """
+    Fills ``entry.score`` (a percentage) on every valid entry and returns the errors as
+    (line, student_id, message). Scores are entered out of ``max_score`` (for example an
+    Assignment's max_score) and scaled to the 0-100 range the grading schemes use.
+    """
+    errors = []
+    parsed = []
+    for entry in entries:
+        if not entry.student_id or not entry.raw_score:
+            errors.append((entry.line, entry.student_id, f"missing {'student_id' if not entry.student_id else 'score'}"))
+            continue
+        try:
+            score = Decimal(entry.raw_score)
+        except InvalidOperation:
+            errors.append((entry.line, entry.student_id, f"invalid score {entry.raw_score!r}"))
+            continue
+        if not score.is_finite():
+            errors.append((entry.line, entry.student_id, f"invalid score {entry.raw_score!r}"))
+            continue
+        parsed.append((entry, score))
+
+    if parsed:
+        student_ids = np.array([entry.student_id for entry, _ in parsed], dtype=str)
+        scores = np.array([float(score) for _, score in parsed], dtype=np.float64)
+        hundredths = scores * 100
+        unknown = ~np.isin(student_ids, np.array(list(allowed_student_ids), dtype=str))
+        _, first_index = np.unique(student_ids, return_index=True)
+        duplicate = np.ones(len(parsed), dtype=bool)
+        duplicate[first_index] = False
+        out_of_range = (scores < 0) | (scores > float(max_score))
+        too_precise = ~np.isclose(hundredths, np.rint(hundredths))
+
+        for i, (entry, score) in enumerate(parsed):
+            if unknown[i]:
+                errors.append((entry.line, entry.student_id, "student is not enrolled in a division you teach"))
+            elif duplicate[i]:
+                errors.append((entry.line, entry.student_id, "student appears more than once"))
+            elif out_of_range[i]:
+                errors.append((entry.line, entry.student_id, f"score {score} is outside 0-{max_score}"))
+            elif too_precise[i]:
+                errors.append((entry.line, entry.student_id, f"score {score} has more than two decimal places"))
+            else:
+                entry.score = (score * PERCENT / max_score).quantize(Decimal('0.01'))
+    errors.sort(key=lambda error: error[0])
+    return errors
+
+
+def save_course_grades(course, entries, allowed_student_ids, max_score=PERCENT):
+    """
+    Validates ``entries`` and, only if every row is valid, upserts them as Grade rows for
+    ``course`` in one transaction and regrades the course. Returns a GradeEntryResult.
+    """
+    result = GradeEntryResult(errors=validate_grades(entries, allowed_student_ids, max_score))
+    if result.errors or not entries:
+        return result
+
+    grades = [Grade(student_id=entry.student_id, course=course, score=entry.score) for entry in entries]
+    with transaction.atomic():
+        Grade.objects.bulk_create(
+            grades,
+            update_conflicts=True,
+            unique_fields=['student', 'course'],
+            update_fields=['score'],
+        )
+        # Letters/points for the new scores; also bumps the students' and course's data versions
+        regrade_course(course)
+    result.saved = len(grades)
+    return result
@@ -0,0 +1,184 @@
+"""
+Grading engine: assigns grade letters/points to Grade rows and computes SGPA/CGPA.
+
+Scores for a whole course or semester are loaded with one query into NumPy arrays
+and bucketed against the applicable GradingScheme with ``np.searchsorted``. Rows that
+land in the same band are written back together with one UPDATE ... WHERE id IN (...)
+per band, instead of one save() per row (or a per-row CASE from bulk_update).
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from main.versioning import data_changed
+
+from .models import Grade, GradingScheme
+
+# Used when no GradingScheme matches a course: 10-point scale as (letter, min_score, points).
+DEFAULT_BANDS = [
+    ('O', Decimal('90'), Decimal('10')),
+    ('A+', Decimal('80'), Decimal('9')),
+    ('A', Decimal('70'), Decimal('8')),
+    ('B+', Decimal('60'), Decimal('7')),
+    ('B', Decimal('50'), Decimal('6')),
+    ('C', Decimal('45'), Decimal('5')),
+    ('P', Decimal('40'), Decimal('4')),
+    ('F', Decimal('0'), Decimal('0')),
+]
+
+# Grade ids per UPDATE statement; stays under SQLite's bound-parameter limit.
+UPDATE_CHUNK_SIZE = 900
+
+
+def _hundredths(values):
+    """Converts Decimal/float scores to exact integer hundredths so thresholds compare without float error."""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+class GradeScale:
+    """Vectorised lookup table built from (letter, min_score, points) bands."""
+
+    def __init__(self, bands):
+        bands = sorted(bands, key=lambda band: band[1])
+        self.letters = np.array([band[0] for band in bands], dtype=object)
+        self.points = [Decimal(band[2]) for band in bands]
+        self.thresholds = _hundredths([band[1] for band in bands])
+
+    def bucket(self, scores):
+        """
+        Returns the band index for every score (an int array). Scores below the lowest
+        threshold get -1.
+        """
+        return np.searchsorted(self.thresholds, _hundredths(scores), side='right') - 1
+
+
+DEFAULT_SCALE = GradeScale(DEFAULT_BANDS)
+
+
+class SchemeResolver:
+    """
+    Picks the GradingScheme for a (branch, semester) pair, most specific first:
+    branch+semester, branch only, semester only, institute-wide, then DEFAULT_BANDS.
+    All schemes and bands are loaded in two queries.
+    """
+
+    def __init__(self):
+        self.scales = {}
+        for scheme in GradingScheme.objects.prefetch_related('bands').order_by('-id'):
+            bands = [(band.letter, band.min_score, band.points) for band in scheme.bands.all()]
+            if bands:
+                self.scales[(scheme.branch_id, scheme.semester_id)] = GradeScale(bands)
+
+    def scale_for(self, branch_id, semester_id):
+        for key in ((branch_id, semester_id), (branch_id, None), (None, semester_id), (None, None)):
+            if key in self.scales:
+                return self.scales[key]
+        return DEFAULT_SCALE
+
+
+def regrade(grades):
+    """
+    Recomputes grade_letter and grade_point for every Grade in the queryset ``grades``.
+    Returns the number of rows updated.
+    """
+    rows = list(grades.order_by().values_list('id', 'score', 'course__branch_id', 'course__semester_id', 'student_id', 'course_id'))
+    if not rows:
+        return 0
+
+    ids, scores, branch_ids, semester_ids, student_ids, course_ids = zip(*rows)
+    ids = np.asarray(ids)
+    scores = np.asarray(scores, dtype=np.float64)
+    # Group rows by (branch, semester) so each distinct scheme is applied in a single vectorised pass
+    scopes = np.column_stack([np.asarray(branch_ids), np.asarray(semester_ids)])
+    unique_scopes, scope_index = np.unique(scopes, axis=0, return_inverse=True)
+    scope_index = scope_index.ravel()
+
+    resolver = SchemeResolver()
+    # (letter, points) -> grade ids; bucketing leaves only a handful of distinct outcomes
+    outcomes = {}
+    for position, (branch_id, semester_id) in enumerate(unique_scopes.tolist()):
+        mask = scope_index == position
+        scale = resolver.scale_for(branch_id, semester_id)
+        buckets = scale.bucket(scores[mask])
+        scope_ids = ids[mask]
+        for bucket in np.unique(buckets).tolist():
+            outcome = (scale.letters[bucket], scale.points[bucket]) if bucket >= 0 else (None, None)
+            outcomes.setdefault(outcome, []).extend(scope_ids[buckets == bucket].tolist())
+
+    with transaction.atomic():
+        for (letter, points), grade_ids in outcomes.items():
+            for start in range(0, len(grade_ids), UPDATE_CHUNK_SIZE):
+                Grade.objects.filter(id__in=grade_ids[start:start + UPDATE_CHUNK_SIZE]).update(
+                    grade_letter=letter, grade_point=points
+                )
+        data_changed(student_ids=student_ids, course_ids=course_ids)
+    return len(rows)
+
+
+def regrade_course(course):
+    return regrade(Grade.objects.filter(course=course))
+
+
+def regrade_semester(semester):
+    return regrade(Grade.objects.filter(course__semester=semester))
+
+
+def _weighted_points():
+    return ExpressionWrapper(F('grade_point') * F('course__credits'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def _gpa(total_points, total_credits):
+    if not total_credits:
+        return None
+    return (Decimal(total_points) / Decimal(total_credits)).quantize(Decimal('0.01'))
+
+
+def _semester_totals(student):
+    return (
+        Grade.objects.filter(student=student, grade_point__isnull=False)
+        .values('course__semester_id')
+        .annotate(points=Sum(_weighted_points()), credits=Sum('course__credits'))
+        .order_by()
+    )
+
+
+def _graded(student):
+    return Grade.objects.filter(student=student, grade_point__isnull=False)
+
+
+def semester_gpas(student):
+    """
+    Returns {semester_id: SGPA} for one student, credit-weighted over graded courses,
+    in a single GROUP BY query.
+    """
+    return {row['course__semester_id']: _gpa(row['points'], row['credits']) for row in _semester_totals(student)}
+
+
+async def asemester_gpas(student):
+    """semester_gpas() for async views."""
+    return {row['course__semester_id']: _gpa(row['points'], row['credits']) async for row in _semester_totals(student)}
+
+
+def cgpa(student):
+    """Credit-weighted grade point average over every graded course the student has taken."""
+    totals = _graded(student).aggregate(points=Sum(_weighted_points()), credits=Sum('course__credits'))
+    return _gpa(totals['points'], totals['credits'])
+
+
+async def acgpa(student):
+    """cgpa() for async views."""
+    totals = await _graded(student).aaggregate(points=Sum(_weighted_points()), credits=Sum('course__credits'))
+    return _gpa(totals['points'], totals['credits'])
+
+
+def sgpa_for_semester(semester):
+    """Returns {student_id: SGPA} for every student graded in ``semester``, in one query."""
+    totals = (
+        Grade.objects.filter(course__semester=semester, grade_point__isnull=False)
+        .values('student_id')
+        .annotate(points=Sum(_weighted_points()), credits=Sum('course__credits'))
+        .order_by()
+    )
+    return {row['student_id']: _gpa(row['points'], row['credits']) for row in totals}
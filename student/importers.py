@@ -0,0 +1,234 @@
+"""
+Streaming CSV importers used by the import_students and import_grades commands.
+
+Rows flow through a generator pipeline (read -> parse/validate -> chunk -> write), so
+only one chunk is held in memory at a time whatever the file size. Foreign keys are
+resolved from a ReferenceLookup built once per import instead of one query per row.
+"""
+import csv
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from main.versioning import bump_version, data_changed
+
+from . import refdata
+from .enrolment import rebuild_enrolment_counts
+from .models import Course, Grade, Student
+
+DEFAULT_CHUNK_SIZE = 1000
+
+STUDENT_COLUMNS = ['id', 'first', 'last', 'email', 'prn', 'academic', 'branch', 'semester', 'division', 'courses']
+GRADE_COLUMNS = ['student_id', 'branch', 'academic', 'course_code', 'score']
+
+
+class RowError(Exception):
+    """Raised by a row parser when a CSV row cannot be imported."""
+
+
+@dataclass
+class ImportStats:
+    processed: int = 0
+    imported: int = 0
+    rejected: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def read_csv_rows(handle):
+    """Yields (line_number, row_dict) from an open CSV file with a header row."""
+    reader = csv.DictReader(handle)
+    for row in reader:
+        yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ReferenceLookup:
+    """In-memory maps from the natural keys used in CSV files to primary keys."""
+
+    def __init__(self):
+        # Academic/Branch/Semester/Division keys come from the in-process registry (student.refdata)
+        snapshot = refdata.registry.snapshot()
+        self.academics = snapshot.academic_ids
+        self.branches = snapshot.branch_ids
+        self.semesters = snapshot.semester_ids
+        self.divisions = snapshot.division_ids
+        self.courses = {
+            (branch_code, year, code): pk
+            for pk, code, branch_code, year in Course.objects.values_list('id', 'code', 'branch__code', 'academic__year')
+        }
+
+    def require(self, mapping, key, label):
+        try:
+            return mapping[key]
+        except KeyError:
+            raise RowError(f"unknown {label} {key!r}")
+
+
+def parse_student_row(row, lookup):
+    """Validates one student CSV row. Returns (Student, [course ids]) or raises RowError."""
+    missing = [column for column in ('id', 'first', 'last', 'email', 'prn') if not row.get(column)]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    for column in ('id', 'first', 'last', 'email'):
+        # bulk_create does not validate, and SQLite would store the overlong value
+        max_length = Student._meta.get_field(column).max_length
+        if len(row[column]) > max_length:
+            raise RowError(f"{column} longer than {max_length} characters")
+    try:
+        validate_email(row['email'])
+    except ValidationError:
+        raise RowError(f"invalid email {row['email']!r}")
+    try:
+        prn = int(row['prn'])
+    except ValueError:
+        raise RowError(f"invalid prn {row['prn']!r}")
+
+    year, branch_code = row.get('academic', ''), row.get('branch', '')
+    student = Student(
+        id=row['id'], first=row['first'], last=row['last'], email=row['email'], prn=prn,
+        academic_id=lookup.require(lookup.academics, year, 'academic year') if year else None,
+        branch_id=lookup.require(lookup.branches, branch_code, 'branch') if branch_code else None,
+    )
+    if row.get('semester'):
+        student.semester_id = lookup.require(lookup.semesters, (year, row['semester']), 'semester')
+    if row.get('division'):
+        student.division_id = lookup.require(lookup.divisions, (branch_code, year, row['division']), 'division')
+
+    course_ids = [
+        lookup.require(lookup.courses, (branch_code, year, code.strip()), 'course')
+        for code in row.get('courses', '').split(';') if code.strip()
+    ]
+    return student, course_ids
+
+
+def parse_grade_row(row, lookup):
+    """Validates one grade CSV row. Returns (student_id, course_id, score) or raises RowError."""
+    missing = [column for column in GRADE_COLUMNS if not row.get(column)]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    course_id = lookup.require(lookup.courses, (row['branch'], row['academic'], row['course_code']), 'course')
+    try:
+        score = Decimal(row['score'])
+    except InvalidOperation:
+        raise RowError(f"invalid score {row['score']!r}")
+    if not Decimal('0') <= score <= Decimal('999.99'):
+        raise RowError(f"score {score} out of range")
+    return row['student_id'], course_id, score.quantize(Decimal('0.01'))
+
+
+def _validated(rows, parser, lookup, stats, on_reject):
+    """Pipeline stage: parses rows, reporting and dropping the ones that fail validation."""
+    for line_number, row in rows:
+        stats.processed += 1
+        try:
+            yield line_number, parser(row, lookup)
+        except RowError as exc:
+            stats.rejected += 1
+            on_reject(line_number, row, str(exc))
+
+
+def import_students(rows, chunk_size=DEFAULT_CHUNK_SIZE, on_reject=None, on_chunk=None):
+    """
+    Upserts students (keyed on Student.id) and their course enrolments from ``rows``,
+    an iterable of (line_number, row_dict). Each chunk is written in its own transaction.
+    Bulk writes send no signals, so the enrolment counters (student.enrolment) of every course
+    the imported students are in are recomputed at the end, and those courses and the cached
+    profiles (main.profiles) move to new versions.
+    """
+    stats = ImportStats()
+    lookup = ReferenceLookup()
+    on_reject = on_reject or (lambda *args: None)
+    enrollment = Course.students_enrolled.through
+    touched_courses = set()
+    update_fields = ['first', 'last', 'email', 'prn', 'academic', 'branch', 'semester', 'division']
+
+    for chunk in chunked(_validated(rows, parse_student_row, lookup, stats, on_reject), chunk_size):
+        # A later row for the same id within a chunk replaces the earlier one
+        students = {student.id: (student, course_ids) for _, (student, course_ids) in chunk}
+        with transaction.atomic():
+            Student.objects.bulk_create(
+                [student for student, _ in students.values()],
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=update_fields,
+            )
+            enrollment.objects.bulk_create(
+                [
+                    enrollment(student_id=student_id, course_id=course_id)
+                    for student_id, (_, course_ids) in students.items()
+                    for course_id in course_ids
+                ],
+                ignore_conflicts=True,
+            )
+            data_changed(
+                student_ids=students,
+                course_ids=[course_id for _, course_ids in students.values() for course_id in course_ids],
+            )
+        # Includes earlier enrolments: a student changing division moves between their counters
+        touched_courses.update(enrollment.objects.filter(student_id__in=students).values_list('course_id', flat=True))
+        stats.imported += len(students)
+        if on_chunk:
+            on_chunk(stats)
+    if touched_courses:
+        rebuild_enrolment_counts(course_ids=touched_courses)
+        data_changed(course_ids=touched_courses)
+    if stats.imported:
+        # Updated students may be linked to users whose profiles are cached
+        bump_version('profiles')
+    return stats
+
+
+def import_grades(rows, chunk_size=DEFAULT_CHUNK_SIZE, on_reject=None, on_chunk=None):
+    """
+    Creates or updates Grade scores from ``rows``, an iterable of (line_number, row_dict).
+    Rows naming a student that does not exist are rejected. Returns (stats, touched course ids).
+    """
+    stats = ImportStats()
+    lookup = ReferenceLookup()
+    on_reject = on_reject or (lambda *args: None)
+    touched_courses = set()
+
+    for chunk in chunked(_validated(rows, parse_grade_row, lookup, stats, on_reject), chunk_size):
+        scores = {}
+        for line_number, (student_id, course_id, score) in chunk:
+            scores[(student_id, course_id)] = (line_number, score)
+        student_ids = {student_id for student_id, _ in scores}
+
+        known_students = set(Student.objects.filter(id__in=student_ids).values_list('id', flat=True))
+        for (student_id, course_id), (line_number, score) in list(scores.items()):
+            if student_id not in known_students:
+                del scores[(student_id, course_id)]
+                stats.rejected += 1
+                on_reject(line_number, {'student_id': student_id}, f"unknown student {student_id!r}")
+
+        with transaction.atomic():
+            Grade.objects.bulk_create(
+                [Grade(student_id=student_id, course_id=course_id, score=score) for (student_id, course_id), (_, score) in scores.items()],
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                update_fields=['score'],
+            )
+            data_changed(student_ids=[student_id for student_id, _ in scores], course_ids=[course_id for _, course_id in scores])
+        stats.imported += len(scores)
+        touched_courses.update(course_id for _, course_id in scores)
+        if on_chunk:
+            on_chunk(stats)
+    return stats, touched_courses
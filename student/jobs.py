@@ -0,0 +1,56 @@
+"""
+Background job handlers (main.jobs) for the recomputations and exports that are too slow
+to run inside a request.
+"""
+import tempfile
+
+from django.core.files import File
+
+from main.jobs import job_progress, register
+from .attendance import rebuild_attendance_summaries
+from .exports import (
+    ATTENDANCE_HEADER, GRADE_HEADER, attendance_rows, branch_attendance, branch_grades, grade_rows, write_csv,
+)
+from .grading import regrade
+from .models import Branch, Grade
+
+
+@register('regrade_course')
+def regrade_course(job, course_id):
+    job_progress(job, 0, 1, "Regrading course")
+    return {'updated': regrade(Grade.objects.filter(course_id=course_id))}
+
+
+@register('regrade_semester')
+def regrade_semester(job, semester_id):
+    job_progress(job, 0, 1, "Regrading semester")
+    return {'updated': regrade(Grade.objects.filter(course__semester_id=semester_id))}
+
+
+@register('rebuild_attendance_summaries')
+def rebuild_summaries(job, course_ids=None):
+    job_progress(job, 0, 1, "Rebuilding attendance summaries")
+    return {'written': rebuild_attendance_summaries(course_ids=course_ids)}
+
+
+def _export(job, filename, header, queryset, rows):
+    """Writes the export to Job.output, reporting progress as rows are written."""
+    total = queryset.count()
+    job_progress(job, 0, total, f"Writing {filename}")
+    with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as handle:
+        written = write_csv(handle, header, rows(queryset), on_progress=lambda done: job_progress(job, done))
+        handle.seek(0)
+        job.output.save(filename, File(handle), save=False)
+    return {'rows': written, 'filename': filename}
+
+
+@register('export_branch_attendance')
+def export_branch_attendance(job, branch_id, **filters):
+    branch = Branch.objects.get(pk=branch_id)
+    return _export(job, f"attendance_{branch.code}.csv", ATTENDANCE_HEADER, branch_attendance(branch, filters), attendance_rows)
+
+
+@register('export_branch_grades')
+def export_branch_grades(job, branch_id, **filters):
+    branch = Branch.objects.get(pk=branch_id)
+    return _export(job, f"grades_{branch.code}.csv", GRADE_HEADER, branch_grades(branch, filters), grade_rows)
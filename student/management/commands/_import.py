@@ -0,0 +1,49 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.importers import DEFAULT_CHUNK_SIZE, read_csv_rows
+
+
+class BaseImportCommand(BaseCommand):
+    """Shared options and reporting for the CSV import commands."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help="Path to a CSV file with a header row")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per bulk insert/transaction")
+        parser.add_argument('--rejects', help="Write rejected rows with the reason to this CSV file")
+
+    def run_import(self, options, importer):
+        """Streams the CSV file through ``importer`` and returns whatever it returns."""
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        reject_file = open(options['rejects'], 'w', newline='') if options['rejects'] else None
+        reject_writer = csv.writer(reject_file) if reject_file else None
+        if reject_writer:
+            reject_writer.writerow(['line', 'reason', 'values...'])
+
+        def on_reject(line_number, row, reason):
+            if reject_writer:
+                reject_writer.writerow([line_number, reason, *row.values()])
+            if options['verbosity'] >= 2:
+                self.stderr.write(f"line {line_number}: {reason}")
+
+        def on_chunk(stats):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"{stats.processed} rows, {stats.rows_per_second:.0f} rows/s")
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as handle:
+                return importer(read_csv_rows(handle), chunk_size=options['chunk_size'], on_reject=on_reject, on_chunk=on_chunk)
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['csv_file']}")
+        finally:
+            if reject_file:
+                reject_file.close()
+
+    def report(self, stats, label):
+        style = self.style.SUCCESS if not stats.rejected else self.style.WARNING
+        self.stdout.write(style(
+            f"Imported {stats.imported} {label} from {stats.processed} rows "
+            f"({stats.rejected} rejected) in {stats.elapsed:.2f}s, {stats.rows_per_second:.0f} rows/s."
+        ))
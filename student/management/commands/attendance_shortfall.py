@@ -0,0 +1,43 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.attendance import shortfall_threshold
+from student.exports import SHORTFALL_HEADER, shortfall_rows
+from student.models import AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = "Writes the students below the attendance threshold in a branch or semester as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, help="Branch id")
+        parser.add_argument('--semester', type=int, help="Semester id")
+        parser.add_argument('--division', type=int, action='append', dest='divisions', help="Only this division id (repeatable)")
+        parser.add_argument('--threshold', type=float, help="Percent present to flag below (default: ATTENDANCE_SHORTFALL_PERCENT)")
+        parser.add_argument('--output', help="File to write (default: standard output)")
+
+    def handle(self, *args, **options):
+        if not options['branch'] and not options['semester']:
+            raise CommandError("Give --branch, --semester or both.")
+        summaries = AttendanceSummary.objects.all()
+        if options['branch']:
+            summaries = summaries.filter(course__branch_id=options['branch'])
+        if options['semester']:
+            summaries = summaries.filter(course__semester_id=options['semester'])
+        if options['divisions']:
+            summaries = summaries.filter(student__division_id__in=options['divisions'])
+        threshold = shortfall_threshold(options['threshold'])
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(SHORTFALL_HEADER)
+            flagged = 0
+            for row in shortfall_rows(summaries, threshold):
+                writer.writerow(row)
+                flagged += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write(f"{flagged} student-course pair(s) below {threshold:g}%.")
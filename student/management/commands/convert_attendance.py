@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from student.attendance_bitmap import convert_course
+from student.models import Course
+
+
+class Command(BaseCommand):
+    help = "Moves attendance marks into the bitmap storage or back into Attendance rows, one course per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('storage', choices=['bitmap', 'rows'], help="Storage to move the marks into")
+        parser.add_argument('--course', type=int, action='append', dest='courses', help="Only convert this course id (repeatable)")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by('pk')
+        if options['courses']:
+            courses = courses.filter(pk__in=options['courses'])
+
+        start = time.perf_counter()
+        moved = 0
+        for course in courses:
+            marks = convert_course(course, to_bitmap=options['storage'] == 'bitmap')
+            moved += marks
+            self.stdout.write(f"{course.code}: {marks} mark(s)")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} attendance mark(s) to {options['storage']} in {elapsed:.2f}s."))
+        if settings.ATTENDANCE_STORAGE != options['storage']:
+            self.stdout.write(self.style.WARNING(f"ATTENDANCE_STORAGE is still '{settings.ATTENDANCE_STORAGE}'; set it to '{options['storage']}'."))
@@ -0,0 +1,20 @@
+from student.grading import regrade
+from student.importers import GRADE_COLUMNS, import_grades
+from student.models import Grade
+
+from ._import import BaseImportCommand
+
+
+class Command(BaseImportCommand):
+    help = f"Streams grade scores from a CSV file and creates/updates Grade rows in bulk. Columns: {', '.join(GRADE_COLUMNS)}."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--regrade', action='store_true', help="Recompute letters and grade points for the imported courses")
+
+    def handle(self, *args, **options):
+        stats, course_ids = self.run_import(options, import_grades)
+        self.report(stats, 'grade(s)')
+        if options['regrade'] and course_ids:
+            regraded = regrade(Grade.objects.filter(course_id__in=course_ids))
+            self.stdout.write(self.style.SUCCESS(f"Regraded {regraded} grade(s) across {len(course_ids)} course(s)."))
@@ -0,0 +1,15 @@
+from student.importers import STUDENT_COLUMNS, import_students
+
+from ._import import BaseImportCommand
+
+
+class Command(BaseImportCommand):
+    help = (
+        "Streams students from a CSV file and upserts them in bulk, enrolling them in the listed courses. "
+        f"Columns: {', '.join(STUDENT_COLUMNS)} (courses is a ';'-separated list of course codes "
+        "within the student's branch and academic year)."
+    )
+
+    def handle(self, *args, **options):
+        stats = self.run_import(options, import_students)
+        self.report(stats, 'student(s)')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from student.submissions import prune_blobs
+
+
+class Command(BaseCommand):
+    help = "Deletes stored submission files no submission refers to any more, and leftovers of interrupted uploads."
+
+    def handle(self, *args, **options):
+        removed = prune_blobs()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced blob(s)."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from student.attendance import rebuild_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the AttendanceSummary table from scratch using the Attendance records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses', help="Only rebuild this course id (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_summaries(course_ids=options['courses'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} attendance summary row(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from student.enrolment import rebuild_enrolment_counts
+
+
+class Command(BaseCommand):
+    help = "Recomputes Course.enrolled_count and the per-division enrolment counts from the enrolment table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses', help="Only rebuild this course id (repeatable)")
+
+    def handle(self, *args, **options):
+        written = rebuild_enrolment_counts(course_ids=options['courses'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} per-division enrolment count(s)."))
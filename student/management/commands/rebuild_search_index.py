@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from student.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = "Creates the student search index if it is missing and rebuilds it from the Student table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        install_search_index(options['database'], rebuild=True)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the student search index."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.grading import regrade
+from student.models import Grade
+
+
+class Command(BaseCommand):
+    help = "Recomputes grade letters and grade points for a course, a semester, or every Grade."
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--course', type=int, help="Course id to regrade")
+        scope.add_argument('--semester', type=int, help="Semester id to regrade")
+        scope.add_argument('--all', action='store_true', help="Regrade every Grade row")
+
+    def handle(self, *args, **options):
+        grades = Grade.objects.all()
+        if options['course']:
+            grades = grades.filter(course_id=options['course'])
+        elif options['semester']:
+            grades = grades.filter(course__semester_id=options['semester'])
+
+        start = time.perf_counter()
+        updated = regrade(grades)
+        elapsed = time.perf_counter() - start
+        if not updated and not options['all']:
+            raise CommandError("No grades found for the given scope.")
+        self.stdout.write(self.style.SUCCESS(f"Regraded {updated} grade(s) in {elapsed:.2f}s."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student.models import Academic
+from student.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Bulk-generates a synthetic Academic/Branch/Division/Student/Course/Grade/Attendance/Assignment dataset for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=20)
+        parser.add_argument('--days', type=int, default=30, help="School days of attendance per course")
+        parser.add_argument('--branches', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (same seed, same data)")
+        parser.add_argument('--tag', default='seed', help="Prefix for generated codes/ids, so several datasets can coexist")
+
+    def handle(self, *args, **options):
+        if not 0 < len(options['tag']) <= 12:
+            raise CommandError("--tag must be 1-12 characters.")
+        if Academic.objects.filter(year__startswith=f"{options['tag']}-").exists():
+            raise CommandError(f"A dataset tagged {options['tag']!r} already exists; pass a different --tag.")
+
+        result = seed(
+            students=options['students'], courses=options['courses'], days=options['days'],
+            branches=options['branches'], seed=options['seed'], tag=options['tag'],
+        )
+        counts = ', '.join(f"{count} {name}" for name, count in result.counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {counts}."))
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    """Keep only the latest row for each (student, course, date) before adding the constraint."""
+    Attendance = apps.get_model('student', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('student', 'course', 'date')
+        .annotate(keep_id=Max('id'), rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates.iterator():
+        Attendance.objects.filter(
+            student=dup['student'], course=dup['course'], date=dup['date']
+        ).exclude(id=dup['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0003_alter_course_students_enrolled'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_summaries(apps, schema_editor):
+    """Builds summaries for attendance recorded before the table existed."""
+    Attendance = apps.get_model('student', 'Attendance')
+    AttendanceSummary = apps.get_model('student', 'AttendanceSummary')
+    totals = (
+        Attendance.objects.values('student', 'course')
+        .annotate(sessions=Count('id'), present=Count('id', filter=Q(is_present=True)))
+        .order_by()
+    )
+    AttendanceSummary.objects.bulk_create(
+        (
+            AttendanceSummary(student_id=row['student'], course_id=row['course'], sessions=row['sessions'], present=row['present'])
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0004_attendance_unique_per_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.PositiveIntegerField(default=0, help_text='Number of attendance records for this student in this course')),
+                ('present', models.PositiveIntegerField(default=0, help_text='Number of those records marked present')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='student.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='student.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_attendance_summary')],
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0005_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='credits',
+            field=models.PositiveSmallIntegerField(default=3, help_text='Credit weight of this course in SGPA/CGPA'),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='grade_point',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Set by the grading engine (student.grading)', max_digits=4, null=True),
+        ),
+        migrations.CreateModel(
+            name='GradingScheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('branch', models.ForeignKey(blank=True, help_text='Leave empty to apply to every branch', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grading_schemes', to='student.branch')),
+                ('semester', models.ForeignKey(blank=True, help_text='Leave empty to apply to every semester', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grading_schemes', to='student.semester')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GradeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('letter', models.CharField(max_length=5)),
+                ('min_score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('points', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('scheme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='student.gradingscheme')),
+            ],
+            options={
+                'ordering': ['-min_score'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='gradingscheme',
+            constraint=models.UniqueConstraint(fields=('branch', 'semester'), name='unique_grading_scheme_scope'),
+        ),
+        migrations.AddConstraint(
+            model_name='gradeband',
+            constraint=models.UniqueConstraint(fields=('scheme', 'min_score'), name='unique_grade_band_threshold'),
+        ),
+    ]
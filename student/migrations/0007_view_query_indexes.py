@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:18
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_grades(apps, schema_editor):
+    """Keep only the latest Grade for each (student, course) before adding the constraint."""
+    Grade = apps.get_model('student', 'Grade')
+    duplicates = (
+        Grade.objects.values('student', 'course')
+        .annotate(keep_id=Max('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates.iterator():
+        Grade.objects.filter(student=dup['student'], course=dup['course']).exclude(id=dup['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0006_grading_engine'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['course', 'due_date'], name='assignment_course_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', '-date'], name='attendance_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last', 'first'], name='student_name_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_grades, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='grade',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_grade_per_course'),
+        ),
+    ]
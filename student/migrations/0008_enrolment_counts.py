@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def populate_counts(apps, schema_editor):
+    """Counts the enrolments made before the counters existed."""
+    Course = apps.get_model('student', 'Course')
+    CourseDivisionCount = apps.get_model('student', 'CourseDivisionCount')
+    Enrolment = Course.students_enrolled.through
+    per_division = (
+        Enrolment.objects.values('course_id', division_id=F('student__division_id'))
+        .annotate(enrolled=Count('id'))
+        .order_by()
+    )
+    rows = [CourseDivisionCount(**row) for row in per_division]
+    CourseDivisionCount.objects.bulk_create(rows, batch_size=1000)
+    totals = {}
+    for row in rows:
+        totals[row.course_id] = totals.get(row.course_id, 0) + row.enrolled
+    Course.objects.bulk_update(
+        [Course(pk=course_id, enrolled_count=total) for course_id, total in totals.items()],
+        ['enrolled_count'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0007_view_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of students_enrolled, maintained by student.enrolment'),
+        ),
+        migrations.CreateModel(
+            name='CourseDivisionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='division_counts', to='student.course')),
+                ('division', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='course_counts', to='student.division')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'division'), name='unique_course_division_count'), models.UniqueConstraint(condition=models.Q(('division__isnull', True)), fields=('course',), name='unique_course_no_division_count')],
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
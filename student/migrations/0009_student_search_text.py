@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:04
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0008_enrolment_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.functions.text.Concat(models.Value(' '), 'id', models.Value(' '), 'first', models.Value(' '), 'last', models.Value(' '), 'email', models.Value(' '), django.db.models.functions.comparison.Cast('prn', models.CharField(max_length=20)))), output_field=models.TextField()),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0009_student_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_idx'),
+        ),
+    ]
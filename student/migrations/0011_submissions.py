@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0010_attendance_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(help_text='Name of the file as uploaded', max_length=255)),
+                ('submitted_at', models.DateTimeField()),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='student.assignment')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='student.storedblob')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='student.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('assignment', 'student'), name='submission_unique_per_student')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0011_submissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked', models.BinaryField(default=b'')),
+                ('present', models.BinaryField(default=b'')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='student.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='student.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='attendance_bitmap_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('index', models.PositiveIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_dates', to='student.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'date'), name='session_date_unique'), models.UniqueConstraint(fields=('course', 'index'), name='session_index_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0012_attendance_bitmaps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semester',
+            name='ends_on',
+            field=models.DateField(blank=True, help_text='Last day of teaching', null=True),
+        ),
+        migrations.AddField(
+            model_name='semester',
+            name='starts_on',
+            field=models.DateField(blank=True, help_text='First day of teaching', null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+def remove_duplicate_schemes(apps, schema_editor):
+    """
+    Keep one scheme per scope with an empty branch or semester before adding the constraints:
+    the one the grading engine applies (the oldest with bands, else the oldest).
+    """
+    GradingScheme = apps.get_model('student', 'GradingScheme')
+    schemes = (
+        GradingScheme.objects.filter(models.Q(branch__isnull=True) | models.Q(semester__isnull=True))
+        .annotate(bands_count=models.Count('bands')).order_by('id')
+    )
+    kept, duplicate_ids = {}, []
+    for scheme in schemes:
+        scope = (scheme.branch_id, scheme.semester_id)
+        if scope not in kept:
+            kept[scope] = scheme
+        elif scheme.bands_count and not kept[scope].bands_count:
+            duplicate_ids.append(kept[scope].id)
+            kept[scope] = scheme
+        else:
+            duplicate_ids.append(scheme.id)
+    GradingScheme.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0013_semester_dates'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_schemes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='gradingscheme',
+            constraint=models.UniqueConstraint(condition=models.Q(('semester__isnull', True)), fields=('branch',), name='unique_grading_scheme_branch_wide'),
+        ),
+        migrations.AddConstraint(
+            model_name='gradingscheme',
+            constraint=models.UniqueConstraint(condition=models.Q(('branch__isnull', True)), fields=('semester',), name='unique_grading_scheme_semester_wide'),
+        ),
+        migrations.AddConstraint(
+            model_name='gradingscheme',
+            constraint=models.UniqueConstraint(models.Value(True), condition=models.Q(('branch__isnull', True), ('semester__isnull', True)), name='unique_grading_scheme_default', violation_error_message='There is already an institute-wide grading scheme.'),
+        ),
+    ]
@@ -1,11 +1,29 @@
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Cast, Concat, Lower
 from django.contrib.auth.models import User # Import Django's built-in User model
 
+from . import refdata
+
 
 # Create your models here.
 
+class RefDataManager(models.Manager):
+    """Manager for the small reference tables, with lookups served from student.refdata (no query)."""
+
+    def cached(self, pk):
+        """The instance with primary key ``pk`` from the in-process registry, falling back to the database."""
+        obj = refdata.get(self.model, pk)
+        return obj if obj is not None else self.get(pk=pk)
+
+    def cached_all(self):
+        return refdata.instances(self.model)
+
+
 class Academic(models.Model):
     year = models.CharField(max_length=20, unique=True)
+
+    objects = RefDataManager()
     
     def __str__(self):
         return f"{self.year}"
@@ -40,14 +58,21 @@ class Semester(models.Model):
     
     # Link to the AcademicYear this semester belongs to
     academic = models.ForeignKey(Academic, on_delete=models.CASCADE, related_name='semesters', help_text="Academic year this semester belongs to")
+    # Teaching term: timetable slots (teacher.TimetableSlot) repeat weekly between these dates
+    starts_on = models.DateField(null=True, blank=True, help_text="First day of teaching")
+    ends_on = models.DateField(null=True, blank=True, help_text="Last day of teaching")
+
+    objects = RefDataManager()
 
     def __str__(self):
-        return f"{self.semester_number} ({self.academic.year})"
+        return f"{self.semester_number} ({refdata.related(self, 'academic').year})"
 ##############################################################################################
 
 class Branch(models.Model):
     name = models.CharField(max_length=50, unique=True) 
     code = models.CharField(max_length=10, unique=True)
+
+    objects = RefDataManager()
     
     def __str__(self):
         return f"{self.code}: {self.name}"
@@ -59,6 +84,8 @@ class Division(models.Model):
     branch = models.ForeignKey(Branch,on_delete=models.CASCADE,related_name='divisions',help_text="The branch this division belongs to")
     academic = models.ForeignKey(Academic, on_delete=models.CASCADE, related_name='divisions_in_year', help_text="The academic year this division is for")
 
+    objects = RefDataManager()
+
     def __str__(self):
         return f"{self.name}"
 #################################################################################################
@@ -80,9 +107,28 @@ class Student(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="students_in_branch", help_text="choose the student's branch")
     
     semester = models.ForeignKey(Semester,on_delete=models.SET_NULL,null=True,blank=True,related_name='students_in_semester',help_text="The student's current academic semester")
+
+    # Lower-cased " id first last email prn", computed by the database on every write (bulk ones
+    # included) and indexed for search by student.search. The leading space lets every word,
+    # the id included, be matched as a prefix with LIKE '% term%'.
+    search_text = models.GeneratedField(
+        expression=Lower(Concat(
+            Value(' '), 'id', Value(' '), 'first', Value(' '), 'last', Value(' '), 'email',
+            Value(' '), Cast('prn', models.CharField(max_length=20)),
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Rosters and grade sheets are ordered by name
+            models.Index(fields=['last', 'first'], name='student_name_idx'),
+        ]
     
     def __str__(self):
-        return (f"{self.id}: {self.first} {self.last} {self.prn} {self.division} {self.academic} {self.branch} {self.semester}")
+        division, academic, branch, semester = (refdata.related(self, name) for name in ('division', 'academic', 'branch', 'semester'))
+        return (f"{self.id}: {self.first} {self.last} {self.prn} {division} {academic} {branch} {semester}")
 ###########################################################################################   
     
     
@@ -93,23 +139,106 @@ class Course(models.Model):
     academic = models.ForeignKey(Academic, on_delete=models.CASCADE, related_name="courses_offered")
     students_enrolled = models.ManyToManyField(Student, related_name="enrolled_courses", blank=True)
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='courses_offered', help_text="The semester in which this course is typically offered")
+    credits = models.PositiveSmallIntegerField(default=3, help_text="Credit weight of this course in SGPA/CGPA")
+    enrolled_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of students_enrolled, maintained by student.enrolment")
     
     def __str__(self):
-        return f"{self.code} - {self.name} ({self.branch.name}, {self.academic.year})"
+        return f"{self.code} - {self.name} ({refdata.related(self, 'branch').name}, {refdata.related(self, 'academic').year})"
+
+    def save(self, *args, **kwargs):
+        # enrolled_count is only changed by relative UPDATEs (student.enrolment); saving a
+        # course loaded earlier must not write its stale copy back
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'enrolled_count'
+            ]
+        super().save(*args, **kwargs)
 ###############################################################################################
     
     
+class CourseDivisionCount(models.Model):
+    """
+    Enrolled students of a course per division (division empty: students without one),
+    maintained together with Course.enrolled_count by student.enrolment.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='division_counts')
+    division = models.ForeignKey(Division, on_delete=models.CASCADE, null=True, blank=True, related_name='course_counts')
+    enrolled = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'division'], name='unique_course_division_count'),
+            # NULLs are distinct in unique indexes, so students without a division need their own constraint
+            models.UniqueConstraint(fields=['course'], condition=models.Q(division__isnull=True), name='unique_course_no_division_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} / {self.division_id}: {self.enrolled}"
+
+
 class Grade(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='grades')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grades_received')
     score = models.DecimalField(max_digits=5, decimal_places=2) # e.g., 85.50
     grade_letter = models.CharField(max_length=5, blank=True, null=True)
+    grade_point = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True, help_text="Set by the grading engine (student.grading)")
+
+    class Meta:
+        constraints = [
+            # One grade per student per course; also serves the (student) and (student, course) lookups
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_grade_per_course'),
+        ]
     
     def __str__(self):
         return f"{self.student.first} {self.student.last} - {self.course.code}: {self.score}"
 
 ###############################################################################################
 
+class GradingScheme(models.Model):
+    """
+    Letter/grade-point bands used by the grading engine. A scheme may be limited to a
+    branch, a semester, both, or neither (the institute-wide default).
+    """
+    name = models.CharField(max_length=50)
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True, related_name='grading_schemes', help_text="Leave empty to apply to every branch")
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, null=True, blank=True, related_name='grading_schemes', help_text="Leave empty to apply to every semester")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'semester'], name='unique_grading_scheme_scope'),
+            # NULLs are distinct in unique indexes, so each scope with an empty field needs its own
+            # constraint; the institute-wide default indexes a constant, allowing one such row
+            models.UniqueConstraint(fields=['branch'], condition=Q(semester__isnull=True), name='unique_grading_scheme_branch_wide'),
+            models.UniqueConstraint(fields=['semester'], condition=Q(branch__isnull=True), name='unique_grading_scheme_semester_wide'),
+            models.UniqueConstraint(
+                Value(True), condition=Q(branch__isnull=True, semester__isnull=True), name='unique_grading_scheme_default',
+                violation_error_message="There is already an institute-wide grading scheme.",
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class GradeBand(models.Model):
+    """A score threshold within a GradingScheme: scores >= min_score earn this letter (highest band wins)."""
+    scheme = models.ForeignKey(GradingScheme, on_delete=models.CASCADE, related_name='bands')
+    letter = models.CharField(max_length=5)
+    min_score = models.DecimalField(max_digits=5, decimal_places=2)
+    points = models.DecimalField(max_digits=4, decimal_places=2)
+
+    class Meta:
+        ordering = ['-min_score']
+        constraints = [
+            models.UniqueConstraint(fields=['scheme', 'min_score'], name='unique_grade_band_threshold'),
+        ]
+
+    def __str__(self):
+        return f"{self.letter} (>= {self.min_score}, {self.points} pts)"
+
+###############################################################################################
+
 class Attendance(models.Model):
     """Records attendance for a student in a course on a specific date."""
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_records')
@@ -117,10 +246,92 @@ class Attendance(models.Model):
     date = models.DateField()
     is_present = models.BooleanField(default=True)
 
+    class Meta:
+        constraints = [
+            # One mark per student per course per day; bulk marking upserts against this key.
+            models.UniqueConstraint(fields=['student', 'course', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            # Teacher sheet/exports: WHERE course = ? AND date = ? (division is joined through student)
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+            # Student history: WHERE student = ? ORDER BY date DESC
+            models.Index(fields=['student', '-date'], name='attendance_student_date_idx'),
+            # Admin changelist: newest first (ORDER BY date DESC, id DESC) and its date hierarchy probes
+            models.Index(fields=['date', 'id'], name='attendance_date_idx'),
+        ]
+
     def __str__(self):
         status = "Present" if self.is_present else "Absent"
         return f"{self.student.first} {self.student.last} - {self.course.code} on {self.date}: {status}"
 
+
+class SessionDate(models.Model):
+    """
+    A day ``course`` held a session, for the bitmap attendance storage (student.attendance_bitmap):
+    sessions are numbered per course in the order they were first marked, and ``index`` is
+    the session's bit in the course's AttendanceBitmap rows.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='session_dates')
+    date = models.DateField()
+    index = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'date'], name='session_date_unique'),
+            models.UniqueConstraint(fields=['course', 'index'], name='session_index_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} #{self.index}: {self.date}"
+
+
+class AttendanceBitmap(models.Model):
+    """
+    All of a student's attendance in one course (and so one semester) as two bitmaps, used
+    instead of Attendance rows when ATTENDANCE_STORAGE is 'bitmap'. Bit i (byte i // 8,
+    bit i % 8) stands for the course's SessionDate with index i: set in ``marked`` when the
+    student has a mark that day, and in ``present`` when that mark is present.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    marked = models.BinaryField(default=b'')
+    present = models.BinaryField(default=b'')
+
+    class Meta:
+        constraints = [
+            # Marking a division-day upserts against this key
+            models.UniqueConstraint(fields=['student', 'course'], name='attendance_bitmap_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id}"
+
+
+class AttendanceSummary(models.Model):
+    """Running per-student, per-course attendance totals, maintained incrementally alongside Attendance."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_summaries')
+    sessions = models.PositiveIntegerField(default=0, help_text="Number of attendance records for this student in this course")
+    present = models.PositiveIntegerField(default=0, help_text="Number of those records marked present")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_attendance_summary'),
+        ]
+
+    @property
+    def absent(self):
+        return self.sessions - self.present
+
+    @property
+    def percentage(self):
+        if not self.sessions:
+            return None
+        return round(self.present * 100 / self.sessions, 1)
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id}: {self.present}/{self.sessions}"
+
     
 class Assignment(models.Model):
     """Represents an assignment for a course."""
@@ -130,5 +341,50 @@ class Assignment(models.Model):
     due_date = models.DateTimeField()
     max_score = models.DecimalField(max_digits=5, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Student assignment list: WHERE course_id IN (...) ORDER BY due_date
+            models.Index(fields=['course', 'due_date'], name='assignment_course_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.course.code})"
+
+class StoredBlob(models.Model):
+    """
+    The content of an uploaded file, stored once under MEDIA_ROOT by its SHA-256 (see
+    student.submissions), however many submissions share it.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"{self.title} ({self.course.code})"
\ No newline at end of file
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+    @property
+    def name(self):
+        """Path relative to MEDIA_ROOT: blobs/ab/abcdef..."""
+        return f"blobs/{self.sha256[:2]}/{self.sha256}"
+
+
+class Submission(models.Model):
+    """A student's submission for an assignment; submitting again replaces it."""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='submissions')
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, related_name='submissions')
+    filename = models.CharField(max_length=255, help_text="Name of the file as uploaded")
+    submitted_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Also serves the teacher's per-assignment listing and counts (WHERE assignment_id = ...)
+            models.UniqueConstraint(fields=['assignment', 'student'], name='submission_unique_per_student'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.assignment_id}: {self.filename}"
+
+    @property
+    def is_late(self):
+        return self.submitted_at > self.assignment.due_date
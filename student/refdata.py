@@ -0,0 +1,167 @@
+"""
+Process-local registry of the small reference tables: Academic, Branch, Semester and Division.
+
+The four tables are loaded together (four queries) the first time any of them is needed
+and then served from memory, with the foreign keys between them already linked
+(``semester.academic``, ``division.branch``, ...). Writes go through main.signals, which
+call invalidate() (bulk writes must call it themselves): the local copy is dropped and the shared 'refdata' version
+(main.versioning) is bumped, so other worker processes reload on their next version
+check. That version lives in the cache, so with several processes the cache must be shared
+(``manage.py check --deploy`` warns about a process-local one, main.checks). Treat the returned instances as read-only; they are shared between requests.
+
+    refdata.get(Semester, pk)            # Semester instance or None
+    refdata.related(course, 'branch')    # course.branch, from memory when possible
+    refdata.attach(students, 'division', 'branch')   # fill FK caches on a list, no queries
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from main.versioning import bump_version, get_version
+
+MODELS = ('Academic', 'Branch', 'Semester', 'Division')
+
+
+class Snapshot:
+    """One consistent load of the reference tables."""
+
+    def __init__(self, version):
+        self.version = version
+        Academic, Branch, Semester, Division = (apps.get_model('student', name) for name in MODELS)
+        self.by_model = {
+            Academic: {obj.pk: obj for obj in Academic.objects.all()},
+            Branch: {obj.pk: obj for obj in Branch.objects.all()},
+            Semester: {obj.pk: obj for obj in Semester.objects.all()},
+            Division: {obj.pk: obj for obj in Division.objects.all()},
+        }
+        academics, branches = self.by_model[Academic], self.by_model[Branch]
+        for semester in self.by_model[Semester].values():
+            _link(semester, 'academic', academics)
+        for division in self.by_model[Division].values():
+            _link(division, 'branch', branches)
+            _link(division, 'academic', academics)
+
+        # Natural keys used by the CSV importers
+        self.academic_ids = {a.year: a.pk for a in academics.values()}
+        self.branch_ids = {b.code: b.pk for b in branches.values()}
+        self.semester_ids = {(academics[s.academic_id].year, s.semester_number): s.pk for s in self.by_model[Semester].values()}
+        self.division_ids = {
+            (branches[d.branch_id].code, academics[d.academic_id].year, d.name): d.pk
+            for d in self.by_model[Division].values()
+        }
+
+
+def _link(obj, field_name, instances):
+    field = obj._meta.get_field(field_name)
+    target = instances.get(getattr(obj, field.attname))
+    if target is not None:
+        field.set_cached_value(obj, target)
+
+
+class Registry:
+    def __init__(self):
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """The current Snapshot, reloading it when the shared version has moved."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < settings.REFDATA_VERSION_CHECK_INTERVAL:
+            return snapshot
+        version = get_version('refdata')
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                if self._snapshot is None or self._snapshot.version != version:
+                    self._snapshot = Snapshot(version)
+                snapshot = self._snapshot
+        self._checked_at = now
+        return snapshot
+
+    def clear(self):
+        self._snapshot = None
+
+
+registry = Registry()
+
+
+def get(model, pk):
+    """The cached instance of a reference model, or None if ``pk`` is unknown (or None)."""
+    if pk is None:
+        return None
+    return registry.snapshot().by_model[model].get(pk)
+
+
+def instances(model):
+    """Every cached instance of a reference model."""
+    return list(registry.snapshot().by_model[model].values())
+
+
+def related(obj, field_name):
+    """
+    ``getattr(obj, field_name)`` for a foreign key to a reference model, served from the
+    instance's own cache, then the registry, then (for rows newer than the snapshot) the database.
+    """
+    field = obj._meta.get_field(field_name)
+    if field.is_cached(obj):
+        return field.get_cached_value(obj)
+    target = get(field.related_model, getattr(obj, field.attname))
+    if target is not None:
+        field.set_cached_value(obj, target)
+        return target
+    return getattr(obj, field_name)
+
+
+def attach(objs, *field_names):
+    """Fills the named reference-model foreign keys on every object in ``objs`` from memory."""
+    snapshot = registry.snapshot()
+    objs = list(objs)
+    for field_name in field_names:
+        for obj in objs:
+            field = obj._meta.get_field(field_name)
+            target = snapshot.by_model[field.related_model].get(getattr(obj, field.attname))
+            if target is not None:
+                field.set_cached_value(obj, target)
+    return objs
+
+
+async def aget(model, pk):
+    """get() for async views; a registry reload queries, so it runs in a worker thread."""
+    return await sync_to_async(get)(model, pk)
+
+
+async def aattach(objs, *field_names):
+    """attach() for async views; ``objs`` must already be evaluated (a list)."""
+    return await sync_to_async(attach)(objs, *field_names)
+
+
+def invalidate():
+    """
+    Drops the local snapshot now and again once the current transaction commits, when the
+    shared version is moved for the other processes. Needed after writes that bypass
+    signals (bulk_create, QuerySet.update) on the reference tables.
+    """
+    def reload():
+        registry.clear()
+        bump_version('refdata')
+    registry.clear()
+    transaction.on_commit(reload)
+
+
+def warm():
+    """
+    Loads the registry at process start (sms/wsgi.py, sms/asgi.py) so the first request does
+    not pay for it. Does nothing if the database is not migrated or reachable yet.
+    """
+    try:
+        registry.snapshot()
+    except DatabaseError:
+        pass
+    finally:
+        # Don't hand an open connection to forked workers (gunicorn --preload)
+        connections.close_all()
@@ -0,0 +1,119 @@
+"""
+Student search by id, name, email or PRN, for the admin and the teacher roster search.
+
+Every word of the query must match the start of a word of Student.search_text (so "pat 2000"
+finds Patil with a PRN starting 2000, and "s0@x" finds the email s0@x.com). The
+backend-specific index is created by install_search_index(), run after every migrate:
+
+- PostgreSQL: a pg_trgm GIN index on search_text, which serves LIKE '% term%'.
+- SQLite: an FTS5 table holding each student's id (UNINDEXED) and search_text, kept in step
+  by triggers; each word becomes a "word"* prefix query. It is keyed on the student id, not
+  student_student's implicit rowid, which VACUUM may renumber (the primary key is a CharField).
+- Other databases: the same LIKE filters without an index.
+"""
+import logging
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger('sms.search')
+
+# Words are runs of letters and digits, as FTS5's unicode61 tokenizer splits them
+WORD_RE = re.compile(r'\w+')
+MAX_QUERY_WORDS = 8
+
+FTS_TABLE = 'student_search'
+
+# student_id is UNINDEXED, so the delete and update triggers scan the stored ids; students are
+# rarely removed or renamed, and searches only ever read it back
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        student_id UNINDEXED, search_text, prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS student_search_ai AFTER INSERT ON student_student BEGIN
+        INSERT INTO {FTS_TABLE}(student_id, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS student_search_ad AFTER DELETE ON student_student BEGIN
+        DELETE FROM {FTS_TABLE} WHERE student_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS student_search_au AFTER UPDATE OF id, first, last, email, prn ON student_student BEGIN
+        DELETE FROM {FTS_TABLE} WHERE student_id = old.id;
+        INSERT INTO {FTS_TABLE}(student_id, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+SQLITE_TRIGGERS = ['student_search_ai', 'student_search_ad', 'student_search_au']
+
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS student_search_trgm ON student_student USING gin (search_text gin_trgm_ops)",
+]
+
+
+def query_words(query):
+    return WORD_RE.findall(query.lower())[:MAX_QUERY_WORDS]
+
+
+_fts_tables = set()
+
+
+def _fts_ready(db):
+    """Whether the FTS table exists on this database (remembered once it does)."""
+    if db.alias not in _fts_tables:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            if cursor.fetchone() is not None:
+                _fts_tables.add(db.alias)
+    return db.alias in _fts_tables
+
+
+def search_students(queryset, query):
+    """Narrows a Student queryset to the students matching ``query`` (unchanged if it has no words)."""
+    words = query_words(query)
+    if not words:
+        return queryset
+    db = connections[queryset.db]
+    if db.vendor == 'sqlite' and _fts_ready(db):
+        # All words, each as a prefix: '"pat"* AND "2000"*'
+        match = ' AND '.join(f'"{word}"*' for word in words)
+        return queryset.filter(pk__in=RawSQL(f"SELECT student_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    condition = Q()
+    for word in words:
+        condition &= Q(search_text__contains=f' {word}')
+    return queryset.filter(condition)
+
+
+def install_search_index(using='default', rebuild=False):
+    """
+    Creates the search index for this database if it is missing (idempotent). On SQLite the
+    FTS table is (re)filled when its triggers were missing, e.g. after a migration rebuilt
+    student_student, or when ``rebuild`` is set; a table from before it was keyed on the
+    student id (external content over the rowid) is replaced.
+    """
+    db = connections[using]
+    if db.vendor == 'sqlite':
+        with db.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            row = cursor.fetchone()
+            if row is not None and 'student_id' not in row[0]:
+                for trigger in SQLITE_TRIGGERS:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                cursor.execute(f"DROP TABLE {FTS_TABLE}")
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'student_search_a_'")
+            stale = cursor.fetchone()[0] < len(SQLITE_TRIGGERS)
+            for statement in SQLITE_DDL:
+                cursor.execute(statement)
+            if stale or rebuild:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+                cursor.execute(f"INSERT INTO {FTS_TABLE}(student_id, search_text) SELECT id, search_text FROM student_student")
+    elif db.vendor == 'postgresql':
+        try:
+            with db.cursor() as cursor:
+                for statement in POSTGRESQL_DDL:
+                    cursor.execute(statement)
+                if rebuild:
+                    cursor.execute("REINDEX INDEX student_search_trgm")
+        except DatabaseError:
+            # CREATE EXTENSION needs a privileged role; search still works, unindexed
+            logger.exception("Could not create the student search index")
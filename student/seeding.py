@@ -0,0 +1,157 @@
+"""
+Synthetic data generator for local load testing and benchmarks.
+
+Builds a complete Academic/Semester/Branch/Division/Student/Course/Grade/
+Attendance/Assignment graph with bulk inserts. The output is deterministic
+for a given ``seed``; ``tag`` namespaces every natural key so several
+datasets can live in one database.
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import refdata
+from .attendance import BITMAP, attendance_storage, rebuild_attendance_summaries
+from .attendance_bitmap import convert_course
+from .enrolment import rebuild_enrolment_counts
+from .models import Academic, Assignment, Attendance, Branch, Course, Division, Grade, Semester, Student
+
+BRANCH_NAMES = ['Computer Engineering', 'Information Technology', 'Mechanical Engineering', 'Electrical Engineering', 'Civil Engineering', 'Electronics']
+DIVISION_NAMES = ['A', 'B', 'C', 'D']
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Ananya', 'Kabir', 'Meera', 'Rohan', 'Saanvi', 'Vihaan', 'Zara', 'Arjun', 'Kiara']
+LAST_NAMES = ['Patil', 'Sharma', 'Kulkarni', 'Deshmukh', 'Iyer', 'Khan', 'Joshi', 'Nair', 'Gupta', 'Shinde', 'Reddy', 'Mehta']
+
+ATTENDANCE_RATE = 0.85
+ASSIGNMENTS_PER_COURSE = 3
+INSERT_BATCH_SIZE = 5000
+
+
+@dataclass
+class SeedResult:
+    academic: Academic = None
+    semester: Semester = None
+    branches: list = field(default_factory=list)
+    divisions: list = field(default_factory=list)
+    courses: list = field(default_factory=list)
+    student_ids: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+
+
+def school_days(start, count):
+    """The first ``count`` weekdays on or after ``start``."""
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _bulk_insert(model, rows):
+    model.objects.bulk_create(rows, batch_size=INSERT_BATCH_SIZE)
+    return len(rows)
+
+
+def _insert_attendance(enrollments, calendar, rng):
+    """
+    Attendance is by far the largest table, so it skips model instantiation and goes
+    through executemany one day at a time, keeping memory bounded by one day's rows.
+    """
+    opts = Attendance._meta
+    columns = [opts.get_field(name).column for name in ('student', 'course', 'date', 'is_present')]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(opts.db_table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    total = 0
+    with connection.cursor() as cursor:
+        for day in calendar:
+            rows = [(s, c, day, rng.random() < ATTENDANCE_RATE) for s, c in enrollments]
+            cursor.executemany(sql, rows)
+            total += len(rows)
+    return total
+
+
+@transaction.atomic
+def seed(students=1000, courses=20, days=30, branches=4, seed=42, tag='seed', start_date=datetime.date(2025, 7, 1)):
+    """
+    Generates one academic year/semester with ``branches`` branches, four divisions each,
+    ``courses`` courses spread over the branches and ``students`` students spread over
+    the divisions. Every student is enrolled in all courses of their branch and gets a
+    Grade for each, ``days`` school days of attendance per course (in the configured
+    ATTENDANCE_STORAGE) and the course's assignments. Returns a SeedResult.
+    """
+    rng = random.Random(seed)
+    branches = max(1, min(branches, len(BRANCH_NAMES)))
+    result = SeedResult()
+
+    result.academic = Academic.objects.create(year=f"{tag}-{start_date.year}")
+    calendar = school_days(start_date, days)
+    result.semester = Semester.objects.create(
+        semester_number=Semester.FIRST, academic=result.academic, starts_on=start_date, ends_on=calendar[-1] if calendar else start_date,
+    )
+    result.branches = Branch.objects.bulk_create([
+        Branch(name=f"{BRANCH_NAMES[i]} ({tag})", code=f"{tag[:6].upper()}{i}")
+        for i in range(branches)
+    ])
+    result.divisions = Division.objects.bulk_create([
+        Division(name=name, branch=branch, academic=result.academic)
+        for branch in result.branches for name in DIVISION_NAMES
+    ])
+    refdata.invalidate()
+    result.courses = Course.objects.bulk_create([
+        Course(
+            name=f"Course {i}", code=f"{tag[:4].upper()}{i:03d}", credits=rng.choice([2, 3, 4]),
+            branch=result.branches[i % branches], academic=result.academic, semester=result.semester,
+        )
+        for i in range(courses)
+    ])
+    courses_by_branch = {branch.id: [c for c in result.courses if c.branch_id == branch.id] for branch in result.branches}
+
+    student_rows = []
+    for i in range(students):
+        division = result.divisions[i % len(result.divisions)]
+        student_rows.append(Student(
+            id=f"{tag[:6].upper()}{i:07d}", first=rng.choice(FIRST_NAMES), last=rng.choice(LAST_NAMES),
+            email=f"{tag}.{i}@example.edu", prn=2_000_000_000 + i, division=division,
+            academic=result.academic, branch_id=division.branch_id, semester=result.semester,
+        ))
+    _bulk_insert(Student, student_rows)
+    result.student_ids = [s.id for s in student_rows]
+
+    enrollment = Course.students_enrolled.through
+    enrollments = [
+        (student.id, course.id)
+        for student in student_rows for course in courses_by_branch[student.branch_id]
+    ]
+    counts = result.counts
+    counts['enrollments'] = _bulk_insert(enrollment, [enrollment(student_id=s, course_id=c) for s, c in enrollments])
+    counts['grades'] = _bulk_insert(Grade, [
+        Grade(student_id=s, course_id=c, score=Decimal(rng.randint(2500, 10000)) / 100)
+        for s, c in enrollments
+    ])
+
+    counts['attendance'] = _insert_attendance(enrollments, calendar, rng)
+    if attendance_storage() == BITMAP:
+        # Generated as rows (the fast path above), then packed
+        for course in result.courses:
+            convert_course(course, to_bitmap=True)
+
+    due_base = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time(23, 59)))
+    counts['assignments'] = _bulk_insert(Assignment, [
+        Assignment(
+            title=f"Assignment {n + 1}", course=course, max_score=Decimal('100'),
+            due_date=due_base + datetime.timedelta(days=14 * (n + 1)),
+        )
+        for course in result.courses for n in range(ASSIGNMENTS_PER_COURSE)
+    ])
+    counts['students'] = len(student_rows)
+    counts['courses'] = len(result.courses)
+    counts['attendance_summaries'] = rebuild_attendance_summaries(course_ids=[c.id for c in result.courses])
+    rebuild_enrolment_counts(course_ids=[c.id for c in result.courses])
+    return result
@@ -0,0 +1,55 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .enrolment import Enrolment, apply_enrolment_deltas, division_move_deltas, enrolment_deltas
+from .models import Course, Student
+
+
+# --- Enrolment counters (student.enrolment) ---
+
+def _pairs(instance, reverse, pk_set):
+    """(student_id, course_id) pairs for an m2m_changed call from either side of the relation."""
+    if reverse:
+        return [(instance.pk, course_id) for course_id in pk_set]
+    return [(student_id, instance.pk) for student_id in pk_set]
+
+
+@receiver(m2m_changed, sender=Course.students_enrolled.through)
+def count_enrolment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() reports every pk it was given and clear() none; count only the rows that go
+        existing = Enrolment.objects.filter(student_id=instance.pk) if reverse else Enrolment.objects.filter(course_id=instance.pk)
+        if action == 'pre_remove':
+            existing = existing.filter(**{'course_id__in' if reverse else 'student_id__in': pk_set})
+        instance._removed_enrolments = list(existing.values_list('student_id', 'course_id'))
+    elif action == 'post_add':
+        # add() reports only the pks that were not enrolled yet
+        apply_enrolment_deltas(*enrolment_deltas(_pairs(instance, reverse, pk_set)))
+    elif action in ('post_remove', 'post_clear'):
+        apply_enrolment_deltas(*enrolment_deltas(instance.__dict__.pop('_removed_enrolments', []), sign=-1))
+
+
+@receiver(pre_save, sender=Student)
+def remember_stored_row(sender, instance, **kwargs):
+    # One lookup per save for every receiver comparing with the stored row: the division
+    # counters below and the cached profiles of the previous user (main.signals)
+    if instance._state.adding:
+        instance._stored_row = None
+    else:
+        instance._stored_row = sender.objects.filter(pk=instance.pk).values('division_id', 'user_id').first()
+
+
+@receiver(post_save, sender=Student)
+def move_division_counts(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_row', None)
+    if created or stored is None or stored['division_id'] == instance.division_id:
+        return
+    course_ids = Enrolment.objects.filter(student_id=instance.pk).values_list('course_id', flat=True)
+    apply_enrolment_deltas(division_deltas=division_move_deltas(course_ids, stored['division_id'], instance.division_id))
+
+
+@receiver(pre_delete, sender=Student)
+def drop_deleted_student_counts(sender, instance, **kwargs):
+    # The enrolment rows are removed by the cascade, which sends no m2m_changed
+    pairs = Enrolment.objects.filter(student_id=instance.pk).values_list('student_id', 'course_id')
+    apply_enrolment_deltas(*enrolment_deltas(pairs, sign=-1))
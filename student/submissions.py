@@ -0,0 +1,239 @@
+"""
+Assignment submissions: streamed uploads into a content-addressed blob store.
+
+BlobUploadHandler replaces Django's upload handlers for the submission view. It writes
+each uploaded file in FileUploadHandler.chunk_size pieces to a temporary file under
+MEDIA_ROOT/blobs/tmp, hashing it on the way, so an upload is never held in memory and
+is read only once. save_submission() then renames the file to blobs/<sha256[:2]>/<sha256>
+(or drops it when that content is already stored), so identical uploads share one file
+and one StoredBlob row.
+
+Blobs no longer referenced by any submission are removed by prune_blobs().
+"""
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import StoredBlob, Submission
+
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+STALE_UPLOAD_AGE = 24 * 60 * 60 # seconds; older files in blobs/tmp are from interrupted requests
+
+MANIFEST_HEADER = ['Student ID', 'First Name', 'Last Name', 'File', 'Submitted At', 'Late', 'SHA-256']
+
+
+def blob_path(name):
+    return os.path.join(settings.MEDIA_ROOT, *name.split('/'))
+
+
+def open_blob(blob):
+    return open(blob_path(blob.name), 'rb')
+
+
+def upload_dir():
+    """Where uploads are written: inside the store, so moving one in is a rename."""
+    path = blob_path('blobs/tmp')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class HashedUpload(UploadedFile):
+    """An upload being written to a temporary file in the blob store, with its running SHA-256."""
+
+    def __init__(self, name, content_type, charset, content_type_extra=None):
+        file = tempfile.NamedTemporaryFile(dir=upload_dir(), prefix='upload-', delete=False)
+        super().__init__(file, name, content_type, 0, charset, content_type_extra)
+        self.digest = hashlib.sha256()
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    @property
+    def sha256(self):
+        return self.digest.hexdigest()
+
+    def discard(self):
+        """Removes the temporary file if it was not moved into the store."""
+        self.file.close()
+        _remove(self.temporary_file_path())
+
+
+class BlobUploadHandler(FileUploadHandler):
+    """
+    Streams uploaded files to disk while hashing them. A file going over ``max_size``
+    bytes is dropped (``rejected`` names it) and the rest of it is read and discarded.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = settings.SUBMISSION_MAX_BYTES if max_size is None else max_size
+        self.rejected = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = HashedUpload(self.file_name, self.content_type, self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.file.discard()
+            self.rejected.append(self.file_name)
+            raise SkipFile()
+        self.file.write(raw_data)
+        self.file.digest.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.size = file_size
+        self.file.flush()
+        os.fsync(self.file.fileno()) # on disk before the rename makes it visible
+        self.file.close()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.discard()
+
+
+def discard_uploads(files):
+    """Removes the temporary files of the uploads in ``files`` (request.FILES) that were not stored."""
+    for _, uploads in files.lists():
+        for upload in uploads:
+            if isinstance(upload, HashedUpload):
+                upload.discard()
+
+
+def store_upload(upload):
+    """
+    Moves a completed HashedUpload into the blob store and returns its StoredBlob, locked
+    for the current transaction so prune_blobs() cannot remove it before it is referenced.
+    """
+    blob, _ = StoredBlob.objects.select_for_update().get_or_create(sha256=upload.sha256, defaults={'size': upload.size})
+    path = blob_path(blob.name)
+    if os.path.exists(path):
+        upload.discard() # same content already stored
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(upload.temporary_file_path(), path)
+    return blob
+
+
+def save_submission(assignment, student, upload):
+    """Stores ``upload`` as the student's submission for ``assignment``, replacing any earlier one."""
+    with transaction.atomic():
+        blob = store_upload(upload)
+        submission, _ = Submission.objects.update_or_create(
+            assignment=assignment, student=student,
+            defaults={'blob': blob, 'filename': upload.name, 'submitted_at': timezone.now()},
+        )
+    return submission
+
+
+def prune_blobs(batch_size=500):
+    """
+    Deletes the blobs no submission refers to, rows and files, and temporary files left by
+    interrupted uploads. Returns the number of blobs removed.
+    """
+    unreferenced = StoredBlob.objects.filter(~Exists(Submission.objects.filter(blob=OuterRef('pk'))))
+    removed = 0
+    while True:
+        with transaction.atomic():
+            # Blobs locked by save_submission() are being reused: skipped
+            orphans = list(unreferenced.select_for_update(skip_locked=True)[:batch_size])
+            if not orphans:
+                break
+            StoredBlob.objects.filter(pk__in=[blob.pk for blob in orphans]).delete()
+            # Before the commit: once the rows are gone an upload of the same content
+            # creates a new row and brings its own file
+            for blob in orphans:
+                _remove(blob_path(blob.name))
+        removed += len(orphans)
+
+    stale = time.time() - STALE_UPLOAD_AGE
+    with os.scandir(upload_dir()) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < stale:
+                _remove(entry.path)
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# --- Download of all the submissions of an assignment ---
+
+class ZipSink:
+    """Write-only file for zipfile; take() returns what was written since the last call."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def _safe_name(name, fallback):
+    try:
+        return get_valid_filename(name)
+    except SuspiciousFileOperation: # nothing usable left, e.g. "???"
+        return fallback
+
+
+def archive_name(submission):
+    """student-id_last_first/filename, with anything unsafe in a path removed."""
+    student = submission.student
+    folder = _safe_name(f"{student.id}_{student.last}_{student.first}", student.id)
+    return f"{folder}/{_safe_name(submission.filename, 'submission')}"
+
+
+def submissions_archive(submissions):
+    """
+    Yields a zip of ``submissions`` (with their student, assignment and blob loaded) piece by piece:
+    each file is copied ARCHIVE_CHUNK_SIZE bytes at a time, then a submissions.csv
+    manifest closes the archive. Files are stored uncompressed: most submissions are
+    PDFs, office documents or archives that are compressed already.
+    """
+    sink = ZipSink()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_HEADER)
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for submission in submissions:
+            submitted_at = timezone.localtime(submission.submitted_at)
+            info = zipfile.ZipInfo(archive_name(submission), date_time=submitted_at.timetuple()[:6])
+            with open_blob(submission.blob) as source, archive.open(info, 'w', force_zip64=True) as target:
+                while chunk := source.read(ARCHIVE_CHUNK_SIZE):
+                    target.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+            student = submission.student
+            writer.writerow([
+                student.id, student.first, student.last, submission.filename,
+                submitted_at.isoformat(timespec='seconds'), 'Yes' if submission.is_late else 'No', submission.blob_id,
+            ])
+        archive.writestr('submissions.csv', manifest.getvalue())
+    yield sink.take()
@@ -1,3 +1,698 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from main.profiles import load_profiles
+from main.versioning import get_version
+
+from . import refdata, search, submissions
+from .attendance import (
+    ABSENT, NO_CHANGE, PRESENT, attendance_records, attendance_shortfall, mark_attendance, parse_attendance_post,
+    rebuild_attendance_summaries, sessions_to_recover, shortfall_threshold, summary_delta,
+)
+from .attendance_bitmap import bit_count, convert_course, get_bit, with_bit
+from .enrolment import rebuild_enrolment_counts
+from .grade_entry import GradeEntry, parse_grade_post, validate_grades
+from .grading import DEFAULT_SCALE, GradeScale, acgpa, asemester_gpas, cgpa, regrade, semester_gpas, sgpa_for_semester
+from .importers import import_grades, import_students
+from .models import (
+    Academic, Assignment, Attendance, AttendanceBitmap, AttendanceSummary, Branch, Course, CourseDivisionCount, Division, Grade,
+    GradingScheme, Semester, StoredBlob, Student, Submission,
+)
+
+
+class GradeEntryTests(SimpleTestCase):
+    def entries(self, *rows):
+        return [GradeEntry(line, student_id, raw) for line, (student_id, raw) in enumerate(rows, start=1)]
+
+    def test_scores_are_scaled_to_percent(self):
+        entries = self.entries(('S0', '45'), ('S1', '12.5'), ('S2', '0'))
+        self.assertEqual(validate_grades(entries, {'S0', 'S1', 'S2'}, max_score=Decimal('50')), [])
+        self.assertEqual([entry.score for entry in entries], [Decimal('90.00'), Decimal('25.00'), Decimal('0.00')])
+
+    def test_errors_are_reported_per_row_in_line_order(self):
+        entries = self.entries(
+            ('S0', 'abc'), ('S9', '10'), ('S1', '10'), ('S1', '20'), ('S2', '51'), ('S3', '1.005'), ('', '5'), ('S4', 'NaN'),
+        )
+        errors = validate_grades(entries, {'S0', 'S1', 'S2', 'S3', 'S4'}, max_score=Decimal('50'))
+        self.assertEqual(errors, [
+            (1, 'S0', "invalid score 'abc'"),
+            (2, 'S9', "student is not enrolled in a division you teach"),
+            (4, 'S1', "student appears more than once"),
+            (5, 'S2', "score 51 is outside 0-50"),
+            (6, 'S3', "score 1.005 has more than two decimal places"),
+            (7, '', "missing student_id"),
+            (8, 'S4', "invalid score 'NaN'"),
+        ])
+
+    def test_sheet_skips_blank_and_unchanged_rows(self):
+        data = {'score_S0': '40', 'stored_S0': '40.00', 'score_S1': ' 45 ', 'stored_S1': '40.00', 'score_S2': '', 'score_S3': '7', 'score_X': '1'}
+        entries = parse_grade_post(data, ['S0', 'S1', 'S2', 'S3'])
+        self.assertEqual([(entry.line, entry.student_id, entry.raw_score) for entry in entries], [(2, 'S1', '45'), (4, 'S3', '7')])
+
+
+class CourseTestCase(TestCase):
+    """A course with ``self.students`` (S0-S3) enrolled, all in one division."""
+
+    def setUp(self):
+        cache.clear()
+        self.academic = Academic.objects.create(year="2025-26")
+        self.branch = Branch.objects.create(name="Computer", code="CS")
+        self.semester = Semester.objects.create(semester_number=Semester.FIRST, academic=self.academic)
+        self.division = Division.objects.create(name="A", branch=self.branch, academic=self.academic)
+        self.course = Course.objects.create(name="Algorithms", code="CS101", branch=self.branch, academic=self.academic, semester=self.semester)
+        self.students = [
+            Student.objects.create(
+                id=f"S{i}", first=f"First{i}", last=f"Last{i}", email=f"s{i}@example.com", prn=1000 + i,
+                division=self.division, academic=self.academic, branch=self.branch, semester=self.semester,
+            )
+            for i in range(4)
+        ]
+        self.course.students_enrolled.add(*self.students)
+
+    def summaries(self):
+        return {row.student_id: (row.sessions, row.present) for row in AttendanceSummary.objects.filter(course=self.course)}
+
+    def marks(self):
+        return sorted(attendance_records().filter(course=self.course).values_list('student_id', 'date', 'is_present'))
+
+
+class DashboardTests(CourseTestCase):
+    def setUp(self):
+        super().setUp()
+        Student.objects.filter(pk='S0').update(user=User.objects.create_user('s0', password='secret'))
+        AttendanceSummary.objects.create(student_id='S0', course=self.course, sessions=4, present=3)
+        self.client.login(username='s0', password='secret')
+        # Measured against the budgets of a warm process (sms/wsgi.py loads the registry at start)
+        refdata.registry.snapshot()
+
+    def test_summaries_are_shown(self):
+        for _ in range(2): # rendered, then from the fragment cache
+            self.assertContains(self.client.get('/student/dashboard/'), '<td>Algorithms (CS101)</td>')
+
+    def test_changes_show_on_the_next_request(self):
+        url = '/student/dashboard/'
+        self.assertContains(self.client.get(url), 'Welcome, First0 Last0!')
+        student = Student.objects.get(pk='S0')
+        versions = get_version('student', 'S0'), get_version('catalog')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student.first = 'Asha'
+            student.save()
+        self.assertNotEqual(get_version('student', 'S0'), versions[0])
+        self.assertContains(self.client.get(url), 'Welcome, Asha Last0!', count=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = 'Data Structures'
+            self.course.save()
+        self.assertNotEqual(get_version('catalog'), versions[1])
+        self.assertContains(self.client.get(url), '<td>Data Structures (CS101)</td>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.division.name = 'Z'
+            self.division.save()
+        refdata.registry.snapshot()   # reloaded here rather than inside the request's query budget
+        self.assertContains(self.client.get(url), '<p>Division: Z</p>')
+
+    def test_fragment_expiring_before_render_does_not_cache_an_empty_table(self):
+        # The fragment looks cached when the view runs but is gone by the time {% cache %} renders
+        with mock.patch.object(cache, 'ahas_key', mock.AsyncMock(return_value=True), create=True):
+            self.assertContains(self.client.get('/student/dashboard/'), '<td>Algorithms (CS101)</td>')
+        self.assertContains(self.client.get('/student/dashboard/'), '<td>Algorithms (CS101)</td>')
+
+
+DAYS = [datetime.date(2025, 7, day) for day in (1, 2, 3, 7, 8)]
+
+
+class AttendanceStorageTests(CourseTestCase):
+    def mark_days(self):
+        for n, day in enumerate(DAYS):
+            mark_attendance(self.course, day, {student.id: (n + i) % 3 != 0 for i, student in enumerate(self.students)})
+        # Marked again: replaces the day's marks
+        mark_attendance(self.course, DAYS[1], {'S0': False, 'S1': True})
+
+    def test_bits(self):
+        bitmap = with_bit(with_bit(b'', 0, True), 17, True)
+        self.assertEqual(bitmap, bytes([1, 0, 2]))
+        self.assertEqual([index for index in range(24) if get_bit(bitmap, index)], [0, 17])
+        self.assertFalse(get_bit(bitmap, 100))
+        self.assertEqual(bit_count(with_bit(bitmap, 0, False)), 1)
+
+    def test_bitmap_storage_matches_rows(self):
+        self.mark_days()
+        marks, summaries = self.marks(), self.summaries()
+        Attendance.objects.all().delete()
+        AttendanceSummary.objects.all().delete()
+        with override_settings(ATTENDANCE_STORAGE='bitmap'):
+            self.mark_days()
+            self.assertEqual(Attendance.objects.count(), 0)
+            self.assertEqual(AttendanceBitmap.objects.filter(course=self.course).count(), len(self.students))
+            self.assertEqual(self.marks(), marks)
+            self.assertEqual(self.summaries(), summaries)
+
+    def test_convert_round_trip(self):
+        self.mark_days()
+        marks, summaries = self.marks(), self.summaries()
+        with override_settings(ATTENDANCE_STORAGE='bitmap'):
+            self.assertEqual(convert_course(self.course, to_bitmap=True), len(marks))
+            self.assertFalse(Attendance.objects.exists())
+            self.assertEqual(self.marks(), marks)
+        self.assertEqual(convert_course(self.course, to_bitmap=False), len(marks))
+        self.assertFalse(AttendanceBitmap.objects.exists())
+        self.assertEqual(self.marks(), marks)
+        self.assertEqual(self.summaries(), summaries)
+
+    def test_rebuild_summaries(self):
+        for storage in ('rows', 'bitmap'):
+            with self.subTest(storage), override_settings(ATTENDANCE_STORAGE=storage):
+                Attendance.objects.all().delete()
+                AttendanceBitmap.objects.all().delete()
+                AttendanceSummary.objects.all().delete()
+                self.mark_days()
+                summaries = self.summaries()
+                AttendanceSummary.objects.filter(student_id='S0').update(sessions=99, present=0)
+                AttendanceSummary.objects.filter(student_id='S1').delete()
+                self.assertEqual(rebuild_attendance_summaries(course_ids=[self.course.id]), len(self.students))
+                self.assertEqual(self.summaries(), summaries)
+
+    def test_admin_is_read_only_with_bitmap_storage(self):
+        mark_attendance(self.course, DAYS[0], {'S0': True})
+        User.objects.create_superuser('admin', password='secret')
+        self.client.login(username='admin', password='secret')
+        row = Attendance.objects.get()
+        self.assertEqual(self.client.get('/admin/student/attendance/add/').status_code, 200)
+        with override_settings(ATTENDANCE_STORAGE='bitmap'):
+            self.assertEqual(self.client.get('/admin/student/attendance/add/').status_code, 403)
+            self.client.post(f'/admin/student/attendance/{row.pk}/change/', {'student': 'S0', 'course': self.course.id, 'date': DAYS[0], 'is_present': ''})
+            self.client.post(f'/admin/student/attendance/{row.pk}/delete/', {'post': 'yes'})
+        row.refresh_from_db()
+        self.assertTrue(row.is_present)
+        self.assertEqual(self.summaries(), {'S0': (1, 1)})
+
+
+class GradingSchemeTests(CourseTestCase):
+    def test_one_scheme_per_scope(self):
+        scopes = [(None, None), (self.branch, None), (None, self.semester), (self.branch, self.semester)]
+        for branch, semester in scopes:
+            GradingScheme.objects.create(name="First", branch=branch, semester=semester)
+        for branch, semester in scopes:
+            with self.subTest(branch=branch, semester=semester):
+                with self.assertRaises(ValidationError):
+                    GradingScheme(name="Second", branch=branch, semester=semester).full_clean()
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    GradingScheme.objects.create(name="Second", branch=branch, semester=semester)
+
+
+class GradeScaleTests(SimpleTestCase):
+    def letters(self, scale, scores):
+        return [scale.letters[bucket] if bucket >= 0 else None for bucket in scale.bucket(scores).tolist()]
+
+    def test_band_edges(self):
+        scores = [Decimal('0'), Decimal('39.99'), Decimal('40'), Decimal('44.99'), Decimal('45'), Decimal('69.99'), Decimal('70'), Decimal('89.99'), Decimal('90'), Decimal('100')]
+        self.assertEqual(self.letters(DEFAULT_SCALE, scores), ['F', 'F', 'P', 'P', 'C', 'B+', 'A', 'A+', 'O', 'O'])
+
+    def test_float_scores_meet_their_threshold(self):
+        # 0.1 * 3 * 100 is 30.000000000000004 and 89.99 + 0.01 is 89.99999999999999 as floats
+        scale = GradeScale([('P', Decimal('0.3'), 1), ('O', Decimal('90'), 10)])
+        self.assertEqual(self.letters(scale, [0.1 * 3, 89.99 + 0.01, 0.29]), ['P', 'O', None])
+
+    def test_out_of_range_scores(self):
+        scale = GradeScale([('A', Decimal('60'), 9), ('P', Decimal('40'), 4)])   # bands in any order
+        self.assertEqual(self.letters(scale, [-5, 0, 39.99, 40, 59.99, 60, 100, 250]), [None, None, None, 'P', 'P', 'A', 'A', 'A'])
+        self.assertEqual(self.letters(DEFAULT_SCALE, [-0.01, 999.99]), [None, 'O'])
+
+class GpaTests(CourseTestCase):
+    def test_sgpa_and_cgpa_over_semesters(self):
+        second = Semester.objects.create(semester_number=Semester.SECOND, academic=self.academic)
+        scheme = GradingScheme.objects.create(name="Pass/Distinction", semester=second)
+        scheme.bands.create(letter='A', min_score=60, points=9)
+        scheme.bands.create(letter='P', min_score=40, points=4)
+        networks, databases, project = (
+            Course.objects.create(name=code, code=code, branch=self.branch, academic=self.academic, semester=semester, credits=credits)
+            for code, semester, credits in [('CS102', self.semester, 4), ('CS201', second, 2), ('CS202', second, 3)]
+        )
+        self.course.credits = 3
+        self.course.save()
+        for student_id, course, score in [
+            ('S0', self.course, '92'), ('S0', networks, '75'),    # O (10) x 3, A (8) x 4
+            ('S0', databases, '45'), ('S0', project, '30'),       # P (4) x 2; below the lowest band: not counted
+            ('S1', self.course, '50'),                            # B (6)
+        ]:
+            Grade.objects.create(student_id=student_id, course=course, score=Decimal(score))
+        self.assertEqual(regrade(Grade.objects.all()), 5)
+        self.assertEqual(Grade.objects.get(student_id='S0', course=project).grade_point, None)
+
+        student = self.students[0]
+        expected = {self.semester.pk: Decimal('8.86'), second.pk: Decimal('4.00')}   # 62 / 7, 8 / 2
+        self.assertEqual(semester_gpas(student), expected)
+        self.assertEqual(async_to_sync(asemester_gpas)(student), expected)
+        self.assertEqual(cgpa(student), Decimal('7.78'))   # 70 / 9
+        self.assertEqual(async_to_sync(acgpa)(student), Decimal('7.78'))
+        self.assertEqual(sgpa_for_semester(self.semester), {'S0': Decimal('8.86'), 'S1': Decimal('6.00')})
+        self.assertEqual(sgpa_for_semester(second), {'S0': Decimal('4.00')})
+        self.assertIsNone(cgpa(self.students[2]))
+
+class AttendanceMarkingTests(CourseTestCase):
+    def test_sheet_reads_only_the_listed_students(self):
+        data = {'attendance_S0': PRESENT, 'attendance_S1': ABSENT, 'attendance_S2': NO_CHANGE, 'attendance_S9': PRESENT}
+        self.assertEqual(parse_attendance_post(data, ['S0', 'S1', 'S2', 'S3']), {'S0': True, 'S1': False})
+
+    def test_marking_again_replaces_the_day(self):
+        self.assertEqual(mark_attendance(self.course, DAYS[0], {student.id: True for student in self.students}), 4)
+        with CaptureQueriesContext(connection) as queries:
+            mark_attendance(self.course, DAYS[0], {'S0': False, 'S1': False})
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "student_attendance"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0])
+        self.assertEqual(Attendance.objects.count(), 4)
+        self.assertEqual(self.marks(), [('S0', DAYS[0], False), ('S1', DAYS[0], False), ('S2', DAYS[0], True), ('S3', DAYS[0], True)])
+        self.assertEqual(mark_attendance(self.course, DAYS[1], {}), 0)
+
+
+class AttendanceSummaryTests(CourseTestCase):
+    def test_marks_adjust_the_summaries(self):
+        mark_attendance(self.course, DAYS[0], {student.id: True for student in self.students})
+        mark_attendance(self.course, DAYS[1], {'S0': False, 'S1': True})
+        self.assertEqual(self.summaries(), {'S0': (2, 1), 'S1': (2, 2), 'S2': (1, 1), 'S3': (1, 1)})
+        # Marking a day again changes only the present counts, and only where the mark changed
+        mark_attendance(self.course, DAYS[1], {'S0': True, 'S1': False, 'S2': True})
+        self.assertEqual(self.summaries(), {'S0': (2, 2), 'S1': (2, 1), 'S2': (2, 2), 'S3': (1, 1)})
+        mark_attendance(self.course, DAYS[1], {'S0': True, 'S1': False, 'S2': True})
+        self.assertEqual(self.summaries(), {'S0': (2, 2), 'S1': (2, 1), 'S2': (2, 2), 'S3': (1, 1)})
+
+    def test_summary_delta(self):
+        absent = Attendance(student_id='S0', course_id=self.course.id, date=DAYS[0], is_present=False)
+        present = Attendance(student_id='S0', course_id=self.course.id, date=DAYS[0], is_present=True)
+        key = ('S0', self.course.id)
+        self.assertEqual(summary_delta(new=present), {key: (1, 1)})
+        self.assertEqual(summary_delta(old=present), {key: (-1, -1)})
+        self.assertEqual(summary_delta(absent, present), {key: (0, 1)})
+
+
+class AttendanceShortfallTests(CourseTestCase):
+    def setUp(self):
+        super().setUp()
+        # S0 at 100%, S1 at 75% (not below), S2 at 70%, S3 never present
+        for student_id, sessions, present in [('S0', 20, 20), ('S1', 20, 15), ('S2', 20, 14), ('S3', 10, 0)]:
+            AttendanceSummary.objects.create(student_id=student_id, course=self.course, sessions=sessions, present=present)
+
+    def shortfall(self, threshold=75):
+        rows = attendance_shortfall(AttendanceSummary.objects.all(), threshold).order_by('student_id')
+        return [(row.student_id, round(row.percent, 1)) for row in rows]
+
+    def test_students_below_threshold(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.shortfall(), [('S2', 70.0), ('S3', 0.0)])
+        self.assertEqual(self.shortfall(62.5), [('S3', 0.0)])
+        self.assertEqual(self.shortfall(100), [('S1', 75.0), ('S2', 70.0), ('S3', 0.0)])
+
+    def test_students_no_longer_enrolled_are_skipped(self):
+        self.course.students_enrolled.remove(self.students[3])
+        self.assertEqual(self.shortfall(), [('S2', 70.0)])
+
+    def test_sessions_to_recover(self):
+        self.assertEqual(sessions_to_recover(20, 14, 75), 4) # 18 of 24
+        self.assertEqual(sessions_to_recover(10, 0, 75), 30)
+        self.assertEqual(sessions_to_recover(20, 15, 75), 0)
+        self.assertEqual(sessions_to_recover(20, 14, 71), 1)
+        self.assertIsNone(sessions_to_recover(10, 9, 100))
+
+    @override_settings(ATTENDANCE_SHORTFALL_PERCENT=80)
+    def test_threshold(self):
+        self.assertEqual(shortfall_threshold('62.5'), 62.5)
+        for value in (None, '', 'abc', '0', '-5', '101'):
+            with self.subTest(value=value):
+                self.assertEqual(shortfall_threshold(value), 80)
+
+
+class EnrolmentCountTests(CourseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.division_b = Division.objects.create(name="B", branch=self.branch, academic=self.academic)
+        self.other = Course.objects.create(name="Networks", code="CS201", branch=self.branch, academic=self.academic, semester=self.semester)
+
+    def counts(self):
+        """{course code: (enrolled_count, {division name: enrolled})}, zero rows left out."""
+        counts = {course.code: (course.enrolled_count, {}) for course in Course.objects.all()}
+        for row in CourseDivisionCount.objects.filter(enrolled__gt=0).select_related('course', 'division'):
+            counts[row.course.code][1][row.division.name if row.division else None] = row.enrolled
+        return counts
+
+    def assertCounts(self, expected):
+        self.assertEqual(self.counts(), expected)
+        # The same as recomputing them from the enrolment table
+        rebuild_enrolment_counts()
+        self.assertEqual(self.counts(), expected)
+
+    def test_enrol_and_unenrol(self):
+        self.assertCounts({'CS101': (4, {'A': 4}), 'CS201': (0, {})})
+        self.students[0].enrolled_courses.add(self.other)
+        self.other.students_enrolled.add(self.students[0], self.students[1])   # S0 already enrolled
+        self.assertCounts({'CS101': (4, {'A': 4}), 'CS201': (2, {'A': 2})})
+        self.course.students_enrolled.remove(self.students[2], self.students[2])
+        self.students[1].enrolled_courses.remove(self.course, self.other)
+        self.assertCounts({'CS101': (2, {'A': 2}), 'CS201': (1, {'A': 1})})
+
+    def test_division_change(self):
+        self.other.students_enrolled.add(self.students[0])
+        student = Student.objects.get(pk='S0')
+        student.division = self.division_b
+        with CaptureQueriesContext(connection) as queries:
+            student.save()
+        stored_row_reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT "student_student"."')]
+        self.assertEqual(len(stored_row_reads), 1, stored_row_reads)   # shared by the counters and the profile cache
+        self.assertCounts({'CS101': (4, {'A': 3, 'B': 1}), 'CS201': (1, {'B': 1})})
+        student.division = None
+        student.save()
+        student.first = "Renamed"
+        student.save()
+        self.assertCounts({'CS101': (4, {'A': 3, None: 1}), 'CS201': (1, {None: 1})})
+
+    def test_clear(self):
+        self.other.students_enrolled.add(*self.students[:2])
+        self.course.students_enrolled.clear()
+        self.assertCounts({'CS101': (0, {}), 'CS201': (2, {'A': 2})})
+        self.students[0].enrolled_courses.clear()
+        self.assertCounts({'CS101': (0, {}), 'CS201': (1, {'A': 1})})
+
+    def test_deleted_student(self):
+        self.students[3].delete()
+        self.assertCounts({'CS101': (3, {'A': 3}), 'CS201': (0, {})})
+
+class ImporterTests(CourseTestCase):
+    def student_row(self, **values):
+        row = {
+            'id': 'N1', 'first': 'Asha', 'last': 'Patil', 'email': 'asha@example.com', 'prn': '2001',
+            'academic': '2025-26', 'branch': 'CS', 'semester': Semester.FIRST, 'division': 'A', 'courses': 'CS101',
+        }
+        row.update(values)
+        return row
+
+    def import_students(self, *rows):
+        rejects = []
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = import_students(enumerate(rows, start=2), chunk_size=2, on_reject=lambda line, row, reason: rejects.append((line, reason)))
+        return stats, rejects
+
+    def test_good_and_bad_student_rows(self):
+        stats, rejects = self.import_students(
+            self.student_row(),
+            self.student_row(id='N2', email='not an email'),
+            self.student_row(id='N3', prn='12x'),
+            self.student_row(id='N4', division='Z'),
+            self.student_row(id='N' * 16),
+            self.student_row(id='N5', first='F' * 65),
+            self.student_row(id='N6', last='L' * 65, first=''),
+            self.student_row(id='N7', courses='CS101;CS999'),
+            self.student_row(id='N8', courses=''),
+        )
+        self.assertEqual((stats.processed, stats.imported, stats.rejected), (9, 2, 7))
+        self.assertEqual(rejects, [
+            (3, "invalid email 'not an email'"),
+            (4, "invalid prn '12x'"),
+            (5, "unknown division ('CS', '2025-26', 'Z')"),
+            (6, "id longer than 15 characters"),
+            (7, "first longer than 64 characters"),
+            (8, "missing first"),
+            (9, "unknown course ('CS', '2025-26', 'CS999')"),
+        ])
+        self.assertEqual(sorted(Student.objects.filter(pk__startswith='N').values_list('pk', flat=True)), ['N1', 'N8'])
+        self.assertEqual(Course.objects.get(pk=self.course.pk).enrolled_count, 5)
+
+    def test_reimport_updates_students_and_versions(self):
+        division_b = Division.objects.create(name="B", branch=self.branch, academic=self.academic)
+        self.import_students(self.student_row())
+        user = User.objects.create_user('asha')
+        Student.objects.filter(pk='N1').update(user=user)
+        self.assertEqual(load_profiles(user.pk)[0].last, 'Patil')
+        versions = get_version('student', 'N1'), get_version('course', self.course.pk)
+
+        stats, _ = self.import_students(self.student_row(last='Patil-Rao', division='B'))
+        self.assertEqual(stats.imported, 1)
+        student = Student.objects.get(pk='N1')
+        self.assertEqual((student.last, student.division_id, student.user_id), ('Patil-Rao', division_b.pk, user.pk))
+        self.assertEqual(Student.objects.count(), 5)
+        self.assertEqual(dict(self.course.division_counts.values_list('division__name', 'enrolled')), {'A': 4, 'B': 1})
+        self.assertNotEqual((get_version('student', 'N1'), get_version('course', self.course.pk)), versions)
+        self.assertEqual(load_profiles(user.pk)[0].last, 'Patil-Rao')
+
+    def test_grades(self):
+        rows = [
+            {'student_id': 'S0', 'branch': 'CS', 'academic': '2025-26', 'course_code': 'CS101', 'score': '71.5'},
+            {'student_id': 'S1', 'branch': 'CS', 'academic': '2025-26', 'course_code': 'CS101', 'score': '1000'},
+            {'student_id': 'S9', 'branch': 'CS', 'academic': '2025-26', 'course_code': 'CS101', 'score': '50'},
+            {'student_id': 'S2', 'branch': 'CS', 'academic': '2025-26', 'course_code': 'CS101', 'score': ''},
+        ]
+        rejects = []
+        version = get_version('course', self.course.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            stats, course_ids = import_grades(enumerate(rows, start=2), on_reject=lambda line, row, reason: rejects.append((line, reason)))
+        self.assertEqual((stats.imported, stats.rejected, course_ids), (1, 3, {self.course.pk}))
+        self.assertEqual(rejects, [(3, "score 1000 out of range"), (5, "missing score"), (4, "unknown student 'S9'")])
+        self.assertNotEqual(get_version('course', self.course.pk), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_grades([(2, {**rows[0], 'score': '80'})])
+        self.assertEqual(list(Grade.objects.values_list('student_id', 'score')), [('S0', Decimal('80.00'))])
+
+class RefDataTests(CourseTestCase):
+    def setUp(self):
+        super().setUp()
+        refdata.registry.clear()
+
+    def test_snapshot_links_the_reference_rows(self):
+        refdata.get(Branch, self.branch.pk) # loads the snapshot
+        with self.assertNumQueries(0):
+            division = refdata.get(Division, self.division.pk)
+            self.assertIs(division.branch, refdata.get(Branch, self.branch.pk))
+            self.assertIs(refdata.get(Semester, self.semester.pk).academic, division.academic)
+            self.assertIsNone(refdata.get(Branch, None))
+            self.assertIsNone(refdata.get(Branch, 999))
+        snapshot = refdata.registry.snapshot()
+        self.assertEqual(snapshot.branch_ids, {'CS': self.branch.pk})
+        self.assertEqual(snapshot.division_ids, {('CS', '2025-26', 'A'): self.division.pk})
+        self.assertEqual(snapshot.semester_ids, {('2025-26', Semester.FIRST): self.semester.pk})
+
+    def test_attach_fills_foreign_keys_without_queries(self):
+        refdata.registry.snapshot()
+        students = list(Student.objects.order_by('pk'))
+        with self.assertNumQueries(0):
+            refdata.attach(students, 'division', 'branch', 'semester')
+            self.assertEqual({(student.division.name, student.branch.code) for student in students}, {('A', 'CS')})
+
+    def test_changes_are_seen_after_save(self):
+        self.assertEqual(refdata.get(Branch, self.branch.pk).name, "Computer")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.branch.name = "Computing"
+            self.branch.save()
+        self.assertEqual(refdata.get(Branch, self.branch.pk).name, "Computing")
+        with self.captureOnCommitCallbacks(execute=True):
+            division = Division.objects.create(name="B", branch=self.branch, academic=self.academic)
+        self.assertEqual(sorted(d.name for d in refdata.instances(Division)), ["A", "B"])
+        with self.captureOnCommitCallbacks(execute=True):
+            semester = Semester.objects.create(semester_number=Semester.SECOND, academic=self.academic)
+            semester.delete()
+        self.assertIsNone(refdata.get(Semester, semester.pk))
+        self.assertEqual(refdata.get(Division, division.pk).name, "B")
+
+    @override_settings(REFDATA_VERSION_CHECK_INTERVAL=0)
+    def test_other_processes_reload_on_the_version_check(self):
+        other = refdata.Registry() # another worker process's registry
+        self.assertEqual(other.snapshot().by_model[Branch][self.branch.pk].name, "Computer")
+        with self.captureOnCommitCallbacks(execute=True):
+            Branch.objects.filter(pk=self.branch.pk).update(name="Computing")
+            refdata.invalidate() # bulk writes bypass the signals
+        self.assertEqual(other.snapshot().by_model[Branch][self.branch.pk].name, "Computing")
+
+    def test_version_is_checked_only_every_interval(self):
+        other = refdata.Registry()
+        before = other.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            refdata.invalidate()
+        with override_settings(REFDATA_VERSION_CHECK_INTERVAL=60), self.assertNumQueries(0):
+            self.assertIs(other.snapshot(), before)
+
+    def test_warm(self):
+        with mock.patch('student.refdata.connections') as connections:
+            refdata.warm()
+        connections.close_all.assert_called_once_with()
+        with self.assertNumQueries(0):
+            refdata.get(Branch, self.branch.pk)
+        # Before the database is migrated or reachable, warm() leaves the registry empty
+        refdata.registry.clear()
+        with mock.patch('student.refdata.Snapshot', side_effect=DatabaseError), mock.patch('student.refdata.connections'):
+            refdata.warm()
+        self.assertIsNone(refdata.registry._snapshot)
+
+
+class StudentSearchTests(CourseTestCase):
+    def found(self, query):
+        return sorted(search.search_students(Student.objects.all(), query).values_list('pk', flat=True))
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.found('first2'), ['S2'])
+        self.assertEqual(self.found('LAST s1@ex'), ['S1'])
+        self.assertEqual(self.found('100'), ['S0', 'S1', 'S2', 'S3'])
+        self.assertEqual(self.found('s3 first1'), [])
+        self.assertEqual(self.found(' , '), ['S0', 'S1', 'S2', 'S3'])
+
+    def test_index_follows_writes(self):
+        Student.objects.filter(pk='S1').update(first='Patil')
+        self.assertEqual(self.found('pat'), ['S1'])
+        self.assertEqual(self.found('first1'), [])
+        Student.objects.filter(pk='S1').delete()
+        self.assertEqual(self.found('pat'), [])
+
+    def test_index_does_not_depend_on_rowids(self):
+        # What VACUUM may do to a table without an INTEGER PRIMARY KEY
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE student_student SET rowid = 1000 - rowid")
+        self.assertEqual(self.found('first2'), ['S2'])
+        Student.objects.filter(pk='S2').update(first='Patil')
+        self.assertEqual((self.found('pat'), self.found('first2')), (['S2'], []))
+
+    def test_like_fallback_matches_the_fts_index(self):
+        with mock.patch.object(search, '_fts_ready', return_value=False):
+            self.assertIn('LIKE', str(search.search_students(Student.objects.all(), 'pat 2000').query))
+            self.assertEqual(self.found('LAST s1'), ['S1'])
+            self.assertEqual(self.found('s3 first1'), [])
+
+    def test_rowid_keyed_index_is_replaced(self):
+        with connection.cursor() as cursor:
+            for trigger in search.SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {trigger}")
+            cursor.execute(f"DROP TABLE {search.FTS_TABLE}")
+            cursor.execute(f"""CREATE VIRTUAL TABLE {search.FTS_TABLE} USING fts5(
+                search_text, content='student_student', content_rowid='rowid', prefix='2 3'
+            )""")
+        search.install_search_index()
+        self.assertEqual(self.found('first2'), ['S2'])
+
+    def test_postgresql_index(self):
+        db = mock.MagicMock(vendor='postgresql')
+        cursor = db.cursor.return_value.__enter__.return_value
+        with mock.patch.object(search, 'connections', {'default': db}):
+            search.install_search_index(rebuild=True)
+            self.assertEqual([call.args[0] for call in cursor.execute.call_args_list], search.POSTGRESQL_DDL + ['REINDEX INDEX student_search_trgm'])
+            # Without the privilege to create the extension, search runs unindexed
+            cursor.execute.side_effect = DatabaseError("permission denied")
+            with self.assertLogs('sms.search', 'ERROR'):
+                search.install_search_index()
+
+
+class SubmissionTests(CourseTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_settings = override_settings(MEDIA_ROOT=media)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.assignment = Assignment.objects.create(
+            title="Essay", course=self.course, due_date=timezone.now() + datetime.timedelta(days=1), max_score=10,
+        )
+        self.url = f'/student/assignments/{self.assignment.id}/submit/'
+        for student in self.students[:2]:
+            Student.objects.filter(pk=student.pk).update(user=User.objects.create_user(student.pk.lower(), password='secret'))
+        self.client.login(username='s0', password='secret')
+
+    def submit(self, content, name='essay.pdf', client=None):
+        return (client or self.client).post(self.url, {'file': SimpleUploadedFile(name, content)})
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), submissions.blob_path('blobs'))
+            for root, _, names in os.walk(submissions.blob_path('blobs')) for name in names
+        )
+
+    def test_oversized_file_is_skipped(self):
+        handler = submissions.BlobUploadHandler(max_size=4)
+        handler.new_file('file', 'essay.pdf', 'application/pdf', None)
+        path = handler.file.temporary_file_path()
+        handler.receive_data_chunk(b'abc', 0)
+        with self.assertRaises(SkipFile):
+            handler.receive_data_chunk(b'de', 3)
+        self.assertEqual(handler.rejected, ['essay.pdf'])
+        self.assertFalse(os.path.exists(path))
+
+        with override_settings(SUBMISSION_MAX_BYTES=4):
+            response = self.submit(b'too long')
+        self.assertRedirects(response, '/student/assignments/', fetch_redirect_response=False)
+        self.assertFalse(Submission.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_identical_uploads_share_one_blob(self):
+        self.submit(b'the same essay')
+        self.client.login(username='s1', password='secret')
+        self.submit(b'the same essay', name='copy.pdf')
+        blob = StoredBlob.objects.get()
+        self.assertEqual(sorted(Submission.objects.values_list('student_id', 'filename', 'blob')), [
+            ('S0', 'essay.pdf', blob.pk), ('S1', 'copy.pdf', blob.pk),
+        ])
+        self.assertEqual(self.stored_files(), [f'{blob.pk[:2]}/{blob.pk}'])
+        with submissions.open_blob(blob) as handle:
+            self.assertEqual(handle.read(), b'the same essay')
+
+    def test_prune_blobs(self):
+        self.submit(b'first draft')
+        self.submit(b'final version')   # replaces the first draft, whose blob is now unreferenced
+        kept = Submission.objects.get().blob
+        stale, fresh = (os.path.join(submissions.upload_dir(), name) for name in ('upload-stale', 'upload-fresh'))
+        for path in (stale, fresh):
+            open(path, 'wb').close()
+        old = time.time() - submissions.STALE_UPLOAD_AGE - 60
+        os.utime(stale, (old, old))
+
+        self.assertEqual(submissions.prune_blobs(), 1)
+        self.assertEqual(list(StoredBlob.objects.all()), [kept])
+        self.assertEqual(self.stored_files(), [f'{kept.pk[:2]}/{kept.pk}', 'tmp/upload-fresh'])
+        self.assertEqual(submissions.prune_blobs(), 0)
+
+    def test_archive(self):
+        self.submit(b'essay by s0', name='my essay?.pdf')
+        self.client.login(username='s1', password='secret')
+        self.submit(b'essay by s1')
+        rows = list(Submission.objects.select_related('student', 'assignment', 'blob').order_by('student_id'))
+        with mock.patch.object(submissions, 'ARCHIVE_CHUNK_SIZE', 4):
+            pieces = list(submissions.submissions_archive(rows))
+        self.assertGreater(len(pieces), 6)   # streamed a few bytes at a time, not built whole
+        with zipfile.ZipFile(io.BytesIO(b''.join(pieces))) as archive:
+            self.assertEqual(archive.namelist(), ['S0_Last0_First0/my_essay.pdf', 'S1_Last1_First1/essay.pdf', 'submissions.csv'])
+            self.assertEqual(archive.read('S1_Last1_First1/essay.pdf'), b'essay by s1')
+            manifest = list(csv.reader(io.StringIO(archive.read('submissions.csv').decode())))
+        self.assertEqual(manifest[0], submissions.MANIFEST_HEADER)
+        self.assertEqual([(row[0], row[3], row[5], row[6]) for row in manifest[1:]], [
+            (row.student_id, row.filename, 'No', row.blob_id) for row in rows
+        ])
+
+    def test_post_without_csrf_token_is_rejected(self):
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='s0', password='secret')
+        self.assertEqual(self.submit(b'essay', client=client).status_code, 403)
+        self.assertFalse(Submission.objects.exists())
+        self.assertEqual(self.stored_files(), [])   # the streamed upload was discarded
+
+        refdata.registry.snapshot()   # the page is measured against a warm process's budget
+        client.get('/student/assignments/')
+        token = client.cookies['csrftoken'].value
+        response = client.post(self.url, {'file': SimpleUploadedFile('essay.pdf', b'essay'), 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Submission.objects.exists())
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "student"
 
@@ -16,4 +16,13 @@ urlpatterns = [
     path('grades/', views.student_grades, name='grades'),
     path('attendance/', views.student_attendance, name='attendance'),
     path('assignments/', views.student_assignments, name='assignments'),
+    path('assignments/<int:assignment_id>/submit/', views.student_submit_assignment, name='submit_assignment'),
+    path('transcript/export/', views.student_transcript_export, name='transcript_export'),
+
+    # Read-only JSON API (ETag / If-None-Match aware)
+    path('api/profile/', api.profile, name='api_profile'),
+    path('api/courses/', api.courses, name='api_courses'),
+    path('api/grades/', api.grades, name='api_grades'),
+    path('api/attendance/', api.attendance, name='api_attendance'),
+    path('api/assignments/', api.assignments, name='api_assignments'),
 ]
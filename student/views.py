@@ -1,7 +1,21 @@
+import asyncio
+
+from django.conf import settings
+from django.contrib import messages
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from .models import Student, Academic, Branch, Semester, Division, Course, Grade, Attendance, Assignment
+from django.db.models import Prefetch, Q
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+from .models import Student, Academic, Branch, Semester, Division, Course, Grade, Attendance, AttendanceSummary, Assignment, Submission
+from . import refdata
+from .grading import acgpa, asemester_gpas
+from .attendance import attendance_records
+from .exports import transcript_export
+from .submissions import BlobUploadHandler, discard_uploads, save_submission
+from main.pagination import apaginate
+from teacher.models import TeachingAssignment
 from .forms import StudentLoginForm # You will create this form later
 
 # --- Authentication Views (can be moved to a 'main' or 'accounts' app later) ---
@@ -40,33 +54,38 @@ def student_logout_view(request):
     return redirect('main:home') # Redirect to your main app's home page (e.g., login choice)
 
 # --- Student Dashboard and Information Views ---
+#
+# The read-heavy pages below are async views: under ASGI (sms/asgi.py) a request waiting on
+# the database no longer holds a worker, and independent queries are awaited together with
+# asyncio.gather. Everything the template shows is loaded in the view, since templates
+# rendered from an async view must not run queries. Under WSGI they still work, Django runs
+# them in an event loop per request.
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
 
 @login_required
-def student_dashboard(request):
+async def student_dashboard(request):
     """
     Displays the student's main dashboard.
     Shows summary info and links to other student sections.
     """
-    # Assuming the logged-in user is a student.
-    # If Student model had a OneToOneField to User, you'd do:
-    # student = get_object_or_404(Student, user=request.user)
-    # For now, let's assume we fetch by some unique ID from the User or session,
-    # or if we allow multiple Students per User for testing, just pick one.
-    # For a real system, map the logged-in user to their Student profile.
-    
-    # Placeholder: Fetch a student, e.g., the first one for testing.
-    # In a real app, you'd map request.user to a specific student object.
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-        # Example: student = get_object_or_404(Student, user__username=request.user.username)
-        # Or if Student has a OneToOneField 'user_account' to User:
-        # student = get_object_or_404(Student, user_account=request.user)
-    except Student.DoesNotExist:
-        # Handle case where no student exists or logged-in user is not a student
-        return render(request, 'student/no_student_profile.html') # Create this template
+    # The current student is resolved once per request (and cached) by main.middleware.CurrentProfileMiddleware
+    student = (await request.profiles.aresolve()).student
+    if student is None:
+        # Logged-in user is not linked to a Student profile
+        return render(request, 'student/no_student_profile.html')
+
+    # Per-course attendance percentages come from the maintained summary rows, one per course.
+    # Loaded even when the template's cached body looks valid: it can expire before {% cache %}
+    # renders, which would then cache an empty table.
+    attendance_summaries = await _alist(
+        AttendanceSummary.objects.filter(student=student).select_related('course').order_by('course__code')
+    )
 
     context = {
         'student': student,
+        'attendance_summaries': attendance_summaries,
     }
     return render(request, 'student/dashboard.html', context)
 
@@ -75,9 +94,8 @@ def student_profile(request):
     """
     Displays the detailed profile of the logged-in student.
     """
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-    except Student.DoesNotExist:
+    student = request.profiles.student
+    if student is None:
         return render(request, 'student/no_student_profile.html')
 
     context = {
@@ -90,13 +108,19 @@ def student_courses(request):
     """
     Lists the courses the student is enrolled in.
     """
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-    except Student.DoesNotExist:
+    student = request.profiles.student
+    if student is None:
         return render(request, 'student/no_student_profile.html')
 
     # Get courses the student is enrolled in using the ManyToMany relationship
-    enrolled_courses = student.enrolled_courses.all().select_related('branch', 'semester__academic') # Optimizing queries
+    # Teachers of the student's own division (or of every division), in one extra query
+    division_teachers = Prefetch(
+        'teaching_assignments',
+        queryset=TeachingAssignment.objects.filter(Q(division__isnull=True) | Q(division_id=student.division_id)).select_related('teacher__user'),
+        to_attr='division_teachers',
+    )
+    # Branch and semester (with its academic year) come from the in-process reference data, not joins
+    enrolled_courses = refdata.attach(student.enrolled_courses.prefetch_related(division_teachers), 'branch', 'semester')
 
     context = {
         'student': student,
@@ -105,60 +129,134 @@ def student_courses(request):
     return render(request, 'student/courses.html', context)
 
 @login_required
-def student_grades(request):
+async def student_grades(request):
     """
     Displays the grades for the student's courses.
     """
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-    except Student.DoesNotExist:
+    student = (await request.profiles.aresolve()).student
+    if student is None:
         return render(request, 'student/no_student_profile.html')
 
-    # Get all grades for this student, ordered by course and date if applicable
-    grades = Grade.objects.filter(student=student).select_related('course').order_by('course__code')
+    # All grades for this student ordered by course, SGPA per semester and overall CGPA:
+    # three independent queries
+    grades, sgpa_by_semester, overall_cgpa = await asyncio.gather(
+        _alist(Grade.objects.filter(student=student).select_related('course').order_by('course__code')),
+        asemester_gpas(student),
+        acgpa(student),
+    )
+    semesters = [await refdata.aget(Semester, semester_id) for semester_id in sorted(sgpa_by_semester)]
+    semester_results = [
+        {'semester': semester, 'sgpa': sgpa_by_semester[semester.id]}
+        for semester in semesters
+    ]
 
     context = {
         'student': student,
         'grades': grades,
+        'semester_results': semester_results,
+        'cgpa': overall_cgpa,
     }
     return render(request, 'student/grades.html', context)
 
 @login_required
-def student_attendance(request):
+async def student_attendance(request):
     """
     Displays the attendance records for the student.
     """
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-    except Student.DoesNotExist:
+    student = (await request.profiles.aresolve()).student
+    if student is None:
         return render(request, 'student/no_student_profile.html')
 
-    # Get all attendance records for this student, ordered by date and course
-    attendance_records = Attendance.objects.filter(student=student).select_related('course').order_by('-date', 'course__code')
+    # Attendance records for this student, newest first, one keyset page at a time, and the per-course totals
+    attendance_page, attendance_summaries = await asyncio.gather(
+        apaginate(request, attendance_records().filter(student=student).select_related('course'), ['-date', 'course__code']),
+        _alist(AttendanceSummary.objects.filter(student=student).select_related('course').order_by('course__code')),
+    )
 
     context = {
         'student': student,
-        'attendance_records': attendance_records,
+        'attendance_records': attendance_page.object_list,
+        'page': attendance_page,
+        'attendance_summaries': attendance_summaries,
     }
     return render(request, 'student/attendance.html', context)
 
 @login_required
-def student_assignments(request):
+async def student_assignments(request):
     """
     Lists all assignments for the student's enrolled courses.
     """
-    try:
-        student = Student.objects.first() # !!! Replace with actual logic to get *current* student !!!
-    except Student.DoesNotExist:
+    student = (await request.profiles.aresolve()).student
+    if student is None:
         return render(request, 'student/no_student_profile.html')
 
     # Get assignments for all courses the student is enrolled in
     # This assumes Assignment has a ForeignKey to Course, and Course has ManyToMany to Student
     assigned_courses_ids = student.enrolled_courses.values_list('id', flat=True)
-    assignments = Assignment.objects.filter(course__id__in=assigned_courses_ids).order_by('due_date')
+    assignments_page = await apaginate(request, Assignment.objects.filter(course__id__in=assigned_courses_ids).select_related('course'), ['due_date'])
+    # The student's own submissions for the assignments on this page
+    submissions = Submission.objects.filter(student=student, assignment__in=[assignment.pk for assignment in assignments_page])
+    submitted = {submission.assignment_id: submission async for submission in submissions}
+    for assignment in assignments_page:
+        assignment.submission = submitted.get(assignment.pk)
+        if assignment.submission is not None:
+            assignment.submission.assignment = assignment
 
     context = {
         'student': student,
-        'assignments': assignments,
+        'assignments': assignments_page.object_list,
+        'page': assignments_page,
+        'max_upload_mb': settings.SUBMISSION_MAX_BYTES // (1024 * 1024),
     }
     return render(request, 'student/assignments.html', context)
+
+@login_required
+@csrf_exempt
+def student_submit_assignment(request, assignment_id):
+    """
+    Accepts a file for one of the student's assignments (POST, multipart field ``file``).
+    Submitting again replaces the earlier file; submissions after the due date are kept
+    and shown as late.
+    """
+    # The upload streams to disk through BlobUploadHandler. It has to be installed before
+    # anything reads request.POST, CSRF checking included, so that runs afterwards.
+    handler = BlobUploadHandler(request)
+    request.upload_handlers = [handler]
+    if int(request.META.get('CONTENT_LENGTH') or 0) > handler.max_size + 64 * 1024:
+        # Declared too large: refused before reading the body
+        messages.error(request, f"Files can be at most {handler.max_size // (1024 * 1024)} MB.")
+        return redirect('student:assignments')
+    try:
+        return _submit_assignment(request, assignment_id, handler)
+    finally:
+        if hasattr(request, '_files'):
+            discard_uploads(request.FILES) # anything not moved into the store
+
+@csrf_protect
+@require_POST
+def _submit_assignment(request, assignment_id, handler):
+    student = request.profiles.student
+    if student is None:
+        return render(request, 'student/no_student_profile.html')
+    assignment = get_object_or_404(Assignment, pk=assignment_id, course__students_enrolled=student)
+
+    upload = request.FILES.get('file')
+    if handler.rejected:
+        messages.error(request, f"Files can be at most {handler.max_size // (1024 * 1024)} MB.")
+    elif upload is None or not upload.size:
+        messages.error(request, "Choose a file to submit.")
+    else:
+        submission = save_submission(assignment, student, upload)
+        messages.success(request, f"Submitted {submission.filename} for {assignment.title}{' (late)' if submission.is_late else ''}.")
+    return redirect('student:assignments')
+
+@login_required
+def student_transcript_export(request):
+    """
+    Streams the student's transcript (every graded course) as CSV.
+    """
+    student = request.profiles.student
+    if student is None:
+        return render(request, 'student/no_student_profile.html')
+
+    return transcript_export(f"transcript_{student.id}.csv", student)
@@ -1,10 +1,45 @@
 from django.contrib import admin
-from .models import Teacher
+from .models import Room, Teacher, TeachingAssignment, TimetableSlot
+
+
+class TeachingAssignmentInline(admin.TabularInline):
+    model = TeachingAssignment
+    extra = 0
+    raw_id_fields = ('course',)
+
 
 # You can customize the admin display for Teacher
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ('user', 'employee_id', 'branch', 'phone_number')
     list_filter = ('branch',)
+    list_select_related = ('user', 'branch')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'employee_id')
     raw_id_fields = ('user', 'branch') # Use raw_id_fields for ForeignKey to User for better UI
+    inlines = [TeachingAssignmentInline]
+
+
+@admin.register(TeachingAssignment)
+class TeachingAssignmentAdmin(admin.ModelAdmin):
+    list_display = ('teacher', 'course', 'division', 'semester')
+    list_filter = ('semester', 'division')
+    list_select_related = ('teacher__user', 'course', 'division', 'semester__academic')
+    search_fields = ('teacher__user__username', 'teacher__employee_id', 'course__code', 'course__name')
+    raw_id_fields = ('teacher', 'course')
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'capacity')
+    search_fields = ('name',)
+
+
+@admin.register(TimetableSlot)
+class TimetableSlotAdmin(admin.ModelAdmin):
+    """Saving a slot that clashes with another (teacher, division or room) is refused by TimetableSlot.clean()."""
+    list_display = ('course', 'division', 'teacher', 'room', 'weekday', 'starts_at', 'ends_at')
+    list_filter = ('weekday', 'course__semester', 'room')
+    list_select_related = ('course', 'division', 'teacher__user', 'room')
+    search_fields = ('course__code', 'teacher__employee_id', 'room__name')
+    raw_id_fields = ('teacher', 'course')
+    ordering = ('weekday', 'starts_at')
@@ -0,0 +1,141 @@
+"""
+Read-only JSON versions of the teacher course pages, for the mobile app.
+
+ETags come from the course's data version (main.versioning), so an unchanged poll costs
+the course access check and nothing else. Rows are serialized from values() projections.
+"""
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import F
+from django.http import JsonResponse
+
+from main.api import error, page_links, versioned_json
+from main.pagination import paginate
+from main.versioning import get_versions
+from student.attendance import attendance_on
+from student.models import Assignment, Course, Division, Grade, Student
+from student.search import query_words, search_students
+from .models import courses_taught_by, teaching_division_ids
+
+
+def teacher_course(request, course_id):
+    """The course if the logged-in teacher may see it, else None. Looked up once per request."""
+    if not hasattr(request, '_api_course'):
+        teacher_profile = request.profiles.teacher
+        course = None
+        if teacher_profile is not None:
+            course = courses_taught_by(teacher_profile).filter(id=course_id).first()
+        request._api_course = course
+    return request._api_course
+
+
+def course_etag(request, course_id, *args, **kwargs):
+    course = teacher_course(request, course_id)
+    if course is None:
+        return None
+    # Per teacher: what they see of the course depends on the divisions they take
+    return f"t{request.profiles.teacher.pk}-c{course.pk}-" + '-'.join(get_versions(('course', course.pk), ('profiles',), ('data',)))
+
+
+def course_api(view):
+    """versioned_json with the course ETag; the view receives the Course instead of its id."""
+    @wraps(view)
+    def wrapper(request, course_id, *args, **kwargs):
+        course = teacher_course(request, course_id)
+        if course is None:
+            return error('Course not found.', 404)
+        return view(request, course, *args, **kwargs)
+    return versioned_json(course_etag)(wrapper)
+
+
+SEARCH_LIMIT = 20
+
+
+def _roster(students):
+    return students.order_by('last', 'first').values('id', 'first', 'last', 'email', division_name=F('division__name'))
+
+
+def _in_teaching_divisions(request, course, rows, lookup='student__division_id__in'):
+    """Limits ``rows`` to the students of the divisions the teacher takes in ``course``."""
+    division_ids = teaching_division_ids(request.profiles.teacher, course)
+    if division_ids is None:
+        return rows
+    return rows.filter(**{lookup: division_ids})
+
+
+@course_api
+def course_detail(request, course):
+    """Course details and enrolled students in the teacher's divisions (mirrors teacher:course_detail)."""
+    data = Course.objects.filter(pk=course.pk).values(
+        'id', 'name', 'code', 'credits',
+        branch_name=F('branch__name'),
+        semester_number=F('semester__semester_number'),
+        academic_year=F('academic__year'),
+    ).get()
+    students = _in_teaching_divisions(request, course, course.students_enrolled.all(), lookup='division_id__in')
+    return JsonResponse({'course': data, 'students': list(_roster(students))})
+
+
+@course_api
+def course_attendance(request, course):
+    """
+    Divisions with students in the course; with ?division=<id>&date=YYYY-MM-DD also that
+    division's students and their status for the day, null when unmarked (mirrors teacher:manage_attendance).
+    """
+    divisions = Division.objects.filter(course_counts__course=course, course_counts__enrolled__gt=0).order_by('name')
+    division_ids = teaching_division_ids(request.profiles.teacher, course)
+    if division_ids is not None:
+        divisions = divisions.filter(id__in=division_ids)
+    payload = {'divisions': list(divisions.values('id', 'name', enrolled=F('course_counts__enrolled')))}
+
+    if request.GET.get('division') and request.GET.get('date'):
+        if division_ids is not None and request.GET['division'] not in {str(pk) for pk in division_ids}:
+            return error('You do not teach this division.', 404)
+        try:
+            date_obj = datetime.strptime(request.GET['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return error('date must be YYYY-MM-DD.', 400)
+        students = list(_roster(Student.objects.filter(division_id=request.GET['division'], enrolled_courses=course)))
+        status_by_student = attendance_on(course, date_obj, [s['id'] for s in students])
+        for student in students:
+            student['is_present'] = status_by_student.get(student['id'])
+        payload.update(date=date_obj, students=students)
+    return JsonResponse(payload)
+
+
+@course_api
+def course_grades(request, course):
+    """One keyset page of the course's grades in the teacher's divisions, by student name (mirrors teacher:manage_grades)."""
+    rows = _in_teaching_divisions(request, course, Grade.objects.filter(course=course)).values(
+        'student_id', 'score', 'grade_letter', 'grade_point',
+        first=F('student__first'),
+        last=F('student__last'),
+        division_name=F('student__division__name'),
+    )
+    page = paginate(request, rows, ['student__last', 'student__first'])
+    return JsonResponse({'grades': page.object_list, **page_links(page)})
+
+
+@course_api
+def course_assignments(request, course):
+    """One keyset page of the course's assignments by due date (mirrors teacher:manage_assignments)."""
+    rows = Assignment.objects.filter(course=course).values('id', 'title', 'description', 'due_date', 'max_score')
+    page = paginate(request, rows, ['due_date'])
+    return JsonResponse({'assignments': page.object_list, **page_links(page)})
+
+
+@course_api
+def course_student_search(request, course):
+    """
+    Up to SEARCH_LIMIT enrolled students (in the teacher's divisions) matching ?q=, by id,
+    name, email or PRN prefix (student.search), for the roster search box.
+    """
+    query = request.GET.get('q', '')
+    if not query_words(query):
+        return error('q must contain a word to search for.', 400)
+    students = _in_teaching_divisions(request, course, Student.objects.filter(enrolled_courses=course), lookup='division_id__in')
+    rows = search_students(students, query).order_by('last', 'first').values(
+        'id', 'first', 'last', 'email', 'prn', division_name=F('division__name'),
+    )[:SEARCH_LIMIT]
+    return JsonResponse({'query': query, 'students': list(rows)})
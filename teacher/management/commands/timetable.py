@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher.timetable import generate_timetable, validate_timetable
+
+
+class Command(BaseCommand):
+    help = "Generates the weekly timetable of semesters, or checks timetables for teacher, division and room clashes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['generate', 'validate'])
+        parser.add_argument('--semester', type=int, action='append', dest='semesters', help="Semester id (repeatable; required to generate)")
+
+    def handle(self, *args, **options):
+        semesters = options['semesters']
+        start = time.perf_counter()
+        if options['action'] == 'generate':
+            if not semesters:
+                raise CommandError("Give the semester(s) to generate with --semester.")
+            for semester_id in semesters:
+                created, unplaced = generate_timetable(semester_id)
+                self.stdout.write(f"Semester {semester_id}: {created} slot(s).")
+                for teacher_id, course, division_id, missing in unplaced:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {course.code} division {division_id} (teacher {teacher_id}): {missing} period(s) could not be placed"
+                    ))
+
+        clashes = validate_timetable(semesters)
+        elapsed = time.perf_counter() - start
+        for resource, slot, other in clashes:
+            self.stdout.write(self.style.ERROR(f"{resource} clash: {slot} / {other}"))
+        if clashes:
+            raise CommandError(f"{len(clashes)} clash(es) found in {elapsed:.2f}s.")
+        self.stdout.write(self.style.SUCCESS(f"No clashes ({elapsed:.2f}s)."))
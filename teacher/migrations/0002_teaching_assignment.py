@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0007_view_query_indexes'),
+        ('teacher', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeachingAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to='student.course')),
+                ('division', models.ForeignKey(blank=True, help_text='Leave empty if the teacher takes every division of the course', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to='student.division')),
+                ('semester', models.ForeignKey(blank=True, help_text="Defaults to the course's semester", on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to='student.semester')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teaching_assignments', to='teacher.teacher')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='courses_taught',
+            field=models.ManyToManyField(blank=True, help_text='Courses this teacher teaches (see TeachingAssignment)', related_name='teachers', through='teacher.TeachingAssignment', to='student.course'),
+        ),
+        migrations.AddConstraint(
+            model_name='teachingassignment',
+            constraint=models.UniqueConstraint(fields=('teacher', 'course', 'division', 'semester'), name='unique_teaching_assignment'),
+        ),
+        migrations.AddConstraint(
+            model_name='teachingassignment',
+            constraint=models.UniqueConstraint(condition=models.Q(('division__isnull', True)), fields=('teacher', 'course', 'semester'), name='unique_teaching_assignment_all_divisions'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0013_semester_dates'),
+        ('teacher', '0002_teaching_assignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('capacity', models.PositiveIntegerField(blank=True, help_text='Seats; leave empty to allow any division size', null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TimetableSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('starts_at', models.TimeField()),
+                ('ends_at', models.TimeField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_slots', to='student.course')),
+                ('division', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_slots', to='student.division')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_slots', to='teacher.room')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_slots', to='teacher.teacher')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['teacher', 'weekday', 'starts_at'], name='slot_teacher_time_idx'), models.Index(fields=['division', 'weekday', 'starts_at'], name='slot_division_time_idx'), models.Index(fields=['room', 'weekday', 'starts_at'], name='slot_room_time_idx'), models.Index(fields=['course', 'division'], name='slot_course_division_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('ends_at__gt', models.F('starts_at'))), name='timetable_slot_ends_after_start')],
+            },
+        ),
+    ]
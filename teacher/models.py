@@ -1,8 +1,14 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import IsNull
 
 # Create your models here.
 from django.contrib.auth.models import User
-from student.models import Branch, Course, Academic, Semester, Division # Import models from student app
+from student import refdata
+from student.attendance import attendance_records
+from student.models import Branch, Course, CourseDivisionCount, Academic, Grade, Semester, Division, Student # Import models from student app
 
 class Teacher(models.Model):
     
@@ -11,8 +17,184 @@ class Teacher(models.Model):
     phone_number = models.CharField(max_length=15,blank=True,null=True,help_text="Teacher's contact phone number")
     
     branch = models.ForeignKey(Branch,on_delete=models.SET_NULL, null=True,blank=True,related_name='teachers',help_text="The academic branch this teacher belongs to")
+    courses_taught = models.ManyToManyField(Course, through='TeachingAssignment', related_name='teachers', blank=True, help_text="Courses this teacher teaches (see TeachingAssignment)")
 
     def __str__(self):
         full_name = self.user.get_full_name()
         return f"{full_name} ({self.employee_id})" if full_name else f"{self.user.username} ({self.employee_id})"
 
+
+
+
+def _count(queryset):
+    """Correlated COUNT(*) of ``queryset`` (filtered on OuterRef) as an annotation, 0 when empty."""
+    counted = queryset.order_by().annotate(_group=Value(1)).values('_group').annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted), 0)
+
+
+def _in_assigned_division(student_path):
+    """Rows whose student is in the assignment's division, or all rows when the assignment has none."""
+    return IsNull(OuterRef('division_id'), True) | Q(**{f'{student_path}division_id': OuterRef('division_id')})
+
+
+class TeachingAssignmentQuerySet(models.QuerySet):
+    def with_counts(self, on_date):
+        """
+        Annotates every assignment with, for its course and division:
+        ``enrolled`` students, ``pending_attendance`` (enrolled but not marked on ``on_date``)
+        and ``ungraded`` (enrolled without a Grade). One query however many rows.
+        """
+        # Head counts are read from the enrolment counters (student.enrolment)
+        division_count = CourseDivisionCount.objects.filter(
+            course_id=OuterRef('course_id'), division_id=OuterRef('division_id'),
+        ).values('enrolled')[:1]
+        enrolled = Case(
+            When(division__isnull=True, then=F('course__enrolled_count')),
+            default=Coalesce(Subquery(division_count), 0),
+        )
+        marked = _count(attendance_records().filter(
+            _in_assigned_division('student__'),
+            course_id=OuterRef('course_id'), date=on_date, student__enrolled_courses=OuterRef('course_id'),
+        ))
+        graded = _count(Grade.objects.filter(
+            _in_assigned_division('student__'),
+            course_id=OuterRef('course_id'), student__enrolled_courses=OuterRef('course_id'),
+        ))
+        return self.annotate(enrolled=enrolled, marked=marked, graded=graded).annotate(
+            pending_attendance=F('enrolled') - F('marked'),
+            ungraded=F('enrolled') - F('graded'),
+        )
+
+
+class TeachingAssignment(models.Model):
+    """A teacher teaching a course, to one division or (division left empty) to all of them, in a semester."""
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='teaching_assignments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='teaching_assignments')
+    division = models.ForeignKey(Division, on_delete=models.CASCADE, null=True, blank=True, related_name='teaching_assignments', help_text="Leave empty if the teacher takes every division of the course")
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='teaching_assignments', blank=True, help_text="Defaults to the course's semester")
+
+    objects = TeachingAssignmentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'course', 'division', 'semester'], name='unique_teaching_assignment'),
+            # NULLs are distinct in unique indexes, so "all divisions" needs its own constraint
+            models.UniqueConstraint(
+                fields=['teacher', 'course', 'semester'], condition=Q(division__isnull=True),
+                name='unique_teaching_assignment_all_divisions',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.semester_id is None and self.course_id is not None:
+            self.semester_id = Course.objects.filter(pk=self.course_id).values_list('semester_id', flat=True).first()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        division = self.division.name if self.division_id else "all divisions"
+        return f"{self.teacher} - {self.course.code} ({division})"
+
+
+class Room(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Seats; leave empty to allow any division size")
+
+    def __str__(self):
+        return self.name
+
+
+def concurrent_semester_ids(semester_id):
+    """
+    Ids of the semesters taught at the same time as ``semester_id`` (their dates overlap),
+    itself included. Semesters without dates only overlap themselves.
+    """
+    semester = refdata.get(Semester, semester_id)
+    if semester is None or semester.starts_on is None or semester.ends_on is None:
+        return {semester_id}
+    return {
+        other.pk for other in refdata.instances(Semester)
+        if other.pk == semester_id or (
+            other.starts_on is not None and other.ends_on is not None
+            and other.starts_on <= semester.ends_on and semester.starts_on <= other.ends_on
+        )
+    }
+
+
+class TimetableSlotQuerySet(models.QuerySet):
+    def clashing_with(self, slot):
+        """
+        Slots booking ``slot``'s teacher, division or room on the same weekday at an
+        overlapping time, in a semester taught at the same time. Each branch of the OR is a
+        range scan of one (resource, weekday, starts_at) index.
+        """
+        semester_id = Course.objects.filter(pk=slot.course_id).values_list('semester_id', flat=True).first()
+        return self.filter(
+            Q(teacher_id=slot.teacher_id) | Q(division_id=slot.division_id) | Q(room_id=slot.room_id),
+            weekday=slot.weekday, starts_at__lt=slot.ends_at, ends_at__gt=slot.starts_at,
+            course__semester_id__in=concurrent_semester_ids(semester_id),
+        ).exclude(pk=slot.pk)
+
+
+class TimetableSlot(models.Model):
+    """A weekly class: a teacher teaching a course to one division, in a room, on one weekday between two times."""
+    MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = range(7) # date.weekday()
+    WEEKDAY_CHOICES = [
+        (MONDAY, 'Monday'), (TUESDAY, 'Tuesday'), (WEDNESDAY, 'Wednesday'), (THURSDAY, 'Thursday'),
+        (FRIDAY, 'Friday'), (SATURDAY, 'Saturday'), (SUNDAY, 'Sunday'),
+    ]
+
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='timetable_slots')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='timetable_slots')
+    division = models.ForeignKey(Division, on_delete=models.CASCADE, related_name='timetable_slots')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='timetable_slots')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    starts_at = models.TimeField()
+    ends_at = models.TimeField()
+
+    objects = TimetableSlotQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(ends_at__gt=F('starts_at')), name='timetable_slot_ends_after_start'),
+        ]
+        indexes = [
+            # Interval lookups per resource: weekday equality, then a range on starts_at
+            models.Index(fields=['teacher', 'weekday', 'starts_at'], name='slot_teacher_time_idx'),
+            models.Index(fields=['division', 'weekday', 'starts_at'], name='slot_division_time_idx'),
+            models.Index(fields=['room', 'weekday', 'starts_at'], name='slot_room_time_idx'),
+            models.Index(fields=['course', 'division'], name='slot_course_division_idx'),
+        ]
+
+    def clean(self):
+        if None in (self.teacher_id, self.course_id, self.division_id, self.room_id, self.starts_at, self.ends_at):
+            return # field errors already reported
+        if self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': "The slot must end after it starts."})
+        teaches = TeachingAssignment.objects.filter(
+            Q(division__isnull=True) | Q(division_id=self.division_id), teacher_id=self.teacher_id, course_id=self.course_id,
+        )
+        if not teaches.exists():
+            raise ValidationError("This teacher has no teaching assignment for this course and division.")
+        clashes = list(TimetableSlot.objects.clashing_with(self).select_related('course', 'division', 'room')[:5])
+        if clashes:
+            raise ValidationError([f"Clashes with {clash}." for clash in clashes])
+
+    def __str__(self):
+        return (
+            f"{self.course.code} {self.division.name} {self.get_weekday_display()} "
+            f"{self.starts_at:%H:%M}-{self.ends_at:%H:%M} ({self.room})"
+        )
+
+
+def courses_taught_by(teacher):
+    """Courses ``teacher`` has at least one TeachingAssignment for, without duplicates."""
+    return Course.objects.filter(Exists(TeachingAssignment.objects.filter(teacher=teacher, course=OuterRef('pk'))))
+
+
+def teaching_division_ids(teacher, course):
+    """
+    Ids of the divisions ``teacher`` teaches in ``course``, or None when one of their
+    assignments covers every division.
+    """
+    division_ids = set(TeachingAssignment.objects.filter(teacher=teacher, course=course).values_list('division_id', flat=True))
+    return None if None in division_ids else division_ids
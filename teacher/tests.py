@@ -1,3 +1,356 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import random
+import re
+from types import SimpleNamespace
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from main.versioning import get_version
+from student.attendance import mark_attendance
+from student.models import Academic, Assignment, AttendanceSummary, Branch, Course, Division, Grade, Semester, Student
+from .models import Room, Teacher, TeachingAssignment, TimetableSlot
+from .timetable import find_clashes, validate_timetable
+
+
+class TeacherTestCase(TestCase):
+    """A course with students in divisions A and B, taught by ``self.teacher`` (logged in) to division A only."""
+
+    def setUp(self):
+        cache.clear()
+        self.academic = Academic.objects.create(year="2025-26")
+        self.branch = Branch.objects.create(name="Computer", code="CS")
+        self.semester = Semester.objects.create(semester_number=Semester.FIRST, academic=self.academic)
+        self.division_a = Division.objects.create(name="A", branch=self.branch, academic=self.academic)
+        self.division_b = Division.objects.create(name="B", branch=self.branch, academic=self.academic)
+        self.course = Course.objects.create(name="Algorithms", code="CS101", branch=self.branch, academic=self.academic, semester=self.semester)
+        self.students = [
+            Student.objects.create(
+                id=f"S{i}", first=f"First{i}", last=f"Last{i}", email=f"s{i}@example.com", prn=1000 + i,
+                division=self.division_a if i < 3 else self.division_b,
+                academic=self.academic, branch=self.branch, semester=self.semester,
+            )
+            for i in range(4)
+        ]
+        self.course.students_enrolled.add(*self.students)
+        user = User.objects.create_user('teacher', password='secret')
+        self.teacher = Teacher.objects.create(user=user, employee_id='E1', branch=self.branch)
+        TeachingAssignment.objects.create(teacher=self.teacher, course=self.course, division=self.division_a)
+        self.client.login(username='teacher', password='secret')
+
+
+class GradeSheetTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f'/teacher/course/{self.course.id}/grades/'
+        self.quiz = Assignment.objects.create(title="Quiz", course=self.course, due_date=timezone.now(), max_score=50)
+        for student, score in zip(self.students[:2], ['40.00', '90.00']):
+            Grade.objects.create(student=student, course=self.course, score=Decimal(score))
+
+    def scores(self):
+        return {grade.student_id: grade.score for grade in Grade.objects.filter(course=self.course)}
+
+    def sheet_inputs(self, query=''):
+        """The score inputs of the grade sheet as rendered, pre-filled values included."""
+        sheet = self.client.get(self.url + query).content.decode()
+        return dict(re.findall(r'<input type="(?:text|hidden)" name="((?:score|stored)_S\d|out_of)" value="([^"]*)"', sheet))
+
+    def test_sheet_is_shown_out_of_the_chosen_maximum(self):
+        data = self.sheet_inputs(f'?out_of={self.quiz.id}')
+        self.assertEqual((data['score_S0'], data['stored_S0'], data['out_of']), ('20.00', '20.00', str(self.quiz.id)))
+        self.assertEqual(self.client.get(f'{self.url}?out_of=abc').status_code, 404)
+
+    def test_untouched_prefilled_rows_are_not_rewritten(self):
+        data = self.sheet_inputs(f'?out_of={self.quiz.id}')
+        data['score_S2'] = '45'
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, f'{self.url}?out_of={self.quiz.id}')
+        self.assertEqual(self.scores(), {'S0': Decimal('40.00'), 'S1': Decimal('90.00'), 'S2': Decimal('90.00')})
+
+    def test_changed_rows_are_rescaled(self):
+        self.client.post(self.url, {**self.sheet_inputs(f'?out_of={self.quiz.id}'), 'score_S0': '25'})
+        self.assertEqual(self.scores()['S0'], Decimal('50.00'))
+
+    def test_stored_percentage_typed_out_of_another_maximum_is_rescaled(self):
+        # 40 is S0's stored percentage, but the sheet is out of 50 (showing 20.00)
+        self.client.post(self.url, {**self.sheet_inputs(f'?out_of={self.quiz.id}'), 'score_S0': '40'})
+        self.assertEqual(self.scores()['S0'], Decimal('80.00'))
+
+    def test_grade_list_covers_only_the_divisions_taught(self):
+        Grade.objects.create(student=self.students[3], course=self.course, score=Decimal('55.00'))
+        listed = [grade.student_id for grade in self.client.get(self.url).context['grades']]
+        self.assertEqual(listed, ['S0', 'S1'])
+
+    def test_invalid_sheet_saves_nothing(self):
+        response = self.client.post(self.url, {**self.sheet_inputs(f'?out_of={self.quiz.id}'), 'score_S0': '60', 'score_S2': '10'})
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, "outside 0-50", status_code=400)
+        self.assertEqual(self.scores(), {'S0': Decimal('40.00'), 'S1': Decimal('90.00')})
+
+
+class CourseDetailTests(TeacherTestCase):
+    def roster(self, query=''):
+        response = self.client.get(f'/teacher/course/{self.course.id}/{query}')
+        return [student.id for student in response.context['enrolled_students']]
+
+    def test_roster_covers_only_the_divisions_taught(self):
+        self.assertEqual(self.roster(), ['S0', 'S1', 'S2'])
+        self.assertEqual(self.roster('?q=first3'), [])
+        TeachingAssignment.objects.create(teacher=self.teacher, course=self.course)
+        self.assertEqual(self.roster(), ['S0', 'S1', 'S2', 'S3'])
+
+
+class TeacherNavTests(TeacherTestCase):
+    def test_user_change_shows_on_the_next_request(self):
+        url = f'/teacher/course/{self.course.id}/'
+        self.assertContains(self.client.get(url), 'teacher (E1) |')
+        version = get_version('user', self.teacher.user_id)
+        user = self.teacher.user
+        user.first_name, user.last_name = 'Meera', 'Iyer'
+        user.save()
+        self.assertNotEqual(get_version('user', self.teacher.user_id), version)
+        self.assertContains(self.client.get(url), 'Meera Iyer (E1) |')
+
+
+class CourseExportTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        mark_attendance(self.course, datetime.date(2025, 7, 1), {student.id: True for student in self.students})
+        for student in self.students:
+            Grade.objects.create(student=student, course=self.course, score=Decimal('70.00'))
+
+    def exported_ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        return [row[2] for row in rows[1:]]
+
+    def test_exports_cover_only_the_divisions_taught(self):
+        for name in ('attendance', 'grades'):
+            with self.subTest(name):
+                base = f'/teacher/course/{self.course.id}/{name}/export/'
+                self.assertEqual(self.exported_ids(base), ['S0', 'S1', 'S2'])
+                self.assertEqual(self.exported_ids(f'{base}?division={self.division_b.id}'), [])
+                self.assertEqual(self.exported_ids(f'{base}?division=abc'), ['S0', 'S1', 'S2'])
+
+    def test_all_divisions_assignment_exports_everyone(self):
+        TeachingAssignment.objects.create(teacher=self.teacher, course=self.course)
+        base = f'/teacher/course/{self.course.id}/grades/export/'
+        self.assertEqual(self.exported_ids(base), ['S0', 'S1', 'S2', 'S3'])
+        self.assertEqual(self.exported_ids(f'{base}?division={self.division_b.id}'), ['S3'])
+
+
+class BranchExportTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        mark_attendance(self.course, datetime.date(2025, 7, 1), {student.id: True for student in self.students})
+        for student in self.students:
+            Grade.objects.create(student=student, course=self.course, score=Decimal('70.00'))
+        User.objects.create_user('registrar', password='secret', is_staff=True)
+        self.client.login(username='registrar', password='secret')
+
+    def exported_ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        return [row[2] for row in rows[1:]]
+
+    def test_filters(self):
+        everyone = ['S0', 'S1', 'S2', 'S3']
+        for name in ('attendance', 'grades'):
+            base = f'/teacher/branch/{self.branch.id}/{name}/export/'
+            with self.subTest(name):
+                self.assertEqual(self.exported_ids(base), everyone)
+                self.assertEqual(self.exported_ids(f'{base}?division={self.division_b.id}'), ['S3'])
+                self.assertEqual(self.exported_ids(f'{base}?semester={self.semester.id + 1}'), [])
+                # Ids that are not numbers are ignored rather than passed to the database
+                self.assertEqual(self.exported_ids(f'{base}?semester=abc&division=1.5'), everyone)
+
+
+class CourseApiTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        for student in self.students:
+            Grade.objects.create(student=student, course=self.course, score=Decimal('70.00'))
+
+    def get(self, name, **headers):
+        return self.client.get(f'/teacher/api/course/{self.course.id}/{name}', headers=headers)
+
+    def test_rosters_cover_only_the_divisions_taught(self):
+        students = self.get('').json()['students']
+        self.assertEqual([student['id'] for student in students], ['S0', 'S1', 'S2'])
+        grades = self.get('grades/').json()['grades']
+        self.assertEqual([grade['student_id'] for grade in grades], ['S0', 'S1', 'S2'])
+
+    def test_unchanged_course_is_answered_304_without_queries(self):
+        response = self.get('grades/')
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertNumQueries(3): # session, user and the course access check
+            response = self.get('grades/', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Grade.objects.filter(student_id='S0').update(score=Decimal('80.00')) # no signal: version unchanged
+        self.assertEqual(self.get('grades/', if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.get(student_id='S0').save()
+        self.assertEqual(self.get('grades/', if_none_match=etag).status_code, 200)
+
+    def test_teaching_assignment_change_invalidates_etag(self):
+        etag = self.get('').headers['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            TeachingAssignment.objects.create(teacher=self.teacher, course=self.course)
+        response = self.get('', if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['students']), 4)
+
+    def test_other_courses_are_not_found(self):
+        other = Course.objects.create(name="Networks", code="CS201", branch=self.branch, academic=self.academic, semester=self.semester)
+        self.assertEqual(self.client.get(f'/teacher/api/course/{other.id}/').status_code, 404)
+
+
+class ShortfallReportTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        # Below 75%: S1 and S2 in division A, S3 in division B (not taught)
+        for student, present in zip(self.students, [10, 7, 0, 5]):
+            AttendanceSummary.objects.create(student=student, course=self.course, sessions=10, present=present)
+        self.url = f'/teacher/course/{self.course.id}/attendance/shortfall/'
+
+    def csv_rows(self, query=''):
+        response = self.client.get(f'{self.url}?format=csv{query}')
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))[1:]
+
+    def test_report_covers_only_the_divisions_taught(self):
+        html = b''.join(self.client.get(self.url).streaming_content).decode()
+        self.assertIn('<td>S1</td>', html)
+        self.assertNotIn('<td>S3</td>', html)
+        self.assertEqual([row[2] for row in self.csv_rows()], ['S1', 'S2'])
+        self.assertEqual([row[2] for row in self.csv_rows(f'&division={self.division_b.id}')], [])
+
+    def test_threshold_and_sessions_to_recover(self):
+        self.assertEqual([(row[2], row[-2], row[-1]) for row in self.csv_rows('&threshold=60')], [('S2', '0.0', '15')])
+
+
+class BranchShortfallReportTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        for student, present in zip(self.students, [10, 7, 0, 5]):
+            AttendanceSummary.objects.create(student=student, course=self.course, sessions=10, present=present)
+        User.objects.create_user('registrar', password='secret', is_staff=True)
+        self.client.login(username='registrar', password='secret')
+        self.url = f'/teacher/branch/{self.branch.id}/attendance/shortfall/'
+
+    def csv_ids(self, query=''):
+        response = self.client.get(f'{self.url}?format=csv{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row[2] for row in list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))[1:]]
+
+    def test_filters(self):
+        self.assertEqual(self.csv_ids(), ['S1', 'S2', 'S3'])
+        self.assertEqual(self.csv_ids(f'&division={self.division_b.id}'), ['S3'])
+        self.assertEqual(self.csv_ids('&semester=abc&division=abc'), ['S1', 'S2', 'S3'])
+        html = b''.join(self.client.get(f'{self.url}?semester=abc').streaming_content).decode()
+        self.assertIn('<td>S3</td>', html)
+
+
+class FindClashesTests(SimpleTestCase):
+    def slot(self, pk, weekday, starts_at, minutes, teacher=1, division=1, room=1):
+        starts = datetime.datetime.combine(datetime.date.min, starts_at)
+        return SimpleNamespace(
+            pk=pk, weekday=weekday, starts_at=starts_at, ends_at=(starts + datetime.timedelta(minutes=minutes)).time(),
+            teacher_id=teacher, division_id=division, room_id=room,
+        )
+
+    def clashes(self, slots):
+        return sorted((resource, slot.pk, other.pk) for resource, slot, other in find_clashes(slots))
+
+    def test_overlaps_per_resource(self):
+        slots = [
+            self.slot(1, 0, datetime.time(9), 60, teacher=1, division=1, room=1),
+            self.slot(2, 0, datetime.time(9, 30), 60, teacher=2, division=1, room=2), # division clash with 1
+            self.slot(3, 0, datetime.time(10), 60, teacher=1, division=3, room=1), # back to back with 1
+            self.slot(4, 1, datetime.time(9), 60, teacher=1, division=1, room=1), # another day
+            self.slot(5, 0, datetime.time(8), 240, teacher=5, division=5, room=2), # spans 2 and 3
+        ]
+        self.assertEqual(self.clashes(slots), [('division', 1, 2), ('room', 5, 2)])
+        self.assertEqual(find_clashes([]), [])
+
+    def test_matches_pairwise_comparison(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            slots = [
+                self.slot(
+                    pk, rng.randrange(3), datetime.time(rng.randrange(8, 17), rng.choice([0, 30])), rng.choice([30, 60, 90]),
+                    teacher=rng.randrange(4), division=rng.randrange(4), room=rng.randrange(4),
+                )
+                for pk in range(rng.randrange(40))
+            ]
+            expected = sorted(
+                (resource, *sorted((a.pk, b.pk)))
+                for i, a in enumerate(slots) for b in slots[i + 1:] for resource in ('teacher', 'division', 'room')
+                if a.weekday == b.weekday and a.starts_at < b.ends_at and b.starts_at < a.ends_at
+                and getattr(a, f'{resource}_id') == getattr(b, f'{resource}_id')
+            )
+            self.assertEqual(sorted((resource, *sorted(pair)) for resource, *pair in self.clashes(slots)), expected)
+
+
+class TimetableSlotTests(TeacherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room = Room.objects.create(name="R1")
+        self.other_room = Room.objects.create(name="R2")
+        TimetableSlot.objects.create(
+            teacher=self.teacher, course=self.course, division=self.division_a, room=self.room,
+            weekday=TimetableSlot.MONDAY, starts_at=datetime.time(9), ends_at=datetime.time(10),
+        )
+
+    def slot(self, starts_at, ends_at, **fields):
+        fields = {'teacher': self.teacher, 'course': self.course, 'division': self.division_a, 'room': self.other_room, **fields}
+        return TimetableSlot(weekday=TimetableSlot.MONDAY, starts_at=starts_at, ends_at=ends_at, **fields)
+
+    def assertInvalid(self, slot, message):
+        with self.assertRaisesMessage(ValidationError, message):
+            slot.full_clean()
+
+    def test_clean(self):
+        self.slot(datetime.time(10), datetime.time(11), room=self.room).full_clean() # back to back
+        self.assertInvalid(self.slot(datetime.time(11), datetime.time(10)), "must end after it starts")
+        self.assertInvalid(self.slot(datetime.time(11), datetime.time(12), division=self.division_b), "no teaching assignment")
+        self.assertInvalid(self.slot(datetime.time(9, 30), datetime.time(10, 30)), "Clashes with CS101 A Monday 09:00-10:00 (R1)")
+        other = Teacher.objects.create(user=User.objects.create_user('other'), employee_id='E2', branch=self.branch)
+        TeachingAssignment.objects.create(teacher=other, course=self.course, division=self.division_b)
+        self.slot(datetime.time(9), datetime.time(10), teacher=other, division=self.division_b).full_clean()
+        self.assertInvalid(self.slot(datetime.time(9), datetime.time(10), teacher=other, division=self.division_b, room=self.room), "Clashes")
+
+    def test_only_semesters_taught_at_the_same_time_clash(self):
+        self.semester.starts_on, self.semester.ends_on = datetime.date(2025, 7, 1), datetime.date(2025, 11, 30)
+        self.semester.save()
+        for number, starts_on, ends_on, clashes in [
+            (Semester.SECOND, datetime.date(2026, 1, 1), datetime.date(2026, 5, 31), False),
+            (Semester.THIRD, datetime.date(2025, 9, 1), datetime.date(2026, 1, 31), True),
+        ]:
+            with self.subTest(number):
+                semester = Semester.objects.create(semester_number=number, academic=self.academic, starts_on=starts_on, ends_on=ends_on)
+                course = Course.objects.create(name=number, code=f"CS1{number}", branch=self.branch, academic=self.academic, semester=semester)
+                TeachingAssignment.objects.create(teacher=self.teacher, course=course)
+                slot = self.slot(datetime.time(9), datetime.time(10), course=course, room=self.room)
+                if clashes:
+                    self.assertInvalid(slot, "Clashes")
+                else:
+                    slot.full_clean()
+
+    def test_validate_timetable(self):
+        self.assertEqual(validate_timetable(), [])
+        # Saved without clean(), as a bulk import would
+        clash = TimetableSlot.objects.create(
+            teacher=self.teacher, course=self.course, division=self.division_b, room=self.other_room,
+            weekday=TimetableSlot.MONDAY, starts_at=datetime.time(9, 45), ends_at=datetime.time(10, 45),
+        )
+        self.assertEqual([(resource, other.pk) for resource, _, other in validate_timetable()], [('teacher', clash.pk)])
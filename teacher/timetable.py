@@ -0,0 +1,205 @@
+"""
+Weekly timetable: generating the TimetableSlots of a semester, checking whole terms for
+clashes, and expanding slots into the dated sessions of their semester.
+
+A clash is a teacher, division or room booked twice at overlapping times, in semesters
+taught at the same time (teacher.models.concurrent_semester_ids). find_clashes() checks
+any number of slots with one sort per resource instead of comparing every pair: each slot
+becomes an interval on a line where every teacher (division, room) has a week of its own,
+``owner * WEEK_MINUTES + weekday * DAY_MINUTES + minute``, so once sorted by start an
+interval clashes exactly when it starts before the latest end seen so far. Saving a single
+slot checks it with TimetableSlot.objects.clashing_with() instead.
+"""
+import datetime
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_time
+
+from student import refdata
+from student.models import CourseDivisionCount, Semester
+from .models import Room, TeachingAssignment, TimetableSlot, concurrent_semester_ids
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+RESOURCES = ('teacher', 'division', 'room')
+
+
+def _minutes(time):
+    return time.hour * 60 + time.minute
+
+
+def find_clashes(slots):
+    """
+    (resource, slot, later slot) for every pair of ``slots`` booking the same teacher,
+    division or room at overlapping times; the slots are taken to run in the same term.
+    """
+    slots = list(slots)
+    if not slots:
+        return []
+    day_offset = np.array([slot.weekday for slot in slots], dtype=np.int64) * DAY_MINUTES
+    start = day_offset + np.array([_minutes(slot.starts_at) for slot in slots], dtype=np.int64)
+    end = day_offset + np.array([_minutes(slot.ends_at) for slot in slots], dtype=np.int64)
+
+    clashes = []
+    for resource in RESOURCES:
+        _, owner = np.unique([getattr(slot, f'{resource}_id') for slot in slots], return_inverse=True)
+        week = owner.astype(np.int64) * WEEK_MINUTES
+        order = np.argsort(week + start, kind='stable')
+        starts, ends = (week + start)[order], (week + end)[order]
+        latest_end = np.maximum.accumulate(ends)
+        for position in np.flatnonzero(starts[1:] < latest_end[:-1]) + 1:
+            # Walk back over the intervals still running; latest_end only grows, so the
+            # first one that ended before this start ends the walk
+            earlier = position - 1
+            while earlier >= 0 and latest_end[earlier] > starts[position]:
+                if ends[earlier] > starts[position]:
+                    clashes.append((resource, slots[order[earlier]], slots[order[position]]))
+                earlier -= 1
+    return clashes
+
+
+def validate_timetable(semester_ids=None):
+    """
+    Clashes among the slots of ``semester_ids`` (default: every semester with slots) and the
+    semesters taught alongside them, as find_clashes() tuples. Each term is swept once.
+    """
+    if semester_ids is None:
+        semester_ids = set(TimetableSlot.objects.values_list('course__semester_id', flat=True).distinct())
+    terms = {frozenset(concurrent_semester_ids(semester_id)) for semester_id in semester_ids}
+
+    clashes, seen = [], set()
+    for term in terms:
+        slots = TimetableSlot.objects.filter(course__semester_id__in=term).select_related('course', 'division', 'room').order_by('pk')
+        for resource, slot, other in find_clashes(slots):
+            key = (resource, *sorted((slot.pk, other.pk)))
+            # A term is every semester overlapping one of them: keep only pairs that overlap each other
+            if key not in seen and other.course.semester_id in concurrent_semester_ids(slot.course.semester_id):
+                seen.add(key)
+                clashes.append((resource, slot, other))
+    return clashes
+
+
+def timetable_periods():
+    """The configured teaching periods, [(starts_at, ends_at)] as times."""
+    return [(parse_time(starts_at), parse_time(ends_at)) for starts_at, ends_at in settings.TIMETABLE_PERIODS]
+
+
+def _teaching_needs(semester_id):
+    """
+    (teacher_id, course, division_id, enrolled) for every division taught in the semester.
+    An assignment covering all divisions expands to the divisions with students enrolled;
+    a division named by its own assignment is not also given to an all-divisions one.
+    """
+    assignments = list(TeachingAssignment.objects.filter(semester_id=semester_id).select_related('course').order_by('pk'))
+    enrolled = defaultdict(dict)
+    counts = CourseDivisionCount.objects.filter(
+        course_id__in={assignment.course_id for assignment in assignments}, division__isnull=False, enrolled__gt=0,
+    )
+    for course_id, division_id, count in counts.values_list('course_id', 'division_id', 'enrolled'):
+        enrolled[course_id][division_id] = count
+
+    needs, taken = [], set()
+    for assignment in sorted(assignments, key=lambda assignment: assignment.division_id is None):
+        if assignment.division_id is None:
+            division_ids = sorted(enrolled[assignment.course_id])
+        else:
+            division_ids = [assignment.division_id]
+        for division_id in division_ids:
+            if (assignment.course_id, division_id) not in taken:
+                taken.add((assignment.course_id, division_id))
+                needs.append((assignment.teacher_id, assignment.course, division_id, enrolled[assignment.course_id].get(division_id, 0)))
+    return needs
+
+
+@transaction.atomic
+def generate_timetable(semester_id):
+    """
+    Replaces the TimetableSlots of ``semester_id``'s courses with a generated week: every
+    division taught in the semester gets ``course.credits`` periods (TIMETABLE_PERIODS on
+    TIMETABLE_WEEKDAYS), spread over the week, in the smallest free room that seats it.
+    Slots of semesters taught at the same time are kept and worked around.
+
+    Greedy, largest courses and divisions first. Returns (slots created, unplaced), where
+    unplaced lists (teacher_id, course, division_id, periods missing).
+    """
+    TimetableSlot.objects.filter(course__semester_id=semester_id).delete()
+    periods = timetable_periods()
+    weekdays = list(settings.TIMETABLE_WEEKDAYS)
+
+    # (resource, owner id, weekday, period) already taken by the other semesters of the term
+    busy = set()
+    kept = TimetableSlot.objects.filter(course__semester_id__in=concurrent_semester_ids(semester_id))
+    for slot in kept.only('teacher_id', 'division_id', 'room_id', 'weekday', 'starts_at', 'ends_at'):
+        for period, (starts_at, ends_at) in enumerate(periods):
+            if starts_at < slot.ends_at and slot.starts_at < ends_at:
+                for resource in RESOURCES:
+                    busy.add((resource, getattr(slot, f'{resource}_id'), slot.weekday, period))
+
+    rooms = sorted(Room.objects.all(), key=lambda room: (room.capacity is None, room.capacity or 0, room.name))
+    needs = sorted(_teaching_needs(semester_id), key=lambda need: (-need[1].credits, -need[3], need[1].code, need[2]))
+    slots, unplaced = [], []
+    for teacher_id, course, division_id, size in needs:
+        per_day = defaultdict(int)
+        missing = course.credits
+        while missing:
+            placed = _place(busy, rooms, teacher_id, division_id, size, weekdays, periods, per_day)
+            if placed is None:
+                break
+            weekday, period, room = placed
+            per_day[weekday] += 1
+            missing -= 1
+            starts_at, ends_at = periods[period]
+            slots.append(TimetableSlot(
+                teacher_id=teacher_id, course=course, division_id=division_id, room=room,
+                weekday=weekday, starts_at=starts_at, ends_at=ends_at,
+            ))
+        if missing:
+            unplaced.append((teacher_id, course, division_id, missing))
+
+    TimetableSlot.objects.bulk_create(slots)
+    return len(slots), unplaced
+
+
+def _place(busy, rooms, teacher_id, division_id, size, weekdays, periods, per_day):
+    """The first free (weekday, period, room) for one period of a division's course, least-used days first; marks it busy."""
+    for weekday in sorted(weekdays, key=lambda day: (per_day[day], day)):
+        for period in range(len(periods)):
+            if ('teacher', teacher_id, weekday, period) in busy or ('division', division_id, weekday, period) in busy:
+                continue
+            for room in rooms:
+                if (room.capacity is None or room.capacity >= size) and ('room', room.pk, weekday, period) not in busy:
+                    busy.update({
+                        ('teacher', teacher_id, weekday, period),
+                        ('division', division_id, weekday, period),
+                        ('room', room.pk, weekday, period),
+                    })
+                    return weekday, period, room
+    return None
+
+
+def slot_dates(weekday, first_day, last_day):
+    """Every date from ``first_day`` to ``last_day`` falling on ``weekday``."""
+    day = first_day + datetime.timedelta(days=(weekday - first_day.weekday()) % 7)
+    while day <= last_day:
+        yield day
+        day += datetime.timedelta(days=7)
+
+
+def scheduled_sessions(course, division, until=None):
+    """
+    (date, starts_at, ends_at) of every class of ``course`` for ``division`` in the
+    semester's dates (up to ``until``), in order. Empty if the semester has no dates.
+    """
+    semester = refdata.get(Semester, course.semester_id)
+    if semester is None or semester.starts_on is None or semester.ends_on is None:
+        return []
+    last_day = semester.ends_on if until is None else min(until, semester.ends_on)
+    slots = TimetableSlot.objects.filter(course=course, division=division).values_list('weekday', 'starts_at', 'ends_at')
+    return sorted(
+        (day, starts_at, ends_at)
+        for weekday, starts_at, ends_at in slots
+        for day in slot_dates(weekday, semester.starts_on, last_day)
+    )
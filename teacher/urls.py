@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = "teacher" # IMPORTANT: Define the app namespace
 
@@ -12,6 +12,24 @@ urlpatterns = [
     path('dashboard/', views.teacher_dashboard, name='dashboard'),
     path('course/<int:course_id>/', views.teacher_course_detail, name='course_detail'),
     path('course/<int:course_id>/attendance/', views.teacher_manage_attendance, name='manage_attendance'),
+    path('course/<int:course_id>/attendance/shortfall/', views.teacher_attendance_shortfall, name='attendance_shortfall'),
     path('course/<int:course_id>/grades/', views.teacher_manage_grades, name='manage_grades'),
     path('course/<int:course_id>/assignments/', views.teacher_manage_assignments, name='manage_assignments'),
+    path('course/<int:course_id>/assignments/<int:assignment_id>/submissions.zip', views.teacher_download_submissions, name='download_submissions'),
+    path('course/<int:course_id>/submissions/<int:submission_id>/', views.teacher_download_submission, name='download_submission'),
+
+    # Streaming CSV exports
+    path('course/<int:course_id>/attendance/export/', views.teacher_export_attendance, name='export_attendance'),
+    path('course/<int:course_id>/grades/export/', views.teacher_export_grades, name='export_grades'),
+    path('course/<int:course_id>/grades/regrade/', views.teacher_regrade_course, name='regrade_course'),
+    path('branch/<int:branch_id>/attendance/export/', views.branch_export_attendance, name='branch_export_attendance'),
+    path('branch/<int:branch_id>/attendance/shortfall/', views.branch_attendance_shortfall, name='branch_attendance_shortfall'),
+    path('branch/<int:branch_id>/grades/export/', views.branch_export_grades, name='branch_export_grades'),
+
+    # Read-only JSON API (ETag / If-None-Match aware)
+    path('api/course/<int:course_id>/', api.course_detail, name='api_course_detail'),
+    path('api/course/<int:course_id>/attendance/', api.course_attendance, name='api_course_attendance'),
+    path('api/course/<int:course_id>/grades/', api.course_grades, name='api_course_grades'),
+    path('api/course/<int:course_id>/assignments/', api.course_assignments, name='api_course_assignments'),
+    path('api/course/<int:course_id>/students/', api.course_student_search, name='api_course_student_search'),
 ]
\ No newline at end of file
@@ -1,8 +1,34 @@
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from .models import Teacher # Import your Teacher model
-from student.models import Course, Student, Grade, Attendance, Assignment, Division # Import models from student app
+from .models import Teacher, TeachingAssignment, courses_taught_by, teaching_division_ids # Import your Teacher model
+from .timetable import scheduled_sessions
+from student.models import AttendanceSummary, Branch, Student, Grade, Assignment, Division, Semester, Submission # Import models from student app
+from student import refdata
+from student.attendance import attendance_records, mark_attendance, parse_attendance_post, shortfall_threshold
+from student.search import search_students
+from student.submissions import open_blob, submissions_archive
+from student.grade_entry import PERCENT, parse_grade_csv, parse_grade_post, save_course_grades
+from student.exports import (
+    SHORTFALL_HEADER, attendance_export, branch_attendance, branch_attendance_summaries, branch_grades,
+    filter_by_date_range, grade_export, shortfall_export, shortfall_rows, stream_table,
+)
+from main.jobs import enqueue
+from main.pagination import paginate
 from .forms import TeacherLoginForm # You will create this form later
 
 # --- Authentication Views for Teachers ---
@@ -43,18 +69,50 @@ def teacher_logout_view(request):
 
 # --- Teacher Dashboard and Functionality Views ---
 
+def current_teacher(request):
+    """
+    Returns the Teacher profile resolved for this request by main.middleware.CurrentProfileMiddleware.
+    Raises Http404 if the logged-in user is not a teacher.
+    """
+    teacher_profile = request.profiles.teacher
+    if teacher_profile is None:
+        raise Http404("No teacher profile found for this user.")
+    return teacher_profile
+
+def get_teacher_course(request, course_id):
+    """
+    Returns (teacher, course) for a course the logged-in teacher has a TeachingAssignment for.
+    Raises Http404 otherwise.
+    """
+    teacher_profile = current_teacher(request)
+    course = get_object_or_404(courses_taught_by(teacher_profile), id=course_id)
+    refdata.attach([course], 'branch', 'academic', 'semester')
+    return teacher_profile, course
+
 @login_required
-def teacher_dashboard(request):
+async def teacher_dashboard(request):
     """
     Displays the teacher's main dashboard.
-    Shows assigned courses and quick links for management.
+    Shows the teaching load (one row per course/division) with enrolled, pending-attendance
+    and ungraded counts, all from a single annotated query. Async, like the student pages
+    (see student/views.py), so a busy database does not tie up a worker.
     """
-    teacher_profile = get_object_or_404(Teacher, user=request.user)
-    assigned_courses = teacher_profile.courses_taught.all().select_related('branch', 'semester__academic_year')
+    await request.profiles.aresolve()
+    teacher_profile = current_teacher(request)
+    teaching_load = [
+        assignment async for assignment in
+        TeachingAssignment.objects.filter(teacher=teacher_profile)
+        .select_related('course')
+        .with_counts(timezone.localdate())
+        .order_by('course__code', 'division__name')
+    ]
+    # Semesters, divisions and branches come from the in-process reference data
+    await refdata.aattach(teaching_load, 'division', 'semester')
+    await refdata.aattach([assignment.course for assignment in teaching_load], 'branch')
 
     context = {
         'teacher': teacher_profile,
-        'assigned_courses': assigned_courses,
+        'teaching_load': teaching_load,
     }
     return render(request, 'teacher/dashboard.html', context)
 
@@ -64,17 +122,32 @@ def teacher_course_detail(request, course_id):
     Displays details for a specific course taught by the teacher.
     Allows viewing students, grades, attendance, assignments for that course.
     """
-    teacher_profile = get_object_or_404(Teacher, user=request.user)
     # Ensure the logged-in teacher is assigned to this course
-    course = get_object_or_404(Course, id=course_id, teacher=teacher_profile)
+    teacher_profile, course = get_teacher_course(request, course_id)
 
-    # Get students enrolled in this course (can filter by division later if needed)
-    enrolled_students = course.students_enrolled.all().select_related('branch', 'current_semester', 'division').order_by('last', 'first')
+    # Head counts come from the enrolment counters (student.enrolment); the roster itself is paged
+    division_counts = refdata.attach(course.division_counts.filter(enrolled__gt=0), 'division')
+    division_counts.sort(key=lambda row: (row.division is None, row.division.name if row.division else ''))
+    # The roster only lists the divisions this teacher takes
+    roster = course.students_enrolled.all()
+    division_ids = teaching_division_ids(teacher_profile, course)
+    if division_ids is not None:
+        roster = roster.filter(division_id__in=division_ids)
+    query = request.GET.get('q', '').strip()
+    if query:
+        roster = search_students(roster, query)
+    roster_page = paginate(request, roster, ['last', 'first'])
+    enrolled_students = refdata.attach(roster_page.object_list, 'branch', 'semester', 'division')
+    teaching_assignments = refdata.attach(course.teaching_assignments.select_related('teacher__user'), 'division')
 
     context = {
         'teacher': teacher_profile,
         'course': course,
+        'division_counts': division_counts,
         'enrolled_students': enrolled_students,
+        'page': roster_page,
+        'query': query,
+        'teaching_assignments': teaching_assignments,
         # You'll add forms for taking attendance, entering grades, etc. here
     }
     return render(request, 'teacher/course_detail.html', context)
@@ -83,72 +156,83 @@ def teacher_course_detail(request, course_id):
 def teacher_manage_attendance(request, course_id):
     """
     Allows the teacher to view and manage attendance for a specific course.
-    Includes filtering by division and date.
+    Includes filtering by division and date; dates can be picked from the division's timetable.
     """
-    teacher_profile = get_object_or_404(Teacher, user=request.user)
-    course = get_object_or_404(Course, id=course_id, teacher=teacher_profile)
+    teacher_profile, course = get_teacher_course(request, course_id)
 
-    # Get distinct divisions associated with students enrolled in this course
-    # This ensures we only show divisions that actually have students in this course
+    # Divisions with students enrolled in this course, from the course's per-division counters
+    # (student.enrolment), limited to the divisions this teacher takes
     available_divisions = Division.objects.filter(
-        students_in_division__enrolled_courses=course
-    ).distinct().order_by('name')
+        course_counts__course=course, course_counts__enrolled__gt=0,
+    ).annotate(enrolled=F('course_counts__enrolled')).order_by('name')
+    division_ids = teaching_division_ids(teacher_profile, course)
+    if division_ids is not None:
+        available_divisions = available_divisions.filter(id__in=division_ids)
+    available_divisions = refdata.attach(available_divisions, 'branch', 'academic')
 
     selected_division = None
     selected_date = None
-    attendance_records = []
+    marked_records = []
     students_in_selected_division = []
+    sessions = []
 
     if request.method == 'POST':
-        # Handle form submission for saving attendance
-        # This part would involve processing a form (e.g., ModelFormSet)
-        # to update/create Attendance records.
-        # For simplicity, we'll just demonstrate fetching below.
-        pass
+        # Save the whole division-day sheet in one upsert, then redirect back to the same view (PRG)
+        division = get_object_or_404(Division, id=request.POST.get('division_id'))
+        if division_ids is not None and division.id not in division_ids:
+            raise Http404("You do not teach this division.")
+        try:
+            date_obj = datetime.strptime(request.POST.get('attendance_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, "Invalid attendance date.")
+            return redirect('teacher:manage_attendance', course_id=course.id)
+
+        student_ids = Student.objects.filter(
+            division=division,
+            enrolled_courses=course
+        ).values_list('id', flat=True)
+        statuses = parse_attendance_post(request.POST, student_ids)
+        saved = mark_attendance(course, date_obj, statuses)
+        messages.success(request, f"Attendance saved for {saved} student(s).")
+
+        query = urlencode({'division': division.id, 'date': date_obj.isoformat()})
+        return redirect(f"{reverse('teacher:manage_attendance', args=[course.id])}?{query}")
 
     # Filtering logic for GET requests
     if 'division' in request.GET and request.GET['division']:
         selected_division = get_object_or_404(Division, id=request.GET['division'])
+        if division_ids is not None and selected_division.id not in division_ids:
+            raise Http404("You do not teach this division.")
         students_in_selected_division = Student.objects.filter(
             division=selected_division,
             enrolled_courses=course # Filter for students in this course and division
         ).order_by('last', 'first')
+        # The division's classes of this course so far, from the timetable, newest first
+        sessions = scheduled_sessions(course, selected_division, until=timezone.localdate())[::-1]
 
         if 'date' in request.GET and request.GET['date']:
             try:
                 selected_date = request.GET['date']
-                # Convert date string to date object
-                from datetime import datetime
                 date_obj = datetime.strptime(selected_date, '%Y-%m-%d').date()
 
                 # Fetch existing attendance for this course, division, and date
-                attendance_records = Attendance.objects.filter(
+                marked_records = attendance_records().filter(
                     course=course,
                     student__division=selected_division,
                     date=date_obj
                 ).select_related('student', 'student__division').order_by('student__last')
 
-                # Create a set of student IDs who already have attendance recorded for this day
-                recorded_student_ids = {rec.student.id for rec in attendance_records}
-
-                # For students without an attendance record for this date, assume absent or create a default
-                # This logic is more complex and usually handled by a formset in a real app
-                # For display, we can show all students and if they have a record
-                students_with_attendance_status = []
-                for student in students_in_selected_division:
-                    status = None
-                    record_exists = False
-                    for record in attendance_records:
-                        if record.student == student:
-                            status = record.is_present
-                            record_exists = True
-                            break
-                    students_with_attendance_status.append({
+                # student id -> is_present, so each student row is a dict lookup instead of a scan
+                status_by_student = {rec.student_id: rec.is_present for rec in marked_records}
+
+                students_in_selected_division = [
+                    {
                         'student': student,
-                        'is_present': status, # True/False/None
-                        'record_exists': record_exists,
-                    })
-                students_in_selected_division = students_with_attendance_status
+                        'is_present': status_by_student.get(student.id), # True/False/None
+                        'record_exists': student.id in status_by_student,
+                    }
+                    for student in students_in_selected_division
+                ]
 
             except ValueError:
                 # Handle invalid date format
@@ -161,41 +245,300 @@ def teacher_manage_attendance(request, course_id):
         'selected_division': selected_division,
         'selected_date': selected_date,
         'students_in_division': students_in_selected_division, # List of students with their attendance status
-        'attendance_records': attendance_records, # Raw attendance records for reference
+        'scheduled_sessions': sessions,
+        'attendance_records': marked_records, # Raw attendance records for reference
     }
     return render(request, 'teacher/manage_attendance.html', context)
 
+@login_required
+def teacher_export_attendance(request, course_id):
+    """
+    Streams the course's attendance in the divisions this teacher takes as CSV. Optional filters: ?division=<id>&from=YYYY-MM-DD&to=YYYY-MM-DD.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+
+    records = filter_by_date_range(attendance_records().filter(course=course), request.GET)
+    records = in_divisions(records, teaching_division_ids(teacher_profile, course), request.GET.get('division'))
+    return attendance_export(f"attendance_{course.code}.csv", records)
+
+@login_required
+def teacher_attendance_shortfall(request, course_id):
+    """
+    Students below the attendance threshold in a course, in the divisions this teacher takes,
+    streamed as an HTML table (or CSV with ?format=csv). Optional filters: ?division=<id>&threshold=<percent>.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+
+    division_ids = teaching_division_ids(teacher_profile, course)
+    summaries = in_divisions(AttendanceSummary.objects.filter(course=course), division_ids, request.GET.get('division'))
+    divisions = sorted(
+        (d for d in refdata.instances(Division) if d.branch_id == course.branch_id and (division_ids is None or d.id in division_ids)),
+        key=lambda d: d.name,
+    )
+    return shortfall_response(
+        request, f"shortfall_{course.code}", f"{course.name} ({course.code})", summaries,
+        divisions=divisions, back_url=reverse('teacher:manage_attendance', args=[course.id]),
+    )
+
+def shortfall_response(request, filename, title, summaries, divisions=(), semesters=(), back_url=None):
+    """The shortfall report of ``summaries`` (AttendanceSummary rows) as CSV with ?format=csv, otherwise a streamed HTML table."""
+    threshold = shortfall_threshold(request.GET.get('threshold'))
+    if request.GET.get('format') == 'csv':
+        return shortfall_export(f"{filename}.csv", summaries, threshold)
+
+    query = request.GET.copy()
+    query['format'] = 'csv'
+    context = {
+        'title': title,
+        'header': SHORTFALL_HEADER,
+        'threshold': f"{threshold:g}",
+        'divisions': divisions,
+        'semesters': semesters,
+        'selected_division': _int_or_none(request.GET.get('division')),
+        'selected_semester': _int_or_none(request.GET.get('semester')),
+        'csv_query': query.urlencode(),
+        'back_url': back_url,
+    }
+    return stream_table(request, 'teacher/attendance_shortfall.html', context, shortfall_rows(summaries, threshold))
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def in_divisions(rows, division_ids, division):
+    """
+    Limits ``rows`` (a queryset with a ``student``) to the students of ``division_ids`` (None:
+    every division) and to ``division``, a ?division= value, when it is a number.
+    """
+    if division_ids is not None:
+        rows = rows.filter(student__division_id__in=division_ids)
+    division = _int_or_none(division)
+    if division is not None:
+        rows = rows.filter(student__division_id=division)
+    return rows
+
 @login_required
 def teacher_manage_grades(request, course_id):
     """
     Allows the teacher to view and manage grades for a specific course.
+    POST saves a whole grade sheet (or an uploaded student_id,score CSV) in one batch;
+    if any row is invalid nothing is saved and the errors are listed per row.
     """
-    teacher_profile = get_object_or_404(Teacher, user=request.user)
-    course = get_object_or_404(Course, id=course_id, teacher=teacher_profile)
+    teacher_profile, course = get_teacher_course(request, course_id)
+
+    # Students this teacher may grade, with their current score, in one query
+    roster = Student.objects.filter(enrolled_courses=course)
+    division_ids = teaching_division_ids(teacher_profile, course)
+    if division_ids is not None:
+        roster = roster.filter(division_id__in=division_ids)
+    roster = roster.annotate(
+        stored_score=Subquery(Grade.objects.filter(student=OuterRef('pk'), course=course).values('score')[:1])
+    ).order_by('last', 'first')
+    roster = refdata.attach(roster, 'division')
+    assignments = Assignment.objects.filter(course=course).order_by('due_date')
 
-    # Get grades for students in this course
-    grades = Grade.objects.filter(course=course).select_related('student', 'student__division').order_by('student__last', 'student__first')
+    # The sheet is shown and read out of one maximum (?out_of=<assignment id>, percentages by default)
+    max_score, out_of = PERCENT, None
+    scale = request.POST.get('out_of') if request.method == 'POST' else request.GET.get('out_of')
+    if scale:
+        out_of = get_object_or_404(Assignment, id=_int_or_none(scale), course=course)
+        max_score = out_of.max_score
+    for student in roster:
+        if student.stored_score is not None and max_score > 0:
+            student.stored_score = (student.stored_score * max_score / PERCENT).quantize(Decimal('0.01'))
+        student.score = student.stored_score
+
+    entry_errors = []
+    if request.method == 'POST':
+        upload = request.FILES.get('grades_csv')
+        try:
+            if upload:
+                entries = parse_grade_csv(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+            else:
+                entries = parse_grade_post(request.POST, [student.id for student in roster])
+        except (UnicodeDecodeError, csv.Error):
+            entries, entry_errors = [], [(None, '', "The uploaded file is not a UTF-8 CSV file.")]
+        if not entry_errors:
+            if max_score <= 0:
+                entry_errors = [(None, '', f"{out_of.title} has no maximum score.")]
+            else:
+                result = save_course_grades(course, entries, [student.id for student in roster], max_score)
+                entry_errors = result.errors
+                if result.ok:
+                    messages.success(request, f"Grades saved for {result.saved} student(s).")
+                    url = reverse('teacher:manage_grades', args=[course.id])
+                    return redirect(f"{url}?out_of={out_of.id}" if out_of else url)
+        # Show the sheet again with what was submitted
+        for student in roster:
+            student.score = request.POST.get(f'score_{student.id}', '')
+
+    # Grades of the students this teacher may grade
+    grades = in_divisions(Grade.objects.filter(course=course), division_ids, None).select_related('student')
+    grades_page = paginate(request, grades, ['student__last', 'student__first'])
+    refdata.attach([grade.student for grade in grades_page], 'division')
 
     context = {
         'teacher': teacher_profile,
         'course': course,
-        'grades': grades,
+        'grades': grades_page.object_list,
+        'page': grades_page,
+        'roster': roster,
+        'assignments': assignments,
+        'out_of': out_of,
+        'entry_errors': entry_errors,
     }
-    return render(request, 'teacher/manage_grades.html', context)
+    return render(request, 'teacher/manage_grades.html', context, status=400 if entry_errors else 200)
+
+@login_required
+def teacher_export_grades(request, course_id):
+    """
+    Streams the course's grade sheet for the divisions this teacher takes as CSV. Optional filter: ?division=<id>.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+
+    grades = in_divisions(Grade.objects.filter(course=course), teaching_division_ids(teacher_profile, course), request.GET.get('division'))
+    return grade_export(f"grades_{course.code}.csv", grades)
+
+@login_required
+@require_POST
+def teacher_regrade_course(request, course_id):
+    """
+    Queues a background recomputation of the course's grade letters and points
+    (e.g. after its grading scheme changed) and returns straight away.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+    job = enqueue('regrade_course', user=request.user, course_id=course.id)
+    messages.success(request, f"Regrading queued as job #{job.pk}.")
+    return redirect('main:job_detail', job_id=job.pk)
+
+def course_submissions(course, division_ids):
+    """Submissions for the course's assignments from students of ``division_ids`` (None: every division)."""
+    submissions = Submission.objects.filter(assignment__course=course)
+    if division_ids is not None:
+        submissions = submissions.filter(student__division_id__in=division_ids)
+    return submissions
 
 @login_required
 def teacher_manage_assignments(request, course_id):
     """
     Allows the teacher to view, create, and manage assignments for a specific course.
+    Each assignment shows how many of the teacher's students submitted (and how many late);
+    ?assignment=<id> lists that assignment's submissions.
     """
-    teacher_profile = get_object_or_404(Teacher, user=request.user)
-    course = get_object_or_404(Course, id=course_id, teacher=teacher_profile)
+    teacher_profile, course = get_teacher_course(request, course_id)
 
-    assignments = Assignment.objects.filter(course=course).order_by('due_date')
+    # Submission counts for the whole page in the same query, restricted to the teacher's divisions
+    division_ids = teaching_division_ids(teacher_profile, course)
+    seen = Q() if division_ids is None else Q(submissions__student__division_id__in=division_ids)
+    assignments = Assignment.objects.filter(course=course).annotate(
+        submitted=Count('submissions', filter=seen),
+        late=Count('submissions', filter=seen & Q(submissions__submitted_at__gt=F('due_date'))),
+        last_submitted_at=Max('submissions__submitted_at', filter=seen),
+    )
+    assignments_page = paginate(request, assignments, ['due_date'])
+    # Out of: the students this teacher takes, from the enrolment counters (student.enrolment)
+    if division_ids is None:
+        expected = course.enrolled_count
+    else:
+        expected = course.division_counts.filter(division_id__in=division_ids).aggregate(total=Sum('enrolled'))['total'] or 0
+
+    selected, submissions = None, []
+    if request.GET.get('assignment'):
+        selected = get_object_or_404(Assignment, id=request.GET['assignment'], course=course)
+        submissions = list(
+            course_submissions(course, division_ids).filter(assignment=selected)
+            .select_related('student').order_by('student__last', 'student__first')
+        )
+        refdata.attach([submission.student for submission in submissions], 'division')
+        for submission in submissions:
+            submission.assignment = selected
 
     context = {
         'teacher': teacher_profile,
         'course': course,
-        'assignments': assignments,
+        'assignments': assignments_page.object_list,
+        'page': assignments_page,
+        'expected': expected,
+        'selected': selected,
+        'submissions': submissions,
     }
-    return render(request, 'teacher/manage_assignments.html', context)
\ No newline at end of file
+    return render(request, 'teacher/manage_assignments.html', context)
+
+@login_required
+def teacher_download_submission(request, course_id, submission_id):
+    """
+    Sends one submitted file under the name it was uploaded with.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+    submissions = course_submissions(course, teaching_division_ids(teacher_profile, course))
+    submission = get_object_or_404(submissions.select_related('blob'), id=submission_id)
+    return FileResponse(open_blob(submission.blob), as_attachment=True, filename=submission.filename)
+
+@login_required
+def teacher_download_submissions(request, course_id, assignment_id):
+    """
+    Streams every submission for the assignment (from the teacher's divisions) as one zip,
+    one folder per student plus a submissions.csv manifest. Nothing is staged on disk or
+    held in memory beyond one chunk of one file.
+    """
+    teacher_profile, course = get_teacher_course(request, course_id)
+    assignment = get_object_or_404(Assignment, id=assignment_id, course=course)
+
+    # One row per student: read up front so no cursor stays open while the response streams
+    submissions = list(
+        course_submissions(course, teaching_division_ids(teacher_profile, course)).filter(assignment=assignment)
+        .select_related('student', 'blob').order_by('student__last', 'student__first')
+    )
+    for submission in submissions:
+        submission.assignment = assignment
+    response = StreamingHttpResponse(submissions_archive(submissions), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{course.code}_{slugify(assignment.title)}_submissions.zip"'
+    return response
+
+# --- Registrar (staff) branch-wide exports ---
+
+def enqueue_branch_export(request, name, branch):
+    """POST variant of the branch exports: builds the file in a background job and redirects to its status page."""
+    filters = {key: request.POST[key] for key in ('semester', 'division', 'from', 'to') if request.POST.get(key)}
+    job = enqueue(name, user=request.user, branch_id=branch.id, **filters)
+    messages.success(request, f"Export queued as job #{job.pk}.")
+    return redirect('main:job_detail', job_id=job.pk)
+
+@staff_member_required
+def branch_export_attendance(request, branch_id):
+    """
+    Streams attendance for every course in a branch as CSV.
+    Optional filters: ?semester=<id>&division=<id>&from=YYYY-MM-DD&to=YYYY-MM-DD.
+    A POST with the same fields writes the file in a background job instead.
+    """
+    branch = get_object_or_404(Branch, id=branch_id)
+    if request.method == 'POST':
+        return enqueue_branch_export(request, 'export_branch_attendance', branch)
+    return attendance_export(f"attendance_{branch.code}.csv", branch_attendance(branch, request.GET))
+
+@staff_member_required
+def branch_attendance_shortfall(request, branch_id):
+    """
+    Students below the attendance threshold in every course of a branch, streamed as an
+    HTML table (or CSV with ?format=csv). Optional filters: ?semester=<id>&division=<id>&threshold=<percent>.
+    """
+    branch = get_object_or_404(Branch, id=branch_id)
+    divisions = sorted((d for d in refdata.instances(Division) if d.branch_id == branch.id), key=lambda d: d.name)
+    semesters = sorted(refdata.instances(Semester), key=lambda s: (s.academic_id, s.semester_number))
+    return shortfall_response(
+        request, f"shortfall_{branch.code}", branch.name, branch_attendance_summaries(branch, request.GET),
+        divisions=divisions, semesters=semesters,
+    )
+
+@staff_member_required
+def branch_export_grades(request, branch_id):
+    """
+    Streams grades for every course in a branch as CSV. Optional filters: ?semester=<id>&division=<id>.
+    A POST with the same fields writes the file in a background job instead.
+    """
+    branch = get_object_or_404(Branch, id=branch_id)
+    if request.method == 'POST':
+        return enqueue_branch_export(request, 'export_branch_grades', branch)
+    return grade_export(f"grades_{branch.code}.csv", branch_grades(branch, request.GET))